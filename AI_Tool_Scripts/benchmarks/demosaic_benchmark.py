@@ -0,0 +1,122 @@
+import os
+import sys
+import time
+import tempfile
+import argparse
+from pathlib import Path
+import numpy as np
+import cv2
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+SRC_DIR = BASE_DIR / "src"
+
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+from utils.raw_to_16_class import RawTo16
+
+# Standalone script to compare the RawTo16 demosaic methods on synthetic 12-bit BGGR frames
+# Workflow:
+# 1. Build a synthetic RGB scene (gradients, dark larvae-like blobs, fine stripes) at sensor resolution.
+# 2. Mosaic the scene into a BGGR Bayer frame and add sensor-like noise.
+# 3. Time each demosaic method over a number of frames and report frames per second.
+# 4. Report PSNR of each method against the edge-aware ("ea") output, and against the noise free scene.
+
+# Notes:
+# Not part of GUI, run from the AI_Tool_Scripts folder: python benchmarks/demosaic_benchmark.py
+# Only demosaicing is timed, file reads and PNG encoding are left out. Converters are built with temporary
+# input/output folders that are never written to.
+# VNG output is 8-bit and is scaled back up to sensor range before PSNR is computed.
+# Half resolution output is upscaled with bilinear interpolation before PSNR is computed.
+
+
+def synthetic_scene(width, height, sensor_bits, seed=0):
+    rng = np.random.default_rng(seed)
+    peak = (1 << sensor_bits) - 1
+    yy, xx = np.mgrid[0:height, 0:width].astype(np.float32)
+
+    scene = np.empty((height, width, 3), dtype=np.float32)
+    scene[..., 0] = 0.35 + 0.25 * xx / width
+    scene[..., 1] = 0.45 + 0.20 * yy / height
+    scene[..., 2] = 0.30 + 0.15 * np.sin(xx / 40.0) * np.cos(yy / 55.0)
+
+    stripes = (np.sin(xx / 1.7) > 0).astype(np.float32) * 0.1
+    scene[: height // 8] += stripes[: height // 8, :, None]
+
+    for _ in range(40):
+        cx, cy = rng.integers(0, width), rng.integers(0, height)
+        axes = (int(rng.integers(20, 60)), int(rng.integers(6, 15)))
+        angle = float(rng.uniform(0, 180))
+        cv2.ellipse(scene, (int(cx), int(cy)), axes, angle, 0, 360, (0.08, 0.07, 0.06), thickness=-1)
+
+    return (np.clip(scene, 0.0, 1.0) * peak).astype(np.uint16)
+
+
+def mosaic_bggr(scene, sensor_bits, noise_sigma, seed=0):
+    rng = np.random.default_rng(seed + 1)
+    h, w = scene.shape[:2]
+    bayer = np.empty((h, w), dtype=np.float32)
+    bayer[0::2, 0::2] = scene[0::2, 0::2, 2]
+    bayer[0::2, 1::2] = scene[0::2, 1::2, 1]
+    bayer[1::2, 0::2] = scene[1::2, 0::2, 1]
+    bayer[1::2, 1::2] = scene[1::2, 1::2, 0]
+    bayer += rng.normal(0.0, noise_sigma, size=bayer.shape).astype(np.float32)
+    return np.clip(bayer, 0, (1 << sensor_bits) - 1).astype(np.uint16)
+
+
+def to_reference_scale(image, width, height, sensor_bits):
+    if image.dtype == np.uint8:
+        image = image.astype(np.uint16) << max(sensor_bits - 8, 0)
+    if image.shape[:2] != (height, width):
+        image = cv2.resize(image, (width, height), interpolation=cv2.INTER_LINEAR)
+    return image
+
+
+def psnr(image, reference, sensor_bits):
+    peak = float((1 << sensor_bits) - 1)
+    diff = image.astype(np.float64) - reference.astype(np.float64)
+    mse = np.mean(diff * diff)
+    if mse == 0:
+        return float("inf")
+    return 10.0 * np.log10(peak * peak / mse)
+
+
+def run(width, height, frames, sensor_bits, noise_sigma):
+    scene = synthetic_scene(width, height, sensor_bits)
+    bayer = mosaic_bggr(scene, sensor_bits, noise_sigma)
+
+    results = []
+    reference = None
+    for method in RawTo16.DEMOSAIC_METHODS:
+        with tempfile.TemporaryDirectory() as folder:
+            converter = RawTo16(os.path.join(folder, "raw"), os.path.join(folder, "out"), width=width,
+                                height=height, stride_bytes=width * 2, method=method, sensor_bits=sensor_bits)
+
+        output = converter.demosaic_bayer(bayer)
+        start = time.perf_counter()
+        for _ in range(frames):
+            output = converter.demosaic_bayer(bayer)
+        elapsed = time.perf_counter() - start
+
+        output = to_reference_scale(output, width, height, sensor_bits)
+        if method == "ea":
+            reference = output
+        results.append((method, frames / elapsed, output))
+
+    print(f"\nSynthetic {sensor_bits}-bit BGGR frame {width}x{height}, {frames} frames per method")
+    print(f"{'Method':<10}{'Frames/s':>12}{'PSNR vs EA (dB)':>18}{'PSNR vs scene (dB)':>21}")
+    for method, fps, output in results:
+        print(f"{method:<10}{fps:>12.2f}{psnr(output, reference, sensor_bits):>18.2f}"
+              f"{psnr(output, scene, sensor_bits):>21.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark RawTo16 demosaic methods on synthetic BGGR frames.")
+    parser.add_argument("--width", type=int, default=4056)
+    parser.add_argument("--height", type=int, default=3040)
+    parser.add_argument("--frames", type=int, default=10)
+    parser.add_argument("--sensor-bits", type=int, default=12)
+    parser.add_argument("--noise", type=float, default=8.0, help="Gaussian noise sigma in sensor counts")
+    args = parser.parse_args()
+
+    run(args.width, args.height, args.frames, args.sensor_bits, args.noise)
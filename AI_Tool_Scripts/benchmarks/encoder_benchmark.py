@@ -0,0 +1,146 @@
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import subprocess
+from pathlib import Path
+import numpy as np
+import cv2
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+SRC_DIR = BASE_DIR / "src"
+
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+from utils.encoder_session_class import EncoderSession, ENCODER_PROFILES, PROFILE_BENCHMARK_FILE, default_threads
+
+# Standalone script to measure encode speed and output size of every VideoEncoderFFMPEG encoder profile
+# Workflow:
+# 1. Build a synthetic dish recording: a static lit dish, dark larvae-like blobs that move every frame and
+#    sensor-like noise, so inter frame and intra frame redundancy resemble real recordings.
+# 2. Stream the frames into ffmpeg through an EncoderSession once per profile and time it up to the closed file.
+# 3. Report frames per second, MB per frame and the size relative to the raw frames.
+# 4. Save the results to assets/encoder_benchmark.json, where the video encoder window reads them from to show
+#    the measured speed and size of each profile.
+
+# Notes:
+# Not part of GUI, run from the AI_Tool_Scripts folder: python benchmarks/encoder_benchmark.py
+# Needs ffmpeg on PATH (with libx264 for the x264 profiles, profiles ffmpeg cannot run are reported and skipped).
+# Numbers depend on the machine and the ffmpeg build, run it on the machine that does the encoding.
+# Frames are generated before timing starts, only encoding and writing the output file are timed.
+
+
+def synthetic_frames(width, height, frames, bit_depth, noise_sigma, seed=0):
+    rng = np.random.default_rng(seed)
+    peak = 255 if bit_depth == 8 else 4095
+    yy, xx = np.mgrid[0:height, 0:width].astype(np.float32)
+
+    base = np.full((height, width, 3), 0.15, dtype=np.float32)
+    dish = (xx - width / 2) ** 2 + (yy - height / 2) ** 2 < (min(width, height) * 0.45) ** 2
+    base[dish] = (0.55, 0.60, 0.50)
+    base += (0.05 * xx / width)[..., None]
+
+    larvae = [(rng.uniform(0, width), rng.uniform(0, height), rng.uniform(0, 180)) for _ in range(12)]
+    dtype = np.uint8 if bit_depth == 8 else np.uint16
+    output = []
+    for _ in range(frames):
+        frame = base.copy()
+        moved = []
+        for x, y, angle in larvae:
+            x = (x + rng.normal(0, 3)) % width
+            y = (y + rng.normal(0, 3)) % height
+            angle = (angle + rng.normal(0, 5)) % 180
+            cv2.ellipse(frame, (int(x), int(y)), (30, 8), angle, 0, 360, (0.1, 0.1, 0.08), thickness=-1)
+            moved.append((x, y, angle))
+        larvae = moved
+        frame = frame * peak + rng.normal(0, noise_sigma, size=frame.shape).astype(np.float32)
+        output.append(np.clip(frame, 0, peak).astype(dtype))
+    return output
+
+
+def ffmpeg_version():
+    try:
+        result = subprocess.run(["ffmpeg", "-version"], capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.splitlines()[0]
+
+
+def encode_profile(profile, frames, framerate, bit_depth, threads, folder):
+    output_path = os.path.join(folder, f"{profile}{ENCODER_PROFILES[profile]['extension']}")
+    session = EncoderSession(output_path, framerate=framerate, bit_depth=bit_depth,
+                             profile=profile, threads=threads)
+    start = time.perf_counter()
+    with session:
+        for frame in frames:
+            session.write(frame)
+    elapsed = time.perf_counter() - start
+    return elapsed, os.path.getsize(output_path)
+
+
+def run(width, height, frames, bit_depth, noise_sigma, framerate, threads, profiles, output):
+    version = ffmpeg_version()
+    if version is None:
+        print("ffmpeg was not found on PATH, nothing to benchmark.")
+        return
+
+    data = synthetic_frames(width, height, frames, bit_depth, noise_sigma)
+    raw_bytes = sum(frame.nbytes for frame in data)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as folder:
+        for profile in profiles:
+            try:
+                elapsed, size = encode_profile(profile, data, framerate, bit_depth, threads, folder)
+            except (subprocess.CalledProcessError, RuntimeError) as e:
+                print(f"Skipping {profile}: {e}")
+                continue
+            results[profile] = {
+                "fps": frames / elapsed,
+                "mb_per_frame": size / frames / 1e6,
+                "ratio": size / raw_bytes,
+                "width": width,
+                "height": height,
+                "bit_depth": bit_depth,
+                "frames": frames,
+                "threads": threads,
+            }
+
+    print(f"\n{version}")
+    print(f"Synthetic {bit_depth}-bit frames {width}x{height}, {frames} frames, {threads} encoder threads")
+    print(f"{'Profile':<15}{'Frames/s':>12}{'MB/frame':>12}{'Size vs raw':>14}")
+    for profile, result in results.items():
+        print(f"{profile:<15}{result['fps']:>12.2f}{result['mb_per_frame']:>12.3f}{result['ratio']:>13.1%}")
+
+    if output and results:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump({
+                "ffmpeg": version,
+                "machine": platform.platform(),
+                "cpu_count": os.cpu_count(),
+                "date": time.strftime("%Y-%m-%d"),
+                "profiles": results,
+            }, f, indent=1)
+        print(f"Saved results to {output}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the VideoEncoderFFMPEG encoder profiles.")
+    parser.add_argument("--width", type=int, default=2400)
+    parser.add_argument("--height", type=int, default=2400)
+    parser.add_argument("--frames", type=int, default=100)
+    parser.add_argument("--bit-depth", type=int, choices=(8, 16), default=8)
+    parser.add_argument("--noise", type=float, default=3.0, help="Gaussian noise sigma in output counts")
+    parser.add_argument("--framerate", type=int, default=10)
+    parser.add_argument("--threads", type=int, default=default_threads())
+    parser.add_argument("--profiles", nargs="+", choices=tuple(ENCODER_PROFILES), default=list(ENCODER_PROFILES))
+    parser.add_argument("--output", default=os.path.normpath(PROFILE_BENCHMARK_FILE),
+                        help="Results file read by the video encoder window, empty string to not save")
+    args = parser.parse_args()
+
+    run(args.width, args.height, args.frames, args.bit_depth, args.noise, args.framerate, args.threads,
+        args.profiles, args.output)
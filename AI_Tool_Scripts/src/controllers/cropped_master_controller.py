@@ -1,5 +1,6 @@
 import os
 import shutil
+import subprocess
 import traceback
 import time
 from pathlib import Path
@@ -8,10 +9,11 @@ from PySide6.QtWidgets import QFileDialog, QMessageBox
 from utils.remove_hidden_class import RemoveHiddenFiles
 from utils.bit_depth_convert_class import BitDepthConverter
 from utils.larvae_object_cropper import LarvaeObjectCropper
-from utils.data_extractor_class import DataExtractor
-from utils.flashing_frames_class import FlashingFrames
+from utils.data_extractor_class import DataExtractor, find_tracks_table
+from utils.flashing_frames_class import FlashingFrames, FLASHING_FRAMES_FILE
 from utils.video_encoder_class import VideoEncoderFFMPEG
 from utils.full_frame_annotator_class import FullFrameAnnotator
+from utils.folder_index_class import FolderIndex
 
 # Controller does not utilise threading logic, outputs will appear after entire logic is applied
 # Acts as the master button controller used in the GUI
@@ -150,7 +152,7 @@ class CroppedMasterController:
     # 6. Calls Larvae Cropper Class by matching .txt files and images files and crops and organises crops into appropriately named folders
     # 7. Calls Data extractor Class, which creates main csv file, getter functions called to store variables for
     # width res, height res, array of flashing indices
-    # 8. Calls Flashing frames class to apply annotate frames to indicate flashing on the normal folder
+    # 8. Calls Flashing frames class in metadata mode, the flashing outline is burnt in by the encoder (drawbox)
     # 9. Calls video encoder class to create video from the normal full frame images
     # 10. Calls full frame annotator to annotate bounding box labels on normal images based on boxmot labels
     # and encodes these the images as well
@@ -167,6 +169,8 @@ class CroppedMasterController:
         annotated = os.path.join(working_root, "Annotated")
 
         summary_lines = []
+        # Listings cached by an earlier run are dropped, folders may have changed outside the app since
+        FolderIndex.clear()
 
         try:
             self.window.append_log("1. Copying input files to Normal folder")
@@ -174,6 +178,7 @@ class CroppedMasterController:
             for f in os.listdir(input_path):
                 if f.lower().endswith((".png", ".jpg", ".jpeg", ".json")):
                     shutil.copy(os.path.join(input_path, f), normal)
+            FolderIndex.invalidate(normal)
 
             self.window.append_log("2. Removing hidden files.")
             self.window.append_log(str(RemoveHiddenFiles(normal)()))
@@ -192,6 +197,7 @@ class CroppedMasterController:
             for f in os.listdir(label_dir):
                 if f.endswith(".txt"):
                     shutil.copy(os.path.join(label_dir, f), labels_out)
+            FolderIndex.invalidate(labels_out)
 
             self.window.append_log("6. Cropping larvae.")
             self.window.append_log(str(LarvaeObjectCropper(
@@ -204,9 +210,9 @@ class CroppedMasterController:
             extractor = DataExtractor(normal, working_root)
             extractor.final_data_to_csv()
 
-            main_csv_path = os.path.join(working_root, "main_data.csv")
-            if not os.path.exists(main_csv_path):
-                self.window.append_log("Warning: main_data.csv was not generated. Skipping downstream steps.")
+            tracks_path = find_tracks_table(working_root) or os.path.join(working_root, "main_data.csv")
+            if not os.path.exists(tracks_path):
+                self.window.append_log("Warning: no tracking data was generated. Skipping downstream steps.")
                 return
 
             flashing = extractor.get_flashing_frames()
@@ -217,38 +223,44 @@ class CroppedMasterController:
             summary_lines.append(f"Flashing Frame Indices: {flashing}")
             summary_lines.append(f"Framerate: {framerate}")
 
-            self.window.append_log("8. Annotate flashing frames")
-            self.window.append_log(str(FlashingFrames(normal, normal, flashing)()))
+            # Normal frames stay untouched, the outline is burnt in by the encoder from the flashing_frames.json sidecar
+            self.window.append_log("8. Recording flashing frames")
+            self.window.append_log(str(FlashingFrames(normal, normal, flashing, mode="metadata")()))
 
             self.window.append_log("9. Encoding full_frame.avi")
             self.window.append_log(str(
-                VideoEncoderFFMPEG(normal, working_root, "full_frame", 8, framerate=framerate).run_command()
+                VideoEncoderFFMPEG(normal, working_root, "full_frame", 8, framerate=framerate,
+                                   fill_gaps=True).run_command()
             ))
 
-            self.window.append_log("10. Creating annotated frames.")
-            self.window.append_log(str(FullFrameAnnotator(normal, labels_out, annotated)()))
-            self.window.append_log(str(
-                VideoEncoderFFMPEG(annotated, working_root, "annotated_full_frame", 8, framerate=framerate).run_command()
-            ))
+            # Annotated frames are drawn in memory and streamed into ffmpeg in the encoder's frame order (gaps
+            # filled, flashing outline from the Normal sidecar), no annotated frame is written to disk
+            self.window.append_log("10. Encoding annotated_full_frame.avi")
+            encoder = VideoEncoderFFMPEG(normal, working_root, "annotated_full_frame", 8, framerate=framerate,
+                                         flash_sidecar=os.path.join(normal, FLASHING_FRAMES_FILE), fill_gaps=True)
+            sequence, order = encoder.frame_order()
+            try:
+                with encoder.open_session(order) as session:
+                    FullFrameAnnotator(normal, labels_out, annotated, session=session, write_frames=False,
+                                       image_names=[sequence[frame] for frame in order])()
+                if session.frames_written:
+                    self.window.append_log(f"Encoded {session.frames_written} frames to: {encoder.output_path()}")
+            except (OSError, RuntimeError, subprocess.CalledProcessError) as e:
+                self.window.append_log(f"Error encoding annotated_full_frame: {e}")
 
             self.window.append_log("11. Exporting larvae_xx CSVs.")
-            extractor.larvae_data_exporter(main_csv_path, larvae)
+            extractor.larvae_data_exporter(tracks_path, larvae)
 
             self.window.append_log("12. Annotating and plotting data per object.")
             for folder in os.listdir(larvae):
                 full = os.path.join(larvae, folder)
                 if folder.startswith("larvae_") and os.path.isdir(full):
-                    object_id = folder.split("_")[-1]
-                    object_csv_path = os.path.join(full, f"{object_id}_main_data.csv")
-
                     self.window.append_log(f" - Annotating flashing frames in {folder}")
                     self.window.append_log(str(FlashingFrames(full, full, flashing, outline_thickness=10)()))
 
-                    if os.path.exists(object_csv_path):
-                        self.window.append_log(f" - Plotting data for {object_id}")
-                        extractor.larvae_data_plotter(object_csv_path, full)
-                    else:
-                        self.window.append_log(f"Skipped plot: {object_csv_path} not found.")
+            # All larvae are plotted in one call, spread over a process pool
+            self.window.append_log(" - Plotting data for every object")
+            extractor.plot_larvae(larvae)
 
             self.window.append_log("13. Master complete.")
             for line in summary_lines:
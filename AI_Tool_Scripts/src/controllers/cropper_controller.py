@@ -3,10 +3,17 @@ from PySide6.QtWidgets import QFileDialog, QMessageBox
 from controllers.thread_worker import ThreadWorker
 from utils.petri_dish_cropper_circle_class import PetriDishCropperCircle
 from utils.petri_dish_cropper_view_class import PetriDishCropperView
+from utils.dish_locator_class import DishLocator
+from utils.crop_scheduler_class import CropScheduler
 
 # Notes:
 # Controller script used to control logic of cropper button in UI
 # Used to crop images from the demosaiced images
+# "Square Crop Only" writes just the dish's bounding square, Scale downscales the written frames
+# When X, Y and Radius are all left blank the dish is located automatically (DishLocator) in the worker thread
+# before cropping, falling back to the default dish if none is found. View Crop fills blank fields the same way.
+# All rows are cropped by one CropScheduler on a single ThreadWorker, which caps the frames in flight across
+# rows, alternates between folders and logs aggregate frames/s and MB/s.
 
 class CropperController:
     def __init__(self, window):
@@ -65,8 +72,22 @@ class CropperController:
         y = row["le_y"].text().strip()
         radius = row["le_radius"].text().strip()
 
-        if not input_folder or not (x and y and radius):
-            QMessageBox.warning(self.window, "Missing Info", "Please select Input Folder and enter X/Y/Radius.")
+        if not input_folder:
+            QMessageBox.warning(self.window, "Missing Info", "Please select Input Folder.")
+            return
+
+        if not (x or y or radius):
+            dish = DishLocator(input_folder)()
+            if dish is None:
+                QMessageBox.warning(self.window, "Dish Not Found", "Could not locate the dish, please enter X/Y/Radius.")
+                return
+            x, y, radius = (str(v) for v in dish)
+            row["le_x"].setText(x)
+            row["le_y"].setText(y)
+            row["le_radius"].setText(radius)
+
+        if not (x and y and radius):
+            QMessageBox.warning(self.window, "Missing Info", "Please enter X/Y/Radius.")
             return
 
         try:
@@ -105,11 +126,14 @@ class CropperController:
             y = row["le_y"].text().strip()
             radius = row["le_radius"].text().strip()
 
-            x_val = int(x or defaults["x"])
-            y_val = int(y or defaults["y"])
-            radius_val = int(radius or defaults["radius"])
+            if not (x or y or radius):
+                x_val = y_val = radius_val = None
+            else:
+                x_val = int(x or defaults["x"])
+                y_val = int(y or defaults["y"])
+                radius_val = int(radius or defaults["radius"])
 
-            sets.append((row, input_folder, output_folder, x_val, y_val, radius_val))
+            sets.append((row, input_folder, output_folder, x_val, y_val, radius_val, self.row_options(row)))
 
         if errors:
             QMessageBox.warning(
@@ -125,8 +149,7 @@ class CropperController:
             self.window.btn_cancel_process.setEnabled(False)
             return
 
-        for row, input_folder, output_folder, x, y, radius in sets:
-            self.start_crop(row, input_folder, output_folder, x, y, radius)
+        self.start_crops(sets)
 
     def process_single_row(self, row):
         defaults = {"x": 2028, "y": 1420, "radius": 1200}
@@ -144,9 +167,12 @@ class CropperController:
         y = row["le_y"].text().strip()
         radius = row["le_radius"].text().strip()
 
-        x_val = int(x or defaults["x"])
-        y_val = int(y or defaults["y"])
-        radius_val = int(radius or defaults["radius"])
+        if not (x or y or radius):
+            x_val = y_val = radius_val = None
+        else:
+            x_val = int(x or defaults["x"])
+            y_val = int(y or defaults["y"])
+            radius_val = int(radius or defaults["radius"])
 
         self.window.btn_crop.setEnabled(False)
         self.window.btn_cancel_process.setEnabled(True)
@@ -154,30 +180,38 @@ class CropperController:
         self.lock_all_removes()
         row["btn_crop"].setEnabled(False)
 
-        self.start_crop(row, input_folder, output_folder, x_val, y_val, radius_val)
+        self.start_crops([(row, input_folder, output_folder, x_val, y_val, radius_val, self.row_options(row))])
 
-    def start_crop(self, row, input_folder, output_folder, x, y, radius):
-        def run_crop(input_folder, output_folder, x, y, radius, cropper):
-            cropper()
+    # Extra PetriDishCropperCircle keyword arguments set per row
+    def row_options(self, row):
+        return {
+            "square": row["chk_square"].isChecked(),
+            "scale": float(row["le_scale"].text().strip() or 1.0),
+        }
 
-        cropper = PetriDishCropperCircle(input_folder, output_folder, x, y, radius)
-        self.running_croppers.append(cropper)
+    # Each set is (row, input, output, x, y, radius, options), a radius of None locates the dish before cropping
+    def start_crops(self, sets):
+        scheduler = CropScheduler()
+        for row, input_folder, output_folder, x, y, radius, options in sets:
+            cropper = PetriDishCropperCircle(input_folder, output_folder, x, y, radius, **(options or {}))
+            scheduler.add(cropper, locate=radius is None)
+            self.running_croppers.append(cropper)
 
-        worker = ThreadWorker(run_crop, input_folder, output_folder, x, y, radius, cropper)
+        worker = ThreadWorker(scheduler)
         worker.log_signal.connect(self.window.append_log)
-        worker.finished_signal.connect(lambda result, elapsed: self.handle_finished(row, input_folder, elapsed))
+        worker.finished_signal.connect(self.handle_finished)
         self.active_workers.append(worker)
         worker.start()
 
-    def handle_finished(self, row, input_folder, elapsed_time):
-        self.timings.append((row, input_folder, elapsed_time))
+    def handle_finished(self, timings, elapsed_time):
+        self.timings.extend(timings or [])
 
         if all(not w.isRunning() for w in self.active_workers):
             if self.cancelling:
                 self.window.append_log("\nCrop process was cancelled.")
             else:
-                self.window.append_log("\nSummary of Processing Times:")
-                for idx, (row, input_folder, elapsed) in enumerate(self.timings, 1):
+                self.window.append_log(f"\nSummary of Processing Times (total {elapsed_time:.2f} seconds):")
+                for idx, (input_folder, elapsed) in enumerate(self.timings, 1):
                     folder_name = os.path.basename(input_folder.rstrip("/"))
                     self.window.append_log(f"Set {idx}: {folder_name} - ({elapsed:.2f} seconds)")
 
@@ -211,6 +245,8 @@ class CropperController:
             row["le_x"].clear()
             row["le_y"].clear()
             row["le_radius"].clear()
+            row["chk_square"].setChecked(False)
+            row["le_scale"].clear()
             return
 
         container = row["container"]
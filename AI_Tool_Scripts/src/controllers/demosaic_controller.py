@@ -2,6 +2,7 @@ import os
 from PySide6.QtWidgets import QFileDialog, QMessageBox
 from controllers.thread_worker import ThreadWorker
 from utils.raw_to_16_class import RawTo16
+from utils.fused_raw_pipeline_class import FusedRawPipeline
 from utils.remove_hidden_class import RemoveHiddenFiles
 
 # Controller script used to control logic of demosaic button in UI
@@ -72,8 +73,9 @@ class DemosaicController:
             width = int(row["le_width"].text().strip() or defaults["width"])
             height = int(row["le_height"].text().strip() or defaults["height"])
             stride_bytes = int(row["le_stride"].text().strip() or defaults["stride_bytes"])
+            options = self.row_options(row)
 
-            sets.append((row, input_folder, output_folder, width, height, stride_bytes))
+            sets.append((row, input_folder, output_folder, width, height, stride_bytes, options))
 
         if errors:
             QMessageBox.warning(
@@ -89,8 +91,8 @@ class DemosaicController:
             self.window.btn_cancel_process.setEnabled(False)
             return
 
-        for row, input_folder, output_folder, width, height, stride_bytes in sets:
-            self.start_demosaic(row, input_folder, output_folder, width, height, stride_bytes)
+        for row, input_folder, output_folder, width, height, stride_bytes, options in sets:
+            self.start_demosaic(row, input_folder, output_folder, width, height, stride_bytes, options)
 
     def process_single_row(self, row):
         defaults = {"width": 4056, "height": 3040, "stride_bytes": 8128}
@@ -107,6 +109,7 @@ class DemosaicController:
         width = int(row["le_width"].text().strip() or defaults["width"])
         height = int(row["le_height"].text().strip() or defaults["height"])
         stride_bytes = int(row["le_stride"].text().strip() or defaults["stride_bytes"])
+        options = self.row_options(row)
 
         self.window.btn_demosaic.setEnabled(False)
         self.window.btn_cancel_process.setEnabled(True)
@@ -114,13 +117,32 @@ class DemosaicController:
         self.lock_all_removes()
         row["btn_demosaic"].setEnabled(False)
 
-        self.start_demosaic(row, input_folder, output_folder, width, height, stride_bytes)
-
-    def start_demosaic(self, row, input_folder, output_folder, width, height, stride_bytes):
+        self.start_demosaic(row, input_folder, output_folder, width, height, stride_bytes, options)
+
+    # Extra RawTo16 keyword arguments set per row, empty fields fall back to the RawTo16 defaults
+    # Dish fields are only added for fused rows, their presence selects FusedRawPipeline in start_demosaic
+    def row_options(self, row):
+        png_compression = row["le_png_compression"].text().strip()
+        options = {
+            "workers": int(row["le_workers"].text().strip() or 1),
+            "method": row["cb_method"].currentData(),
+            "output_format": row["cb_format"].currentData(),
+            "png_compression": int(png_compression) if png_compression else None,
+            "resume": self.window.chk_resume.isChecked(),
+        }
+        if row["chk_fused"].isChecked():
+            options["centerX"] = int(row["le_x"].text().strip() or 2028)
+            options["centerY"] = int(row["le_y"].text().strip() or 1420)
+            options["radius"] = int(row["le_radius"].text().strip() or 1200)
+        return options
+
+    def start_demosaic(self, row, input_folder, output_folder, width, height, stride_bytes, options=None):
         def run_demosaic(input_folder, output_folder, width, height, stride_bytes, demosaic_obj):
             demosaic_obj()
 
-        demosaic_obj = RawTo16(input_folder, output_folder, width, height, stride_bytes)
+        options = options or {}
+        demosaic_class = FusedRawPipeline if "radius" in options else RawTo16
+        demosaic_obj = demosaic_class(input_folder, output_folder, width, height, stride_bytes, **options)
         self.running_demosaics.append(demosaic_obj)
 
         worker = ThreadWorker(run_demosaic, input_folder, output_folder, width, height, stride_bytes, demosaic_obj)
@@ -176,6 +198,14 @@ class DemosaicController:
             row["le_width"].clear()
             row["le_height"].clear()
             row["le_stride"].clear()
+            row["le_workers"].clear()
+            row["cb_method"].setCurrentIndex(0)
+            row["cb_format"].setCurrentIndex(0)
+            row["le_png_compression"].clear()
+            row["chk_fused"].setChecked(False)
+            row["le_x"].clear()
+            row["le_y"].clear()
+            row["le_radius"].clear()
             return
 
         container = row["container"]
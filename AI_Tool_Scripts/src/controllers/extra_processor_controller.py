@@ -8,11 +8,17 @@ from utils.flashing_frames_class import FlashingFrames
 from utils.config_extractor_class import ConfigExtractor
 from utils.json_copier_class import JsonCopier
 from utils.remove_hidden_class import RemoveHiddenFiles
+from utils.fused_raw_pipeline_class import FusedRawPipeline
+from utils.folder_index_class import FolderIndex
 
 # Controller script used to control logic of extra processor button in UI
 # Used to process images from the demosaiced images
 # This script handles the extra processing of images, including copying configurations,
 # Converting bit depth, cleaning folders and flashing frames
+# With "Fused Raw" checked the raw folder is demosaiced, converted to 8-bit and dish cropped in one pass
+# (FusedRawPipeline with default dish values) in place of the 8-bit conversion of the Input folder
+# With "Validate Frames" and "Fused Raw" checked the .raw files are first checked against the frame length of the
+# FusedRawPipeline that reads them and truncated ones are quarantined before they are demosaiced
 
 class ExtraProcessorController:
     def __init__(self, window):
@@ -50,9 +56,12 @@ class ExtraProcessorController:
     def update_checkbox_enable_state(self, row):
         if row["le_input_raw"].text().strip():
             row["chk_copy_raw_configs"].setEnabled(True)
+            row["chk_fused_raw"].setEnabled(True)
         else:
             row["chk_copy_raw_configs"].setChecked(False)
             row["chk_copy_raw_configs"].setEnabled(False)
+            row["chk_fused_raw"].setChecked(False)
+            row["chk_fused_raw"].setEnabled(False)
 
         if row["le_input"].text().strip():
             row["chk_copy_inp_configs"].setEnabled(True)
@@ -67,9 +76,11 @@ class ExtraProcessorController:
         self.connect_row(self.window.add_input_row())
 
     def validate_row(self, row):
+        input_raw = row["le_input_raw"].text().strip()
         input_folder = row["le_input"].text().strip()
         output_folder = row["le_output"].text().strip()
-        return input_folder and output_folder
+        fused = row["chk_fused_raw"].isChecked() and input_raw
+        return bool(output_folder and (input_folder or fused))
 
     def process_all(self):
         self.timings = []
@@ -103,6 +114,8 @@ class ExtraProcessorController:
         self.start_next_task()
 
     def prepare_task_queue(self, row):
+        # Listings cached by an earlier run are dropped, folders may have changed outside the app since
+        FolderIndex.clear()
         self.processor_set_timings = []
         self.task_queue.clear()
         self.current_task_index = 0
@@ -112,21 +125,39 @@ class ExtraProcessorController:
         output_folder = row["le_output"].text().strip()
 
         self.flashing_frames = []
+        value_range = (0, 4095) if row["chk_fixed_range"].isChecked() else None
 
         if input_folder:
             self.task_queue.append(("Remove Hidden (Input)", RemoveHiddenFiles(input_folder)))
 
+        workers = max(1, (os.cpu_count() or 2) - 1)
+        fused = None
+        if row["chk_fused_raw"].isChecked() and input_raw:
+            fused = FusedRawPipeline(input_raw, output_folder, workers=workers, value_range=value_range)
+
+        validate_frames = row["chk_validate_frames"].isChecked()
+        if validate_frames and fused is not None:
+            self.task_queue.append(("Validate Raw Frames",
+                                    FolderCleaner(input_raw, extensions=(), mode="validate",
+                                                  raw_size=fused.raw_size())))
+
         if row["chk_copy_raw_configs"].isChecked() and input_raw:
             self.task_queue.append(("Copy Configs (Raw)", JsonCopier(input_raw, output_folder)))
 
         if row["chk_copy_inp_configs"].isChecked():
             self.task_queue.append(("Copy Configs (Input)", JsonCopier(input_folder, output_folder)))
 
-        if row["chk_convert_8bit"].isChecked():
-            self.task_queue.append(("Convert to 8-bit", BitDepthConverter(input_folder, output_folder)))
+        if fused is not None:
+            self.task_queue.append(("Fused Raw to 8-bit + Crop", fused))
+        elif row["chk_convert_8bit"].isChecked():
+            normalization = "global" if row["chk_global_norm"].isChecked() else "frame"
+            self.task_queue.append(("Convert to 8-bit",
+                                    BitDepthConverter(input_folder, output_folder, value_range=value_range,
+                                                      normalization=normalization, workers=workers)))
 
         self.task_queue.append(("Remove Hidden (After Copy/Conversion)", RemoveHiddenFiles(output_folder)))
-        self.task_queue.append(("Folder Cleaner", FolderCleaner(output_folder)))
+        cleaner_mode = "validate" if validate_frames else "size"
+        self.task_queue.append(("Folder Cleaner", FolderCleaner(output_folder, mode=cleaner_mode)))
 
         extractor = ConfigExtractor(output_folder)
         def config_extraction_task():
@@ -217,8 +248,6 @@ class ExtraProcessorController:
 
     def unlock_individual_processes(self):
         for row in self.window.row_widgets:
-            input_folder_filled = bool(row["le_input"].text().strip())
-            output_folder_filled = bool(row["le_output"].text().strip())
-            ready = input_folder_filled and output_folder_filled
+            ready = self.validate_row(row)
             row["btn_process"].setEnabled(ready)
             row["btn_remove"].setEnabled(True)
@@ -1,16 +1,37 @@
 import os
-import time
 from PySide6.QtWidgets import QFileDialog, QMessageBox
-from PySide6.QtCore import QProcess
-from utils.video_encoder_class import VideoEncoderFFMPEG
+from PySide6.QtCore import QProcess, Qt
+from controllers.thread_worker import ThreadWorker
+from utils.video_encoder_class import VideoEncoderFFMPEG, describe_gaps
+from utils.encoder_session_class import ENCODER_PROFILES, load_profile_benchmarks
+from utils.encode_queue_class import EncodeQueue
+
+# Notes:
+# Encodes go through an EncodeQueue instead of all starting at once, jobs are started while their encoder threads
+# fit into the core budget and the next queued job starts whenever one finishes.
+# Every ffmpeg runs with -progress, the frame count and fps of each running job are logged every few seconds.
+# Frames missing from a sequence are listed per job in the summary, Fill Missing Frames repeats the previous
+# frame in their place.
+# Cancel drops the queued jobs before stopping the running ones, so nothing new starts while they wind down.
+# Image sequences are encoded by an ffmpeg QProcess reading the ffconcat list VideoEncoderFFMPEG writes in the
+# output folder, every frame in frame number order, so a missing frame no longer ends the video early. Gaps are
+# skipped, or filled with the previous frame when Fill Missing Frames (fill_gaps) is checked.
+# .npy and frame stack folders are piped into ffmpeg by VideoEncoderFFMPEG.run_command on a ThreadWorker instead,
+# those workers sit in active_processes alongside the QProcesses and are stopped through their encoder.
+# pipe_encoders keeps each worker referenced until its thread finishes so a cancel never drops a running QThread.
+# Each row picks its own encoder profile, the profile tooltips show the speed and size measured by
+# benchmarks/encoder_benchmark.py on this machine once that benchmark has been run.
 
 class VideoEncoderController:
     def __init__(self, window):
         self.window = window
         self.active_processes = []
         self.running_encodings = {}
+        self.pipe_encoders = {}
         self.timings = []
+        self.encode_queue = EncodeQueue()
         self.cancelling = False
+        self.profile_benchmarks = load_profile_benchmarks()
         self.connect_all()
 
         self.window.btn_encode_all.clicked.connect(self.encode_all)
@@ -22,6 +43,7 @@ class VideoEncoderController:
             self.connect_row(row)
 
     def connect_row(self, row):
+        self.set_profile_tooltips(row["cb_profile"])
         row["btn_input"].clicked.connect(lambda _, r=row: self.select_folder(r["le_input"], r))
         row["btn_output"].clicked.connect(lambda _, r=row: self.select_folder(r["le_output"], r))
         row["cb_8bit"].stateChanged.connect(lambda _, r=row: self.toggle_bit_depth(r["cb_8bit"], r["cb_16bit"]))
@@ -29,6 +51,18 @@ class VideoEncoderController:
         row["btn_encode"].clicked.connect(lambda _, r=row: self.encode_single(r))
         row["btn_remove"].clicked.connect(lambda _, r=row: self.remove_row(r))
 
+    def set_profile_tooltips(self, combo):
+        for idx in range(combo.count()):
+            profile = combo.itemData(idx)
+            kind = "Lossless" if ENCODER_PROFILES[profile]["lossless"] else "Lossy"
+            result = self.profile_benchmarks.get(profile)
+            if result:
+                text = (f"{kind}, measured {result['fps']:.1f} frames/s, {result['mb_per_frame']:.2f} MB/frame "
+                        f"({result['width']}x{result['height']}, {result['bit_depth']}-bit)")
+            else:
+                text = f"{kind}, not benchmarked yet (run benchmarks/encoder_benchmark.py)"
+            combo.setItemData(idx, text, Qt.ToolTipRole)
+
     def select_folder(self, le_box, row=None):
         folder = QFileDialog.getExistingDirectory(self.window, "Select Folder", os.path.expanduser("~"))
         if folder:
@@ -81,7 +115,8 @@ class VideoEncoderController:
         self.window.btn_cancel_process.setEnabled(True)
 
         for row in complete_rows:
-            self.start_encoding(row)
+            self.queue_encoding(row)
+        self.launch_ready()
 
     def encode_single(self, row):
         if self.cancelling:
@@ -94,9 +129,10 @@ class VideoEncoderController:
         self.lock_all_encodes()
         self.window.btn_cancel_process.setEnabled(True)
 
-        self.start_encoding(row)
+        self.queue_encoding(row)
+        self.launch_ready()
 
-    def start_encoding(self, row):
+    def queue_encoding(self, row):
         input_folder = row["le_input"].text().strip()
         output_folder = row["le_output"].text().strip()
         output_name = row["le_name"].text().strip()
@@ -109,54 +145,120 @@ class VideoEncoderController:
             output_folder=output_folder,
             output_file_name=output_name,
             bit_depth=bit_depth,
-            framerate=framerate
+            framerate=framerate,
+            profile=row["cb_profile"].currentData(),
+            progress=True,
+            fill_gaps=row["cb_fill_gaps"].isChecked()
         )
-
+        job = self.encode_queue.add(encoder, output_name)
+        self.window.append_log(f"Queued {output_name} ({job.threads} encoder threads)")
+
+    # A job that fails to start releases its cores straight away, so ready() is asked again until it has nothing
+    # left to start, otherwise the jobs queued behind it would wait for an encode that never runs
+    def launch_ready(self):
+        started = self.encode_queue.ready()
+        while started:
+            for job in started:
+                self.start_encoding(job)
+            started = self.encode_queue.ready()
+        if not self.active_processes and self.encode_queue.is_idle():
+            self.all_finished()
+
+    def start_encoding(self, job):
+        encoder = job.encoder
+        output_name = job.name
         try:
+            if encoder.needs_pipe():
+                self.start_pipe_encoding(job)
+                return
+
             cmd = encoder.build_command_normal()
             self.window.append_log(f"\nRunning ffmpeg command:\n{' '.join(cmd)}")
 
             process = QProcess(self.window)
             process.setProcessChannelMode(QProcess.MergedChannels)
-            process.readyReadStandardOutput.connect(lambda p=process: self.read_output(p))
-            process.readyReadStandardError.connect(lambda p=process: self.read_output(p))
-            process.finished.connect(lambda: self.process_finished(process, output_name))
+            process.readyReadStandardOutput.connect(lambda p=process, j=job: self.read_output(p, j))
+            process.readyReadStandardError.connect(lambda p=process, j=job: self.read_output(p, j))
+            process.finished.connect(lambda p=process: self.process_finished(p))
 
             self.active_processes.append(process)
-            self.running_encodings[process] = time.perf_counter(), output_name
+            self.running_encodings[process] = job
             process.start(cmd[0], cmd[1:])
 
         except Exception as e:
+            self.encode_queue.finish(job)
+            self.window.append_log(f"Could not start {output_name}: {e}")
             QMessageBox.critical(self.window, "Encoding Error", f"Encoder Error: {e}")
 
-    def read_output(self, process):
-        data = process.readAllStandardOutput().data().decode()
-        if data:
-            self.window.append_log(data.strip())
+    def start_pipe_encoding(self, job):
+        encoder = job.encoder
+        self.window.append_log(f"\nPiping frames from {encoder.input_folder} into ffmpeg")
 
-    def process_finished(self, process, output_name):
+        worker = ThreadWorker(encoder.run_command)
+        worker.log_signal.connect(self.window.append_log)
+        worker.finished_signal.connect(lambda result, elapsed, w=worker: self.process_finished(w))
+
+        self.active_processes.append(worker)
+        self.pipe_encoders[worker] = encoder
+        self.running_encodings[worker] = job
+        worker.start()
+
+    # ffmpeg's -progress blocks update the job, everything else is ffmpeg's usual log
+    def read_output(self, process, job):
+        data = process.readAllStandardOutput().data().decode(errors="replace")
+        if not data:
+            return
+        blocks, lines = job.parser.feed(data)
+        if lines:
+            self.window.append_log("\n".join(lines))
+        for block in blocks:
+            if job.update(block, self.encode_queue.report_interval):
+                self.window.append_log(job.describe())
+
+    def process_finished(self, process):
+        # Pipe workers stay referenced here until their thread ends, even after a cancel
+        self.pipe_encoders.pop(process, None)
         if process in self.active_processes:
-            start_time, name = self.running_encodings.pop(process)
-            elapsed_time = time.perf_counter() - start_time
-            self.timings.append((name, elapsed_time))
+            job = self.running_encodings.pop(process)
+            elapsed_time = self.encode_queue.finish(job)
+            self.timings.append((job.name, elapsed_time, job.frame, job.encoder.gaps))
 
             self.active_processes.remove(process)
+            self.launch_ready()
+            return
 
         if not self.active_processes:
-            self.window.btn_cancel_process.setEnabled(False)
-            self.unlock_all_encodes()
-            self.cancelling = False
-            self.append_summary()
+            self.all_finished()
+
+    def all_finished(self):
+        self.window.btn_cancel_process.setEnabled(False)
+        self.unlock_all_encodes()
+        self.cancelling = False
+        self.append_summary()
 
     def append_summary(self):
         self.window.append_log("\nSummary of Encodings:")
-        for idx, (name, elapsed) in enumerate(self.timings, 1):
-            self.window.append_log(f"Set {idx}: {name} - ({elapsed:.2f} seconds)")
+        for idx, (name, elapsed, frames, gaps) in enumerate(self.timings, 1):
+            if frames:
+                self.window.append_log(f"Set {idx}: {name} - ({elapsed:.2f} seconds, {frames} frames, "
+                                       f"{frames / max(elapsed, 1e-9):.1f} fps)")
+            else:
+                self.window.append_log(f"Set {idx}: {name} - ({elapsed:.2f} seconds)")
+            if gaps:
+                self.window.append_log(f"    Missing frames: {describe_gaps(gaps)}")
 
     def cancel_processing(self):
+        dropped = self.encode_queue.drain()
+        if dropped:
+            self.window.append_log(f"\nDropped {len(dropped)} queued encodings.")
         if self.active_processes:
             for process in self.active_processes:
-                process.kill()
+                if process in self.pipe_encoders:
+                    self.pipe_encoders[process].stop()
+                else:
+                    process.kill()
+            for job in self.running_encodings.values():
+                self.encode_queue.finish(job)
             self.active_processes.clear()
             self.running_encodings.clear()
             self.window.btn_cancel_process.setEnabled(False)
@@ -176,6 +278,8 @@ class VideoEncoderController:
             row["le_framerate"].clear()
             row["cb_8bit"].setChecked(False)
             row["cb_16bit"].setChecked(False)
+            row["cb_profile"].setCurrentIndex(0)
+            row["cb_fill_gaps"].setChecked(False)
             return
 
         container = row["container"]
@@ -1,7 +1,15 @@
 import os
+import json
 import cv2
 import numpy as np
 import shutil
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from utils.frame_io_class import (
+    FrameReader, FrameWriter, FRAME_EXTENSIONS, STACK_EXTENSION, link_or_copy, break_hardlink
+)
+from utils.demosaic_manifest_class import hash_bytes
+from utils.folder_index_class import FolderIndex
 
 # Class to convert 16-bit images to 8-bit images
 # Workflow:
@@ -11,10 +19,56 @@ import shutil
 # 4. Save the converted image to the output folder
 # 5. If the image is already 8-bit copy it to the output folder
 
+# Notes:
+# Frames are read and written through FrameReader/FrameWriter so PNG, TIFF, .npy and frame stack inputs are accepted.
+# Each output keeps the format of its input, png_compression sets the zlib level of PNG outputs.
+# 16-bit to 8-bit conversion goes through a 65536 entry uint8 lookup table applied by indexing, so no float
+# copies of the frame are made. The table gives the same values as the (x - min) / (max - min) * 255 stretch.
+# value_range=(low, high) fixes the stretch (e.g. (0, 4095) for the 12-bit sensor) instead of per-frame min/max,
+# the table is then built once per run, frames stay photometrically consistent and no min/max scan is needed.
+# Flat frames (max == min) convert to all zeros instead of dividing by zero.
+# normalization="global" stretches every frame with one shared range instead of its own min/max, so LED flashes
+# no longer make the brightness jump between frames. It runs in two passes:
+#   1. sample_frames frames spread evenly over the folder are read and their values accumulated into one
+#      65536 bin histogram, the low/high percentiles of that histogram become the shared range. Frames are
+#      counted HISTOGRAM_TILE_ROWS rows at a time so the intp copy np.bincount makes stays small
+#   2. every frame is converted with the single lookup table built from that range
+# The range is cached in a hidden .bit_depth_stats.json in the output folder, keyed by the input frame names,
+# the sampled files' size/mtime and the percentile settings, so a later run on the same frames skips pass 1.
+# workers > 1 reads, converts and writes frames on a thread pool (OpenCV releases the GIL while decoding and
+# encoding). At most max_in_flight frames (default 2 per worker) are queued at once so memory stays bounded,
+# progress is still printed per file in input order and stop() drops the frames not yet started.
+# Frames that are already 8-bit are hardlinked into the output folder when it is on the same filesystem as the
+# input (link_copies=True), falling back to shutil.copy2 otherwise.
+# With an EncoderSession passed as session every 8-bit frame is also streamed into that video in name order,
+# write_frames=False then skips writing frames to the output folder. The caller closes the session.
+
+NORMALIZATION_MODES = ("frame", "global")
+HISTOGRAM_TILE_ROWS = 128
+
+
 class BitDepthConverter:
-    def __init__(self, input_folder, output_folder):
+    STATS_FILE = ".bit_depth_stats.json"
+
+    def __init__(self, input_folder, output_folder, png_compression=None, value_range=None,
+                 normalization="frame", percentiles=(0.1, 99.9), sample_frames=64, workers=1,
+                 max_in_flight=None, link_copies=True, session=None, write_frames=True):
+        if normalization not in NORMALIZATION_MODES:
+            raise ValueError(f"Unknown normalization '{normalization}', expected one of {NORMALIZATION_MODES}")
         self.input_folder = input_folder
         self.output_folder = output_folder
+        self.png_compression = png_compression
+        self.value_range = value_range
+        self.normalization = normalization
+        self.percentiles = (float(percentiles[0]), float(percentiles[1]))
+        self.sample_frames = max(1, int(sample_frames))
+        self.workers = max(1, int(workers))
+        self.max_in_flight = max(1, int(max_in_flight or self.workers * 2))
+        self.link_copies = link_copies
+        self.session = session
+        self.write_frames = write_frames
+        # (key, table) kept as one tuple so threads never see a table paired with another key
+        self._lut_cache = (None, None)
         self.should_stop = False
         os.makedirs(self.output_folder, exist_ok=True)
 
@@ -30,44 +84,227 @@ class BitDepthConverter:
             return 8
         return None
 
+    def build_lut(self, min_val, max_val):
+        min_val, max_val = int(min_val), int(max_val)
+        if max_val <= min_val:
+            return np.zeros(65536, dtype=np.uint8)
+        values = np.clip(np.arange(65536, dtype=np.float64), min_val, max_val)
+        return ((values - min_val) / (max_val - min_val) * 255.0).astype(np.uint8)
+
+    def lut_for(self, min_val, max_val):
+        key = (int(min_val), int(max_val))
+        cached_key, lut = self._lut_cache
+        if key != cached_key:
+            lut = self.build_lut(*key)
+            self._lut_cache = (key, lut)
+        return lut
+
     def convert_16bit_to_8bit(self, image):
-        min_val = np.min(image)
-        max_val = np.max(image)
-        return ((image - min_val) / (max_val - min_val) * 255.0).astype(np.uint8)
+        if self.value_range is not None:
+            min_val, max_val = self.value_range
+        else:
+            min_val = np.min(image)
+            max_val = np.max(image)
+        return self.lut_for(min_val, max_val)[image]
+
+    # Frames spread evenly over the sorted frame list, at most sample_frames of them
+    def sample_files(self, files):
+        if len(files) <= self.sample_frames:
+            return list(files)
+        indices = np.linspace(0, len(files) - 1, self.sample_frames).round().astype(int)
+        return [files[i] for i in sorted(set(indices))]
+
+    def stats_signature(self, files, sampled):
+        parts = [os.path.abspath(self.input_folder), str(self.percentiles), str(self.sample_frames)]
+        parts.extend(files)
+        for file in sampled:
+            path = os.path.join(self.input_folder, file)
+            if os.path.isfile(path):
+                stat = os.stat(path)
+                parts.append(f"{file}:{stat.st_size}:{stat.st_mtime_ns}")
+        return hash_bytes("\n".join(parts).encode("utf-8"))
+
+    def load_cached_range(self, signature):
+        path = os.path.join(self.output_folder, self.STATS_FILE)
+        if not os.path.isfile(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable stats file {path}: {e}")
+            return None
+        if data.get("signature") != signature:
+            return None
+        return tuple(data["range"])
+
+    def save_cached_range(self, signature, value_range, sampled_count):
+        path = os.path.join(self.output_folder, self.STATS_FILE)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "signature": signature,
+                "percentiles": list(self.percentiles),
+                "sampled_frames": sampled_count,
+                "range": list(value_range),
+            }, f, indent=1)
+        os.replace(tmp_path, path)
+
+    def frame_histogram(self, reader, file):
+        if self.should_stop:
+            return None
+        image = reader.read(file)
+        if self.check_bit_depth(image) != 16:
+            return None
+        # np.bincount converts its input to intp, so it runs over row tiles instead of the whole frame
+        rows = image.reshape(image.shape[0], -1)
+        histogram = np.zeros(65536, dtype=np.int64)
+        for start in range(0, len(rows), HISTOGRAM_TILE_ROWS):
+            histogram += np.bincount(rows[start:start + HISTOGRAM_TILE_ROWS].ravel(), minlength=65536)
+        return histogram
+
+    def percentile_range(self, histogram):
+        cdf = np.cumsum(histogram)
+        total = cdf[-1]
+        low = int(np.searchsorted(cdf, total * self.percentiles[0] / 100.0, side="right"))
+        high = int(np.searchsorted(cdf, total * self.percentiles[1] / 100.0, side="left"))
+        return low, max(low, high)
+
+    # Pass 1 of global normalization, returns the shared (low, high) range or None if no 16-bit frame was sampled
+    def global_range(self, files, reader):
+        files = sorted(files)
+        sampled = self.sample_files(files)
+        signature = self.stats_signature(files, sampled)
 
-    def __call__(self, extensions=(".tif", ".tiff", ".png", ".jpg", ".jpeg")):
-        files = [f for f in os.listdir(self.input_folder)
-                 if not f.startswith(".") and f.lower().endswith(extensions)]
+        cached = self.load_cached_range(signature)
+        if cached is not None:
+            print(f"Using cached global range {cached[0]}-{cached[1]} from {self.STATS_FILE}")
+            return cached
+
+        print(f"Sampling {len(sampled)} of {len(files)} frames for the global range")
+        histogram = np.zeros(65536, dtype=np.int64)
+        sampled_count = 0
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for frame_histogram in executor.map(lambda f: self.frame_histogram(reader, f), sampled):
+                if frame_histogram is not None:
+                    histogram += frame_histogram
+                    sampled_count += 1
+
+        if self.should_stop or sampled_count == 0:
+            return None
+
+        value_range = self.percentile_range(histogram)
+        print(f"Global range {value_range[0]}-{value_range[1]} "
+              f"({self.percentiles[0]}-{self.percentiles[1]} percentiles of {sampled_count} frames)")
+        self.save_cached_range(signature, value_range, sampled_count)
+        return value_range
+
+    def __call__(self, extensions=FRAME_EXTENSIONS):
+        reader = FrameReader(self.input_folder)
+        files = sorted(f for f in reader.list_frames(extensions) if not f.startswith("."))
 
         total_files = len(files)
         if total_files == 0:
             print("No image files found in:", self.input_folder)
             return
 
-        input_equals_output = os.path.abspath(self.input_folder) == os.path.abspath(self.output_folder)
-
-        for idx, file in enumerate(files, 1):
+        if self.normalization == "global" and self.value_range is None:
+            global_range = self.global_range(files, reader)
             if self.should_stop:
-                print(f"Stopping BitDepthConverter early at [{idx}/{total_files}]")
+                print("Stopping BitDepthConverter early while sampling the global range")
                 return
+            if global_range is not None:
+                self.value_range = global_range
 
-            input_path = os.path.join(self.input_folder, file)
-            output_path = os.path.join(self.output_folder, file)
+        writer = FrameWriter(self.output_folder, png_compression=self.png_compression)
+        try:
+            self.convert_files(files, reader, writer)
+        finally:
+            writer.close()
+            # Linked and copied frames bypass the FrameWriter
+            FolderIndex.invalidate(self.output_folder)
 
-            image = cv2.imread(input_path, cv2.IMREAD_UNCHANGED)
-            bit_depth = self.check_bit_depth(image)
+    # Returns the progress message and, when streaming to a session, the 8-bit frame
+    def convert_file(self, file, reader, writer):
+        input_path = os.path.join(self.input_folder, file)
+        output_path = os.path.join(self.output_folder, file)
+        input_equals_output = os.path.abspath(self.input_folder) == os.path.abspath(self.output_folder)
 
-            if bit_depth == 16:
-                image = self.convert_16bit_to_8bit(image)
-                cv2.imwrite(output_path, image)
-                print(f"[{idx}/{total_files}] Converted 16-bit to 8-bit: {file}")
+        image = reader.read(file)
+        bit_depth = self.check_bit_depth(image)
+        frame = image if self.session is not None and bit_depth == 8 else None
 
-            elif bit_depth == 8:
-                if not input_equals_output:
-                    shutil.copy2(input_path, output_path)
-                    print(f"[{idx}/{total_files}] Copied (already 8-bit): {file}")
+        if bit_depth == 16:
+            image = self.convert_16bit_to_8bit(image)
+            frame = image if self.session is not None else None
+            if not self.write_frames:
+                return f"Converted 16-bit to 8-bit (video only): {file}", frame
+            writer.write(file, image)
+            return f"Converted 16-bit to 8-bit: {file}", frame
+
+        elif bit_depth == 8:
+            if not self.write_frames:
+                return f"Already 8-bit (video only): {file}", frame
+            if not input_equals_output:
+                # Stacked frames live inside chunk files, so they are re-stacked rather than copied
+                if file.lower().endswith(STACK_EXTENSION):
+                    writer.write(file, image)
+                elif self.link_copies:
+                    if link_or_copy(input_path, output_path) == "linked":
+                        return f"Linked (already 8-bit): {file}", frame
                 else:
-                    print(f"[{idx}/{total_files}] Skipped copy (already 8-bit and/or same folder): {file}")
+                    # An output still hardlinked to the input by an earlier linking run is removed first,
+                    # copy2 refuses to copy a file onto itself
+                    break_hardlink(output_path)
+                    shutil.copy2(input_path, output_path)
+                return f"Copied (already 8-bit): {file}", frame
+            return f"Skipped copy (already 8-bit and/or same folder): {file}", frame
+
+        return f"Skipped (unsupported or unreadable): {file}", None
+
+    def frame_done(self, idx, total_files, result):
+        message, frame = result
+        print(f"[{idx}/{total_files}] {message}")
+        if frame is not None:
+            self.session.write(frame)
+
+    def convert_files(self, files, reader, writer):
+        total_files = len(files)
+
+        if self.workers == 1:
+            for idx, file in enumerate(files, 1):
+                if self.should_stop:
+                    print(f"Stopping BitDepthConverter early at [{idx}/{total_files}]")
+                    return
+                self.frame_done(idx, total_files, self.convert_file(file, reader, writer))
+            return
+
+        pending = deque()
+        next_idx = 0
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            while next_idx < total_files or pending:
+                while not self.should_stop and next_idx < total_files and len(pending) < self.max_in_flight:
+                    file = files[next_idx]
+                    next_idx += 1
+                    pending.append((next_idx, file, executor.submit(self.convert_file, file, reader, writer)))
+
+                if self.should_stop:
+                    # Frames still queued are dropped, frames already being converted are left to finish
+                    for *_, future in pending:
+                        future.cancel()
+
+                if not pending:
+                    break
+
+                idx, file, future = pending.popleft()
+                if future.cancelled():
+                    continue
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"[{idx}/{total_files}] Error converting {file}: {e}")
+                    continue
+                self.frame_done(idx, total_files, result)
 
-            else:
-                print(f"[{idx}/{total_files}] Skipped (unsupported or unreadable): {file}")
+        if self.should_stop:
+            print(f"Stopping BitDepthConverter early at [{next_idx}/{total_files}]")
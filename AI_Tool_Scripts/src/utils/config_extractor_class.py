@@ -1,5 +1,6 @@
 import os
 import json
+from utils.folder_index_class import FolderIndex
 
 # Class to extract configuration data from a folder containing image files and JSON config files.
 # Workflow:
@@ -53,16 +54,11 @@ class ConfigExtractor:
             self._config_data["Experiment/System Capture Time"] = data.get("Camera", {}).get("capture_time")
 
     def count_frames(self):
-        cnt = 0
-        files = os.listdir(self._folder_path)
-        for name in files:
-            if self.should_stop:
-                print("Stopping ConfigExtractor during count_frames()")
-                return
-            if name.lower().endswith(self.IMAGE_EXTENSIONS):
-                if os.path.isfile(os.path.join(self._folder_path, name)):
-                    cnt += 1
-        self._num_frames = cnt
+        if self.should_stop:
+            print("Stopping ConfigExtractor during count_frames()")
+            return
+        index = FolderIndex.get(self._folder_path)
+        self._num_frames = len(index.names(self.IMAGE_EXTENSIONS, include_hidden=True))
 
     def flashing_frames(self):
         if self.should_stop:
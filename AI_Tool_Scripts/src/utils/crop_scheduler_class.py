@@ -0,0 +1,155 @@
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from utils.frame_io_class import FrameReader, FrameWriter, FRAME_EXTENSIONS
+from utils.dish_locator_class import DishLocator
+
+# Class to run several PetriDishCropperCircle jobs on one shared, bounded pool of worker threads
+# Workflow:
+# 1. Initialize the class with the number of worker threads and the cap on frames in flight across all jobs.
+# 2. add() a cropper per folder, locate=True finds its dish with DishLocator before cropping starts.
+# 3. run() lists every job's frames, then keeps at most max_in_flight frames submitted, taking the next frame
+#    from each unfinished job in turn (round robin) so every folder progresses at the same rate.
+# 4. Progress is printed per frame, aggregate throughput (frames/s, MB/s read) every report_interval seconds
+#    and once more at the end together with the time each folder took.
+
+# Notes:
+# One scheduler replaces one thread per folder, so ten folders no longer mean ten threads thrashing the disk.
+# Per-job cancel: cropper.stop() drops that job's remaining frames, the other jobs carry on.
+# stop() cancels every job. Frames already being cropped are left to finish.
+# MB/s counts the size of the input files read (decoded size for frames inside a frame stack).
+
+class CropJob:
+    def __init__(self, cropper, locate=False, extensions=FRAME_EXTENSIONS):
+        self.cropper = cropper
+        self.locate = locate
+        self.extensions = extensions
+        self.files = []
+        self.next_idx = 0
+        self.done = 0
+        self.reader = None
+        self.writer = None
+        self.start_time = None
+        self.elapsed = 0.0
+
+    def has_next(self):
+        return not self.cropper.should_stop and self.next_idx < len(self.files)
+
+
+class CropScheduler:
+    def __init__(self, workers=None, max_in_flight=None, report_interval=5.0):
+        self.workers = max(1, int(workers or min(4, os.cpu_count() or 1)))
+        self.max_in_flight = max(1, int(max_in_flight or self.workers * 2))
+        self.report_interval = report_interval
+        self.jobs = []
+        self.frames_done = 0
+        self.bytes_read = 0
+        self.should_stop = False
+
+    def add(self, cropper, locate=False, extensions=FRAME_EXTENSIONS):
+        job = CropJob(cropper, locate, extensions)
+        self.jobs.append(job)
+        return job
+
+    def stop(self):
+        self.should_stop = True
+        for job in self.jobs:
+            job.cropper.stop()
+
+    def prepare(self, job):
+        cropper = job.cropper
+        if job.locate:
+            dish = DishLocator(cropper.input_folder)()
+            if dish is None:
+                dish = (2028, 1420, 1200)
+                print(f"Using the default dish {dish} for {cropper.input_folder}")
+            cropper.center = (dish[0], dish[1])
+            cropper.radius = dish[2]
+
+        job.reader = FrameReader(cropper.input_folder)
+        job.files = job.reader.list_frames(job.extensions)
+        if not job.files:
+            print("No images found in", cropper.input_folder)
+            return
+        job.writer = FrameWriter(cropper.output_folder, png_compression=cropper.png_compression)
+
+    def crop_one(self, job, filename):
+        path = os.path.join(job.cropper.input_folder, filename)
+        size = os.path.getsize(path) if os.path.isfile(path) else 0
+        message = job.cropper.crop_file(filename, job.reader, job.writer)
+        return message, size
+
+    # Next job with frames left, starting after the last job served
+    def next_job(self, start):
+        count = len(self.jobs)
+        for step in range(count):
+            job = self.jobs[(start + step) % count]
+            if job.has_next():
+                return (start + step) % count, job
+        return start, None
+
+    def report(self, start_time):
+        elapsed = max(time.time() - start_time, 1e-9)
+        print(f"Throughput: {self.frames_done / elapsed:.1f} frames/s, "
+              f"{self.bytes_read / elapsed / 1e6:.1f} MB/s ({self.frames_done} frames in {elapsed:.1f}s)")
+
+    def run(self):
+        for job in self.jobs:
+            if self.should_stop:
+                break
+            if not job.cropper.should_stop:
+                self.prepare(job)
+
+        start_time = time.time()
+        last_report = start_time
+        pending = deque()
+        turn = 0
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            while True:
+                while len(pending) < self.max_in_flight:
+                    turn, job = self.next_job(turn)
+                    if job is None:
+                        break
+                    filename = job.files[job.next_idx]
+                    job.next_idx += 1
+                    if job.start_time is None:
+                        job.start_time = time.time()
+                    pending.append((job, job.next_idx, filename, executor.submit(self.crop_one, job, filename)))
+                    turn += 1
+
+                for job, _, _, future in pending:
+                    if job.cropper.should_stop:
+                        future.cancel()
+
+                if not pending:
+                    break
+
+                job, idx, filename, future = pending.popleft()
+                if not future.cancelled():
+                    folder_name = os.path.basename(job.cropper.input_folder.rstrip("/"))
+                    try:
+                        message, size = future.result()
+                        self.bytes_read += size
+                        self.frames_done += 1
+                        print(f"{folder_name} [{idx}/{len(job.files)}] {message}")
+                    except Exception as e:
+                        print(f"{folder_name} Skipping {filename} due to error: {e}")
+                    job.done += 1
+                job.elapsed = time.time() - job.start_time
+
+                if time.time() - last_report >= self.report_interval:
+                    self.report(start_time)
+                    last_report = time.time()
+
+        for job in self.jobs:
+            if job.writer is not None:
+                job.writer.close()
+            if job.cropper.should_stop and job.files:
+                print(f"Stopped cropping {job.cropper.input_folder} at {job.done}/{len(job.files)} files")
+
+        self.report(start_time)
+        return [(job.cropper.input_folder, job.elapsed) for job in self.jobs]
+
+    def __call__(self):
+        return self.run()
@@ -1,8 +1,13 @@
+import io
 import os
 import json
+import shutil
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-from math import sqrt, atan2, degrees
+from utils.folder_index_class import FolderIndex
+from utils.larvae_plotter_class import LarvaePlotter, DATA_COLUMNS, PLOT_COLORS
 
 # Class used to extract data from a folder containing image files and JSON config files.
 # Features:
@@ -14,12 +19,78 @@ from math import sqrt, atan2, degrees
 # 6. Provide methods to handle data export and visualization/plotting import per individual larvae.
 # 7. Provide methods to stop the data extraction process if needed.
 
+# Notes:
+# The tracking table is written as a typed main_data.parquet (or main_data.feather) with int32 frame/ID columns,
+# downstream steps read it with read_tracks() and can load only the columns they need.
+# The experiment config (the config rows, resolution, framerate, flashing frames) goes to main_data_config.json.
+# main_data.csv with the config rows followed by the "Larvae Data" section is an optional human readable export
+# (write_csv=True, the default). Without pyarrow no table can be written and main_data.csv is always written.
+# The table stays in memory as self.tracks, larvae_data_exporter splits it with one groupby instead of reading
+# main_data.csv back and filtering it once per object.
+# Plots are drawn by LarvaePlotter (Agg, no pyplot), plot_larvae() plots every larva in one call on a process pool.
+
+TRACKS_NAME = "main_data"
+TRACK_TABLE_FORMATS = ("parquet", "feather")
+CONFIG_SIDECAR = "main_data_config.json"
+LARVAE_DATASET = "larvae_tracks.parquet"
+HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
+
+
+# Tracking table written by final_data_to_csv in folder, Parquet before Feather, None if there is neither
+# (or pyarrow is missing and it could not be read)
+def find_tracks_table(folder):
+    if not HAS_PYARROW:
+        return None
+    for table_format in TRACK_TABLE_FORMATS:
+        path = os.path.join(folder, f"{TRACKS_NAME}.{table_format}")
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+# Larvae Data section of a main_data.csv, None if the section is missing
+def read_csv_tracks(csv_path):
+    with open(csv_path, "r", encoding="utf-8") as f:
+        lines = f.readlines()
+
+    start_idx = None
+    for i, line in enumerate(lines):
+        if line.strip().startswith("Larvae Data"):
+            start_idx = i
+            break
+
+    if start_idx is None or start_idx + 1 >= len(lines):
+        print("Larvae Data section not found or invalid.")
+        return None
+
+    df = pd.read_csv(csv_path, skiprows=start_idx + 1)
+    df.dropna(axis=1, how='all', inplace=True)
+    df.columns = df.columns.str.strip().str.replace('"', '').str.replace("'", "")
+    return df
+
+
+# Tracking data from a Parquet/Feather table, the partitioned larvae dataset or a main_data.csv.
+# columns loads only those columns of a table, object_id only that object's rows of a Parquet table or dataset.
+def read_tracks(path, columns=None, object_id=None):
+    if path.endswith(".parquet"):
+        filters = [("object ID", "==", object_id)] if object_id is not None else None
+        return pd.read_parquet(path, columns=columns, filters=filters)
+    if path.endswith(".feather"):
+        return pd.read_feather(path, columns=columns)
+    df = read_csv_tracks(path)
+    if df is None or columns is None:
+        return df
+    return df[columns]
+
+
 class DataExtractor:
     def __init__(self, input_path, output_path):
         self.input_path = input_path
         self.output_path = output_path
         self.stop_flag = False
         self.rows = []
+        self.tracks = None
+        self.plotter = None
         self._config_data = {}
         self._flashing_frames = []
         self._width = 1
@@ -27,15 +98,12 @@ class DataExtractor:
         self._framerate = 1.0
         self.label_dir = os.path.join(self.output_path, "labels")
 
-        self.plot_colors = {
-            "speed": "blue",
-            "direction": "green",
-            "distance": "orange",
-            "trajectory": "purple"
-        }
+        self.plot_colors = dict(PLOT_COLORS)
 
     def stop(self):
         self.should_stop = True
+        if self.plotter is not None:
+            self.plotter.stop()
     
     def read_json_file(self, file_path):
         if not os.path.exists(file_path):
@@ -104,170 +172,288 @@ class DataExtractor:
         end_frame = start_frame + int(length * fps) - 1 if length > 0 else start_frame
         self._flashing_frames = [f"{i:05d}" for i in range(start_frame, end_frame + 1)]
 
-    def basic_parameters(self, df):
+    # Speed, direction and accumulated distance of every object in one vectorized pass over the whole table.
+    # Steps are taken between consecutive rows of an object sorted by frame, the first row of an object gets 0.
+    # gap_aware divides each step by the number of frames it spans, so a larva that was not detected for a few
+    # frames does not get the whole distance as the speed of a single frame.
+    # The derived columns are computed in float64 even when the coordinates are stored as float32.
+    def basic_parameters(self, df, gap_aware=True):
         df["Midpoint x centre"] = df["x centre"]
         df["Midpoint y centre"] = df["y centre"]
         df["Speed"] = 0.0
         df["Direction"] = 0.0
         df["Distance"] = 0.0
-        df["Position x"] = df["x centre"] * self._width
-        df["Position y"] = df["y centre"] * self._height
-
-        grouped = df.groupby("object ID", group_keys=False)
-        all_groups = []
-
-        for _, group in grouped:
-            group = group.sort_values("Frame").copy()
-            speeds, directions, distances = [0], [0], [0]
-            total_dist = 0
-
-            for i in range(1, len(group)):
-                dx = group.iloc[i]["x centre"] - group.iloc[i - 1]["x centre"]
-                dy = group.iloc[i]["y centre"] - group.iloc[i - 1]["y centre"]
-                dist = sqrt(dx**2 + dy**2)
-                angle = degrees(atan2(dy, dx))
+        df["Position x"] = df["x centre"].astype(np.float64) * self._width
+        df["Position y"] = df["y centre"].astype(np.float64) * self._height
+
+        df = df.sort_values(["object ID", "Frame"], kind="stable")
+        object_ids = df["object ID"]
+        dx = df["x centre"].astype(np.float64).groupby(object_ids, sort=False).diff()
+        dy = df["y centre"].astype(np.float64).groupby(object_ids, sort=False).diff()
+        step = np.hypot(dx, dy)
+
+        speed = step * self._framerate
+        if gap_aware:
+            frame_delta = pd.to_numeric(df["Frame"]).groupby(object_ids, sort=False).diff()
+            speed = speed / frame_delta.where(frame_delta > 0, 1)
+
+        df["Speed"] = speed.fillna(0.0)
+        df["Direction"] = np.degrees(np.arctan2(dy, dx)).fillna(0.0)
+        df["Distance"] = step.fillna(0.0).groupby(object_ids, sort=False).cumsum()
+        return df
+
+    # Frame number of a label file, from its "frame_<number>" name or else the 5 characters before ".txt"
+    def label_frame(self, filename, entry):
+        if entry.frame is not None:
+            return entry.frame
+        digits = filename[-9:-4]
+        return int(digits) if digits.isdigit() else None
+
+    # Rows of one label file as an (n, 6) float array: class, x, y, w, h, object ID.
+    # np.loadtxt parses a well formed file in one call, a file with short or broken lines falls back to
+    # parsing line by line and skipping the bad lines.
+    def parse_label_text(self, text):
+        if not text.strip():
+            return np.empty((0, 6))
+        try:
+            return np.loadtxt(io.StringIO(text), usecols=range(6), ndmin=2)
+        except ValueError:
+            pass
+        rows = []
+        for line in text.splitlines():
+            parts = line.split()
+            if len(parts) >= 6:
+                try:
+                    rows.append([float(part) for part in parts[:6]])
+                except ValueError:
+                    continue
+        return np.array(rows, dtype=np.float64).reshape(-1, 6)
+
+    def read_label_file(self, path):
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            return self.parse_label_text(f.read())
+
+    # All label files of label_dir as one typed table, read on a thread pool and kept in file name order.
+    # Flashing is 1 for rows whose frame is one of the flashing frames (one np.isin over the frame column).
+    def load_labels(self, workers=None):
+        columns = ["Class ID", "x centre", "y centre", "width", "height", "object ID", "Frame", "Flashing"]
+        files = []
+        if os.path.exists(self.label_dir):
+            index = FolderIndex.get(self.label_dir)
+            for filename in sorted(index.names((".txt",), include_hidden=True)):
+                frame = self.label_frame(filename, index.entry(filename))
+                if frame is None:
+                    print(f"Skipping {filename}: no frame number in its name")
+                    continue
+                files.append((os.path.join(self.label_dir, filename), frame))
+
+        if not files:
+            return pd.DataFrame(columns=columns)
+
+        workers = max(1, int(workers or min(32, (os.cpu_count() or 1) + 4)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            tables = list(executor.map(self.read_label_file, [path for path, _ in files]))
+
+        values = np.concatenate(tables)
+        frames = np.repeat(np.array([frame for _, frame in files], dtype=np.int32), [len(t) for t in tables])
+        flashing = np.array([int(frame) for frame in self._flashing_frames], dtype=np.int32)
+
+        return pd.DataFrame({
+            "Class ID": values[:, 0].astype(np.int32),
+            "x centre": values[:, 1].astype(np.float32),
+            "y centre": values[:, 2].astype(np.float32),
+            "width": values[:, 3].astype(np.float32),
+            "height": values[:, 4].astype(np.float32),
+            "object ID": values[:, 5].astype(np.int32),
+            "Frame": frames,
+            "Flashing": np.isin(frames, flashing).astype(np.int8),
+        })
+
+    def config_sidecar(self):
+        return {
+            "width": self._width,
+            "height": self._height,
+            "framerate": self._framerate,
+            "flashing_frames": [int(frame) for frame in self._flashing_frames],
+            "camera": self._config_data.get("Camera", {}),
+            "optogenetic_leds": self._config_data.get("Optogenetic_LEDs", {}),
+            "config_rows": self.rows,
+        }
 
-                speeds.append(dist * self._framerate)
-                directions.append(angle)
-                total_dist += dist
-                distances.append(total_dist)
+    def write_config_sidecar(self):
+        path = os.path.join(self.output_path, CONFIG_SIDECAR)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.config_sidecar(), f, indent=1)
+        return path
+
+    # Typed tracking table, a table left from a run with the other format is removed so readers never pick it up
+    def write_tracks(self, df, table_format):
+        path = os.path.join(self.output_path, f"{TRACKS_NAME}.{table_format}")
+        df = df.reset_index(drop=True)
+        if table_format == "parquet":
+            df.to_parquet(path, index=False)
+        else:
+            df.to_feather(path)
+        self.remove_stale_tables(keep=table_format)
+        print(f"Saved tracking table: {path}")
+        return path
+
+    def remove_stale_tables(self, keep=None):
+        for table_format in TRACK_TABLE_FORMATS:
+            stale = os.path.join(self.output_path, f"{TRACKS_NAME}.{table_format}")
+            if table_format != keep and os.path.isfile(stale):
+                os.remove(stale)
+
+    def write_csv(self, df):
+        rows = list(self.rows)
+        if not df.empty:
+            df = df.copy()
+            # The CSV keeps the zero padded frame numbers of the label file names, and float32 columns are written
+            # with their own shortest repr instead of widened to float64 digits
+            df["Frame"] = df["Frame"].map("{:05d}".format)
+            for column in df.columns[df.dtypes == np.float32]:
+                df[column] = df[column].astype(str)
+            rows.append(["Larvae Data", ""])
+            rows.append(list(df.columns))
+            for row in df.itertuples(index=False):
+                rows.append(list(row))
 
-            group["Speed"] = speeds
-            group["Direction"] = directions
-            group["Distance"] = distances
-            all_groups.append(group)
+        output_file = os.path.join(self.output_path, f"{TRACKS_NAME}.csv")
+        pd.DataFrame(rows).to_csv(output_file, index=False, header=False)
+        return output_file
 
-        return pd.concat(all_groups).sort_values(["object ID", "Frame"])
+    def final_data_to_csv(self, write_csv=True, table_format="parquet"):
+        if table_format not in TRACK_TABLE_FORMATS:
+            raise ValueError(f"Unknown table format '{table_format}', expected one of {TRACK_TABLE_FORMATS}")
 
-    def final_data_to_csv(self):
         self.extract_and_build_config_rows()
-        data = []
-
-        if os.path.exists(self.label_dir):
-            for filename in sorted(os.listdir(self.label_dir)):
-                if filename.endswith(".txt"):
-                    frame_str = filename[-9:-4]
-                    flashing_flag = "1" if frame_str in self._flashing_frames else "0"
-                    file_path = os.path.join(self.label_dir, filename)
-
-                    with open(file_path, "r", encoding="utf-8", errors="replace") as f:
-                        for line in f:
-                            parts = line.strip().split()
-                            if len(parts) >= 6:
-                                try:
-                                    data.append([
-                                        int(float(parts[0])),
-                                        float(parts[1]), float(parts[2]),
-                                        float(parts[3]), float(parts[4]),
-                                        int(float(parts[5])),
-                                        frame_str,
-                                        flashing_flag
-                                    ])
-                                except ValueError:
-                                    continue
-
-        if data:
-            columns = ["Class ID", "x centre", "y centre", "width", "height", "object ID", "Frame", "Flashing"]
-            df = pd.DataFrame(data, columns=columns)
+        df = self.load_labels()
+        if not df.empty:
             df = self.basic_parameters(df)
-            self.rows.append(["Larvae Data", ""])
-            self.rows.append(list(df.columns))
-            for row in df.itertuples(index=False):
-                self.rows.append(list(row))
-
-        output_file = os.path.join(self.output_path, "main_data.csv")
-        pd.DataFrame(self.rows).to_csv(output_file, index=False, header=False)
-
-    def larvae_data_exporter(self, main_csv_path, larvae_folder_path):
-        if not os.path.exists(main_csv_path):
-            print(f"{main_csv_path} not found.")
-            return
-
+        self.tracks = df
+
+        self.write_config_sidecar()
+        if HAS_PYARROW:
+            self.write_tracks(df, table_format)
+        else:
+            self.remove_stale_tables()
+            if not write_csv:
+                print("pyarrow is not installed, writing the tracking table to main_data.csv instead")
+                write_csv = True
+        if write_csv:
+            self.write_csv(df)
+
+    # Tracking data for the exporter: the table kept in memory by final_data_to_csv when the path points into
+    # this extractor's output folder, otherwise read from the tracking table or main_data.csv at the path
+    def tracks_for(self, path):
+        if self.tracks is not None and os.path.abspath(os.path.dirname(path)) == os.path.abspath(self.output_path):
+            return self.tracks
+        if path.endswith(".csv"):
+            path = find_tracks_table(os.path.dirname(path)) or path
+        if not os.path.exists(path):
+            print(f"{path} not found.")
+            return None
         try:
-            with open(main_csv_path, "r", encoding="utf-8") as f:
-                lines = f.readlines()
-
-            start_idx = None
-            for i, line in enumerate(lines):
-                if line.strip().startswith("Larvae Data"):
-                    start_idx = i
-                    break
-
-            if start_idx is None or start_idx + 1 >= len(lines):
-                print("Larvae Data section not found or invalid.")
-                return
-
-            df = pd.read_csv(main_csv_path, skiprows=start_idx + 1)
-            df.dropna(axis=1, how='all', inplace=True)
-
-            df.columns = df.columns.str.strip().str.replace('"', '').str.replace("'", "")
-
-            if "object ID" not in df.columns:
-                print("No object ID column in CSV.")
-                return
-
+            return read_tracks(path)
         except Exception as e:
-            print(f"Failed to read {main_csv_path}: {e}")
+            print(f"Failed to read {path}: {e}")
+            return None
+
+    def export_larva(self, object_id, df_obj, larvae_folder_path):
+        out_folder = os.path.join(larvae_folder_path, f"larvae_{object_id}")
+        os.makedirs(out_folder, exist_ok=True)
+        out_csv = os.path.join(out_folder, f"{object_id}_main_data.csv")
+        df_obj.to_csv(out_csv, index=False)
+        return out_csv
+
+    # One dataset partitioned by object ID instead of a CSV per larva, a previous dataset is replaced as a whole
+    # since pyarrow would otherwise add new files next to the old ones
+    def export_partitioned(self, df, larvae_folder_path):
+        path = os.path.join(larvae_folder_path, LARVAE_DATASET)
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        os.makedirs(larvae_folder_path, exist_ok=True)
+        df.reset_index(drop=True).to_parquet(path, partition_cols=["object ID"], index=False)
+        print(f"Saved: {path} ({df['object ID'].nunique()} objects)")
+        return path
+
+    # Splits the tracking data with one groupby and writes the per larva CSVs on a thread pool,
+    # partitioned=True writes a single Parquet dataset partitioned by object ID instead (needs pyarrow)
+    def larvae_data_exporter(self, main_csv_path, larvae_folder_path, partitioned=False, workers=None):
+        df = self.tracks_for(main_csv_path)
+        if df is None:
             return
-
-        for object_id in df["object ID"].unique():
-            df_obj = df[df["object ID"] == object_id].copy()
-            out_folder = os.path.join(larvae_folder_path, f"larvae_{object_id}")
-            os.makedirs(out_folder, exist_ok=True)
-            out_csv = os.path.join(out_folder, f"{object_id}_main_data.csv")
-            df_obj.to_csv(out_csv, index=False)
-            print(f"Saved: {out_csv}")
-
-    def larvae_data_plotter(self, larvae_csv_path, output_folder_path):
-        if not os.path.exists(larvae_csv_path):
-            print(f"{larvae_csv_path} not found.")
+        if "object ID" not in df.columns:
+            print("No object ID column in tracking data.")
             return
 
+        if partitioned:
+            if HAS_PYARROW:
+                return self.export_partitioned(df, larvae_folder_path)
+            print("pyarrow is not installed, writing one CSV per larva instead of a partitioned dataset")
+
+        workers = max(1, int(workers or min(8, os.cpu_count() or 1)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(self.export_larva, object_id, df_obj, larvae_folder_path)
+                       for object_id, df_obj in df.groupby("object ID", sort=False)]
+            for future in futures:
+                try:
+                    print(f"Saved: {future.result()}")
+                except Exception as e:
+                    print(f"Failed to export a larva: {e}")
+
+    def read_larva_csv(self, larvae_csv_path):
         try:
             df = pd.read_csv(larvae_csv_path)
             df.columns = df.columns.str.strip().str.replace('"', '').str.replace("'", "")
         except Exception as e:
             print(f"Failed to read {larvae_csv_path}: {e}")
-            return
+            return None
 
-        required_cols = {"Distance", "Speed", "Direction", "Midpoint x centre", "Midpoint y centre", "Frame"}
-        if not required_cols.issubset(df.columns):
+        if not set(DATA_COLUMNS).issubset(df.columns):
             print(f"Missing required data columns for plotting in {larvae_csv_path}")
-            return
-
-        object_id = os.path.basename(larvae_csv_path).split("_")[0]
-        framerate = self.get_framerate()
+            return None
+        return {column: df[column].to_numpy() for column in DATA_COLUMNS}
 
-        df["Time (s)"] = df["Frame"].astype(float) / framerate
-
-        fig, axs = plt.subplots(1, 4, figsize=(22, 5))
-
-        axs[0].plot(df["Time (s)"], df["Speed"], color=self.plot_colors["speed"])
-        axs[0].set_title(f"Object {object_id} – Speed vs Time")
-        axs[0].set_xlabel("Time (s)")
-        axs[0].set_ylabel("Speed (pixels/sec)")
-
-        axs[1].plot(df["Time (s)"], df["Direction"], color=self.plot_colors["direction"])
-        axs[1].set_title(f"Object {object_id} – Direction vs Time")
-        axs[1].set_xlabel("Time (s)")
-        axs[1].set_ylabel("Direction (degrees)")
-
-        axs[2].plot(df["Time (s)"], df["Distance"], color=self.plot_colors["distance"])
-        axs[2].set_title(f"Object {object_id} – Accumulated Distance vs Time")
-        axs[2].set_xlabel("Time (s)")
-        axs[2].set_ylabel("Distance (pixels)")
+    def larvae_data_plotter(self, larvae_csv_path, output_folder_path):
+        if not os.path.exists(larvae_csv_path):
+            print(f"{larvae_csv_path} not found.")
+            return
 
-        axs[3].plot(df["Midpoint x centre"], df["Midpoint y centre"], color=self.plot_colors["trajectory"])
-        axs[3].set_title(f"Object {object_id} – Midpoint Trajectory")
-        axs[3].set_xlabel("x position (normalized)")
-        axs[3].set_ylabel("y position (normalized)")
+        data = self.read_larva_csv(larvae_csv_path)
+        if data is None:
+            return
 
-        plt.tight_layout()
+        object_id = os.path.basename(larvae_csv_path).split("_")[0]
         plot_path = os.path.join(output_folder_path, f"{object_id}_larvae_data_plot.png")
-        plt.savefig(plot_path)
-        plt.close()
+        LarvaePlotter(self.get_framerate(), self.plot_colors).save(object_id, data, plot_path)
         print(f"Plot saved to: {plot_path}")
 
+    # Plots every larva of the experiment, from the in-memory tracking table when there is one, otherwise from
+    # the per larva CSVs written by larvae_data_exporter. See larvae_plotter_class.py for the formats.
+    def plot_larvae(self, larvae_folder_path, output_format="png", workers=None):
+        if self.tracks is not None and not self.tracks.empty:
+            larvae = [(object_id, {column: df_obj[column].to_numpy() for column in DATA_COLUMNS})
+                      for object_id, df_obj in self.tracks.groupby("object ID", sort=True)]
+        else:
+            larvae = []
+            for folder in sorted(os.listdir(larvae_folder_path)):
+                object_id = folder.split("_")[-1]
+                larvae_csv_path = os.path.join(larvae_folder_path, folder, f"{object_id}_main_data.csv")
+                if folder.startswith("larvae_") and os.path.isfile(larvae_csv_path):
+                    data = self.read_larva_csv(larvae_csv_path)
+                    if data is not None:
+                        larvae.append((object_id, data))
+
+        if not larvae:
+            print(f"No larvae data to plot in {larvae_folder_path}")
+            return []
+
+        workers = max(1, int(workers or min(8, (os.cpu_count() or 2) - 1)))
+        self.plotter = LarvaePlotter(self.get_framerate(), self.plot_colors, workers=workers,
+                                     output_format=output_format)
+        return self.plotter.plot_all(larvae, larvae_folder_path)
+
     def get_width(self):
         return self._width
 
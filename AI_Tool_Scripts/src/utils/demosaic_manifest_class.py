@@ -0,0 +1,97 @@
+import os
+import json
+import hashlib
+
+# Helper class to keep a per-output-folder record of which raw frames have already been converted
+# Workflow:
+# 1. Initialize the class with the output folder and the settings the frames are converted with.
+# 2. Load the existing manifest, if the settings differ every recorded frame is treated as stale.
+# 3. is_current() checks a source file against its record: size first, then mtime, then content hash.
+# 4. record() stores size, mtime and content hash of a source once its frame has been written.
+# 5. save() writes the manifest atomically so a crash never leaves a half written file behind.
+
+# Notes:
+# The manifest is a hidden JSON file so JsonCopier and the image listing classes skip it.
+# A source whose mtime changed but whose content hash still matches (e.g. copied to a new drive) is kept
+# and its mtime refreshed, only real content changes cause a frame to be converted again.
+# Hashes are BLAKE2b of the raw file bytes.
+
+def hash_bytes(data):
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def hash_file(path, block_size=1 << 20):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class DemosaicManifest:
+    FILE_NAME = ".demosaic_manifest.json"
+
+    def __init__(self, output_folder, settings):
+        self.output_folder = output_folder
+        self.path = os.path.join(output_folder, self.FILE_NAME)
+        self.settings = settings
+        self.frames = {}
+        self.dirty = False
+        self.unsaved_records = 0
+        self.load()
+
+    def load(self):
+        if not os.path.isfile(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable manifest {self.path}: {e}")
+            return
+
+        if data.get("settings") != self.settings:
+            print(f"Demosaic settings changed since the last run in {self.output_folder}, all frames will be redone")
+            self.dirty = True
+            return
+        self.frames = data.get("frames", {})
+
+    def is_current(self, source_path, output_name, stat=None):
+        entry = self.frames.get(output_name)
+        if entry is None or entry.get("source") != os.path.basename(source_path):
+            return False
+
+        stat = stat or os.stat(source_path)
+        if stat.st_size != entry.get("size"):
+            return False
+        if stat.st_mtime_ns == entry.get("mtime_ns"):
+            return True
+
+        try:
+            if hash_file(source_path) != entry.get("hash"):
+                return False
+        except OSError:
+            return False
+        entry["mtime_ns"] = stat.st_mtime_ns
+        self.dirty = True
+        return True
+
+    def record(self, source_path, output_name, stat, content_hash):
+        self.frames[output_name] = {
+            "source": os.path.basename(source_path),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "hash": content_hash,
+        }
+        self.dirty = True
+        self.unsaved_records += 1
+
+    def save(self):
+        if not self.dirty:
+            return
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"settings": self.settings, "frames": dict(sorted(self.frames.items()))}, f, indent=1)
+        os.replace(tmp_path, self.path)
+        self.dirty = False
+        self.unsaved_records = 0
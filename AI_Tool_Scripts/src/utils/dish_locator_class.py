@@ -0,0 +1,150 @@
+import os
+import json
+import cv2
+import numpy as np
+from utils.frame_io_class import FrameReader, FRAME_EXTENSIONS
+from utils.demosaic_manifest_class import hash_bytes
+
+# Class to find the petri dish (center and radius) in a folder of frames without user input
+# Workflow:
+# 1. Initialize the class with the input folder, how many frames to sample and the working resolution.
+# 2. Read sample_frames frames spread evenly over the folder as grayscale.
+# 3. Downscale them so the longest side is max_side pixels and take their per-pixel median,
+#    which removes the moving larvae and LED flashes and leaves the static dish.
+# 4. Fit the dish with a Hough circle transform, if no circle is found fall back to the minimum enclosing
+#    circle of the largest bright contour.
+# 5. Scale the circle back to full resolution and cache it in the input folder.
+
+# Notes:
+# The cache is a hidden .dish_location.json keyed by the sampled frame names and their size/mtime, so a
+# folder is only analysed once. An unwritable input folder just means the result is not cached.
+# Returns (centerX, centerY, radius) in full resolution pixels, or None if no dish could be found.
+
+class DishLocator:
+    CACHE_FILE = ".dish_location.json"
+
+    def __init__(self, input_folder, sample_frames=5, max_side=512):
+        self.input_folder = input_folder
+        self.sample_frames = max(1, int(sample_frames))
+        self.max_side = int(max_side)
+
+    def sample_files(self, files):
+        files = sorted(files)
+        if len(files) <= self.sample_frames:
+            return files
+        indices = np.linspace(0, len(files) - 1, self.sample_frames).round().astype(int)
+        return [files[i] for i in sorted(set(indices))]
+
+    def signature(self, sampled):
+        parts = [str(self.sample_frames), str(self.max_side)]
+        for file in sampled:
+            path = os.path.join(self.input_folder, file)
+            if os.path.isfile(path):
+                stat = os.stat(path)
+                parts.append(f"{file}:{stat.st_size}:{stat.st_mtime_ns}")
+            else:
+                parts.append(file)
+        return hash_bytes("\n".join(parts).encode("utf-8"))
+
+    def load_cached(self, signature):
+        path = os.path.join(self.input_folder, self.CACHE_FILE)
+        if not os.path.isfile(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get("signature") != signature:
+            return None
+        return tuple(data["dish"])
+
+    def save_cached(self, signature, dish):
+        path = os.path.join(self.input_folder, self.CACHE_FILE)
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"signature": signature, "dish": list(dish)}, f, indent=1)
+        except OSError as e:
+            print(f"Could not cache dish location in {self.input_folder}: {e}")
+
+    def to_gray_8bit(self, image):
+        if image.ndim == 3:
+            image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        if image.dtype != np.uint8:
+            image = cv2.normalize(image, None, 0, 255, cv2.NORM_MINMAX).astype(np.uint8)
+        return image
+
+    def median_frame(self, reader, sampled):
+        small = []
+        scale = 1.0
+        for file in sampled:
+            image = reader.read(file)
+            if image is None:
+                continue
+            gray = self.to_gray_8bit(image)
+            scale = min(1.0, self.max_side / max(gray.shape[:2]))
+            if scale < 1.0:
+                gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            if small and gray.shape != small[0].shape:
+                continue
+            small.append(gray)
+        if not small:
+            return None, scale
+        return np.median(np.stack(small), axis=0).astype(np.uint8), scale
+
+    def fit_hough(self, median):
+        h, w = median.shape
+        blurred = cv2.GaussianBlur(median, (5, 5), 0)
+        circles = cv2.HoughCircles(
+            blurred, cv2.HOUGH_GRADIENT, dp=1, minDist=max(h, w),
+            param1=100, param2=30, minRadius=min(h, w) // 4, maxRadius=max(h, w) // 2
+        )
+        if circles is None:
+            return None
+        x, y, r = circles[0][0]
+        return float(x), float(y), float(r)
+
+    def fit_contour(self, median):
+        blurred = cv2.GaussianBlur(median, (5, 5), 0)
+        _, binary = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        if not contours:
+            return None
+        (x, y), r = cv2.minEnclosingCircle(max(contours, key=cv2.contourArea))
+        return float(x), float(y), float(r)
+
+    def locate(self, extensions=FRAME_EXTENSIONS):
+        reader = FrameReader(self.input_folder)
+        files = [f for f in reader.list_frames(extensions) if not f.startswith(".")]
+        if not files:
+            print("No images found in", self.input_folder)
+            return None
+
+        sampled = self.sample_files(files)
+        signature = self.signature(sampled)
+        cached = self.load_cached(signature)
+        if cached is not None:
+            print(f"Using cached dish location {cached} for {self.input_folder}")
+            return cached
+
+        median, scale = self.median_frame(reader, sampled)
+        if median is None:
+            print("Could not read any sample frame in", self.input_folder)
+            return None
+
+        circle = self.fit_hough(median)
+        method = "Hough circle"
+        if circle is None:
+            circle = self.fit_contour(median)
+            method = "contour fit"
+        if circle is None:
+            print("No dish found in", self.input_folder)
+            return None
+
+        dish = tuple(int(round(v / scale)) for v in circle)
+        print(f"Located dish at X={dish[0]} Y={dish[1]} R={dish[2]} ({method} on {len(sampled)} frames)")
+        self.save_cached(signature, dish)
+        return dish
+
+    def __call__(self, extensions=FRAME_EXTENSIONS):
+        return self.locate(extensions)
@@ -0,0 +1,135 @@
+import os
+import re
+import time
+from collections import deque
+
+# Class to queue video encodes and hand them out so the running encoders stay within a core budget
+# Workflow:
+# 1. Initialize the class with the core budget (default: all cores) and the encoder threads given to each job.
+# 2. add() queues a VideoEncoderFFMPEG, encoders without a thread count get threads_per_job threads.
+# 3. ready() returns the queued jobs that fit into the cores not used by running jobs, in the order they were
+#    added, and marks them running. A job larger than the whole budget still runs when nothing else does.
+# 4. finish() releases a job's cores, the caller then asks ready() for the next jobs.
+# 5. drain() empties the queue on cancel and returns the jobs that never started.
+
+# Notes:
+# Only job bookkeeping lives here, starting and stopping the ffmpeg processes is up to the caller (the video
+# encoder controller runs them as QProcesses or pipe workers).
+# The legacy "ffv1" profile encodes on about one core whatever -threads says, so it costs one core.
+# threads_per_job defaults to half the budget (at most 8), so two encodes run side by side and each still
+# gets enough FFV1 slices to keep its cores busy.
+# ProgressParser reads the key=value blocks ffmpeg writes with -progress, lines that are not progress keys
+# (ffmpeg's usual log on a merged channel) are handed back as they are.
+
+FFMPEG_PROGRESS_ARGS = ["-progress", "pipe:1", "-nostats"]
+PROGRESS_LINE = re.compile(r"^[a-z0-9_]+=\S*$")
+
+
+class ProgressParser:
+    def __init__(self):
+        self.partial = ""
+        self.values = {}
+
+    # Returns the finished progress blocks and the other complete lines in text
+    def feed(self, text):
+        lines = (self.partial + text).split("\n")
+        self.partial = lines.pop()
+        blocks = []
+        other = []
+        for line in lines:
+            line = line.strip()
+            if not PROGRESS_LINE.match(line):
+                if line:
+                    other.append(line)
+                continue
+            key, value = line.split("=", 1)
+            self.values[key] = value
+            if key == "progress":
+                blocks.append(self.values)
+                self.values = {}
+        return blocks, other
+
+
+def progress_fps(block):
+    try:
+        return float(block.get("fps", 0.0))
+    except ValueError:
+        return 0.0
+
+
+def progress_frame(block):
+    try:
+        return int(block.get("frame", 0))
+    except ValueError:
+        return 0
+
+
+class EncodeJob:
+    def __init__(self, encoder, name, threads):
+        self.encoder = encoder
+        self.name = name
+        self.threads = threads
+        self.parser = ProgressParser()
+        self.frame = 0
+        self.fps = 0.0
+        self.start_time = None
+        self.last_report = 0.0
+
+    # Takes a -progress block, returns True when it is time to report it (every report_interval seconds
+    # and when ffmpeg says the encode has ended)
+    def update(self, block, report_interval):
+        self.frame = progress_frame(block)
+        self.fps = progress_fps(block)
+        now = time.perf_counter()
+        if block.get("progress") == "end" or now - self.last_report >= report_interval:
+            self.last_report = now
+            return True
+        return False
+
+    def describe(self):
+        return f"{self.name}: frame {self.frame}, {self.fps:.1f} fps"
+
+
+class EncodeQueue:
+    def __init__(self, core_budget=None, threads_per_job=None, report_interval=5.0):
+        self.core_budget = max(1, int(core_budget or os.cpu_count() or 1))
+        self.threads_per_job = max(1, int(threads_per_job or min(8, self.core_budget // 2) or 1))
+        self.report_interval = report_interval
+        self.queued = deque()
+        self.running = []
+
+    def add(self, encoder, name):
+        if encoder.threads is None:
+            encoder.threads = self.threads_per_job
+        threads = 1 if encoder.profile == "ffv1" else int(encoder.threads)
+        job = EncodeJob(encoder, name, threads)
+        self.queued.append(job)
+        return job
+
+    def used_cores(self):
+        return sum(job.threads for job in self.running)
+
+    def ready(self):
+        started = []
+        while self.queued:
+            job = self.queued[0]
+            if self.running and self.used_cores() + job.threads > self.core_budget:
+                break
+            self.queued.popleft()
+            job.start_time = time.perf_counter()
+            self.running.append(job)
+            started.append(job)
+        return started
+
+    def finish(self, job):
+        if job in self.running:
+            self.running.remove(job)
+        return time.perf_counter() - job.start_time if job.start_time is not None else 0.0
+
+    def drain(self):
+        dropped = list(self.queued)
+        self.queued.clear()
+        return dropped
+
+    def is_idle(self):
+        return not self.queued and not self.running
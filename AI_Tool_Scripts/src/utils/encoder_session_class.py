@@ -0,0 +1,267 @@
+import os
+import json
+import queue
+import subprocess
+import threading
+import numpy as np
+from utils.encode_queue_class import FFMPEG_PROGRESS_ARGS, EncodeJob
+
+# Class to stream NumPy frames straight into an ffmpeg process, no frames are written to disk first
+# Workflow:
+# 1. Initialize the class with the output video path, framerate, output bit depth, encoder profile, encoder
+#    threads and an optional -vf filter.
+# 2. The first write() starts ffmpeg with "-f rawvideo -pix_fmt <fmt> -s WxH -i -", the input pixel format and
+#    size are taken from that first frame (bgr24 / bgr48le for OpenCV colour frames, gray / gray16le for mono).
+# 3. write() hands each frame to a writer thread through a bounded queue, when ffmpeg falls behind the queue
+#    fills up and write() blocks (backpressure), so the producer never runs more than max_queued frames ahead.
+# 4. close() flushes the queue, closes ffmpeg's stdin and waits for it, abort() kills ffmpeg.
+
+# Notes:
+# Every frame must have the same shape and dtype as the first, mismatching frames are skipped with a message.
+# Frames are queued as they are, a producer that reuses one buffer for every frame must pass a copy.
+# Can be used as a context manager: the session is closed on success and aborted if an exception escapes.
+# progress=True runs ffmpeg with -progress and prints its frame count and fps every report_interval seconds.
+
+# Encoder profiles (shared with VideoEncoderFFMPEG, keys are shown in the video encoder window):
+# ffv1          FFV1 with ffmpeg's default settings (level 1, runs mostly on one core), the previous behaviour.
+# ffv1_mt       Lossless FFV1 level 3 split into slices that are encoded on -threads cores, with a CRC per slice
+#               so damage stays local, and -g 1 so every frame is a keyframe and seeking is instant. Default.
+# ffv1_archive  ffv1_mt with the range coder and large context model, smaller files for slower encoding.
+# x264_review   Lossy H.264, -preset ultrafast -crf 18, visually close review copies at a fraction of the size.
+# x264_preview  Lossy H.264, -preset ultrafast -crf 28, small previews for sharing.
+# FFV1 outputs keep yuv420p for 8-bit and yuv422p16le for 16-bit output, x264 outputs are always 8-bit yuv420p
+# .mp4 files padded to even width and height (yuv420p needs them).
+# FFV1 level 3 only accepts certain slice counts, the smallest one covering the thread count is used.
+# Measured encode speed and size per profile come from benchmarks/encoder_benchmark.py, which saves them to
+# PROFILE_BENCHMARK_FILE; load_profile_benchmarks() returns {} until that benchmark has been run on a machine.
+
+PIX_FMTS = {
+    (1, np.uint8): "gray", (1, np.uint16): "gray16le",
+    (3, np.uint8): "bgr24", (3, np.uint16): "bgr48le",
+    (4, np.uint8): "bgra", (4, np.uint16): "bgra64le",
+}
+
+
+# OpenCV arrays are BGR ordered, grayscale frames have no channel axis
+def input_pix_fmt(frame):
+    channels = 1 if frame.ndim == 2 else frame.shape[2]
+    pix_fmt = PIX_FMTS.get((channels, frame.dtype.type))
+    if pix_fmt is None:
+        raise ValueError(f"Unsupported frame layout for piping: {frame.shape} {frame.dtype}")
+    return pix_fmt
+
+
+ENCODER_PROFILES = {
+    "ffv1": {"codec": "ffv1", "lossless": True, "extension": ".avi"},
+    "ffv1_mt": {"codec": "ffv1", "lossless": True, "extension": ".avi", "level": 3},
+    "ffv1_archive": {"codec": "ffv1", "lossless": True, "extension": ".avi", "level": 3, "coder": 1, "context": 1},
+    "x264_review": {"codec": "libx264", "lossless": False, "extension": ".mp4", "preset": "ultrafast", "crf": 18},
+    "x264_preview": {"codec": "libx264", "lossless": False, "extension": ".mp4", "preset": "ultrafast", "crf": 28},
+}
+DEFAULT_PROFILE = "ffv1_mt"
+FFV1_SLICE_COUNTS = (4, 6, 9, 12, 16, 24)
+PROFILE_BENCHMARK_FILE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "..", "assets", "encoder_benchmark.json"
+)
+
+
+def output_pix_fmt(bit_depth):
+    return "yuv420p" if bit_depth == 8 else "yuv422p16le"
+
+
+def default_threads():
+    return min(16, os.cpu_count() or 1)
+
+
+def ffv1_slices(threads):
+    return next((count for count in FFV1_SLICE_COUNTS if count >= threads), FFV1_SLICE_COUNTS[-1])
+
+
+def profile_settings(profile):
+    settings = ENCODER_PROFILES.get(profile)
+    if settings is None:
+        raise ValueError(f"Unknown encoder profile '{profile}', expected one of {tuple(ENCODER_PROFILES)}")
+    return settings
+
+
+# Output arguments of a profile, from -c:v to -pix_fmt
+def codec_args(profile, bit_depth, threads=None):
+    settings = profile_settings(profile)
+    threads = max(1, int(threads or default_threads()))
+
+    if settings["codec"] == "libx264":
+        return [
+            "-c:v", "libx264",
+            "-preset", settings["preset"],
+            "-crf", str(settings["crf"]),
+            "-threads", str(threads),
+            "-pix_fmt", "yuv420p",
+        ]
+
+    args = ["-c:v", "ffv1"]
+    if settings.get("level") == 3:
+        args += [
+            "-level", "3",
+            "-threads", str(threads),
+            "-slices", str(ffv1_slices(threads)),
+            "-slicecrc", "1",
+            "-g", "1",
+        ]
+    if "coder" in settings:
+        args += ["-coder", str(settings["coder"]), "-context", str(settings["context"])]
+    return args + ["-pix_fmt", output_pix_fmt(bit_depth)]
+
+
+# Filters a profile needs after any caller filter
+def profile_filters(profile):
+    if profile_settings(profile)["codec"] == "libx264":
+        return ["pad=ceil(iw/2)*2:ceil(ih/2)*2"]
+    return []
+
+
+def join_filters(video_filter, profile):
+    filters = ([video_filter] if video_filter else []) + profile_filters(profile)
+    return ",".join(filters) or None
+
+
+def load_profile_benchmarks(path=PROFILE_BENCHMARK_FILE):
+    if not os.path.isfile(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f).get("profiles", {})
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable encoder benchmark {path}: {e}")
+        return {}
+
+
+class EncoderSession:
+    def __init__(self, output_path, framerate=10, bit_depth=8, video_filter=None, max_queued=8,
+                 profile=DEFAULT_PROFILE, threads=None, progress=False, report_interval=5.0):
+        profile_settings(profile)
+        self.output_path = output_path
+        self.framerate = framerate
+        self.bit_depth = bit_depth
+        self.profile = profile
+        self.threads = threads
+        self.video_filter = video_filter
+        self.max_queued = max(1, int(max_queued))
+        self.progress = progress
+        self.report_interval = report_interval
+        self.progress_job = EncodeJob(None, os.path.basename(output_path), threads)
+        self.frames_written = 0
+        self.cmd = None
+        self._process = None
+        self._queue = None
+        self._thread = None
+        self._progress_thread = None
+        self._error = None
+        self._shape = None
+        self._dtype = None
+
+    def build_command(self, first_frame):
+        h, w = first_frame.shape[:2]
+        cmd = [
+            "ffmpeg", "-y",
+            *(FFMPEG_PROGRESS_ARGS if self.progress else []),
+            "-f", "rawvideo",
+            "-pix_fmt", input_pix_fmt(first_frame),
+            "-s", f"{w}x{h}",
+            "-framerate", str(self.framerate),
+            "-i", "-",
+        ]
+        video_filter = join_filters(self.video_filter, self.profile)
+        if video_filter:
+            cmd += ["-vf", video_filter]
+        return cmd + codec_args(self.profile, self.bit_depth, self.threads) + [self.output_path]
+
+    def start(self, first_frame):
+        self.cmd = self.build_command(first_frame)
+        self._shape = first_frame.shape
+        self._dtype = first_frame.dtype
+        print("Running:", " ".join(self.cmd))
+        self._process = subprocess.Popen(self.cmd, stdin=subprocess.PIPE,
+                                         stdout=subprocess.PIPE if self.progress else None)
+        self._queue = queue.Queue(maxsize=self.max_queued)
+        self._thread = threading.Thread(target=self.feed, daemon=True)
+        self._thread.start()
+        if self.progress:
+            self._progress_thread = threading.Thread(target=self.read_progress, daemon=True)
+            self._progress_thread.start()
+
+    def read_progress(self):
+        job = self.progress_job
+        for line in self._process.stdout:
+            blocks, _ = job.parser.feed(line.decode("utf-8", "replace"))
+            for block in blocks:
+                if job.update(block, self.report_interval):
+                    print(job.describe())
+
+    # Writer thread, after a failed write the remaining frames are drained so write() never blocks forever
+    def feed(self):
+        while True:
+            frame = self._queue.get()
+            if frame is None:
+                return
+            if self._error is not None:
+                continue
+            try:
+                self._process.stdin.write(memoryview(np.ascontiguousarray(frame)).cast("B"))
+                self.frames_written += 1
+            except (BrokenPipeError, OSError) as e:
+                self._error = e
+
+    def write(self, frame):
+        if self._process is None:
+            self.start(frame)
+        if frame.shape != self._shape or frame.dtype != self._dtype:
+            print(f"Skipping frame with mismatched data: {frame.shape} {frame.dtype}, expected {self._shape} {self._dtype}")
+            return False
+        if self._error is not None:
+            raise RuntimeError(f"ffmpeg closed its input early: {self._error}")
+        self._queue.put(frame)
+        return True
+
+    def close(self):
+        if self._process is None:
+            print("No frames were written, no video created.")
+            return None
+        self._queue.put(None)
+        self._thread.join()
+        try:
+            self._process.stdin.close()
+        except BrokenPipeError:
+            pass
+        return_code = self._process.wait()
+        self.join_progress()
+        self._process = None
+        if self._error is not None:
+            print(f"ffmpeg closed its input early: {self._error}")
+        if return_code != 0:
+            raise subprocess.CalledProcessError(return_code, self.cmd)
+        return self.cmd
+
+    def abort(self):
+        if self._process is None:
+            return
+        self._process.kill()
+        self._queue.put(None)
+        self._thread.join()
+        self._process.wait()
+        self.join_progress()
+        self._process = None
+
+    def join_progress(self):
+        if self._progress_thread is not None:
+            self._progress_thread.join()
+            self._progress_thread = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
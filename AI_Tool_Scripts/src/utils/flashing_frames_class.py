@@ -1,6 +1,9 @@
 import os
+import json
 import cv2
 import numpy as np
+from utils.frame_io_class import break_hardlink
+from utils.folder_index_class import FolderIndex
 
 # Functor Class to outline frames in a folder
 # Workflow:
@@ -12,11 +15,47 @@ import numpy as np
 # 4. Define a method to generate image paths based on the specified pattern.
 # 5. Call Method to process the images, draw outlines, and save them to the output folder.
 
+# Notes:
+# mode="metadata" leaves the frames untouched and only writes a flashing_frames.json sidecar into the output
+# folder (frame numbers, the same frames as inclusive ranges, outline colour and thickness).
+# VideoEncoderFFMPEG picks the sidecar up and burns the outline in at encode time with an ffmpeg drawbox filter,
+# so no frame has to be re-encoded and rewritten just to add a border.
+# encode(session) streams every frame of the input folder in frame order into an EncoderSession, outlining the
+# flashing frames in memory, so an outlined video is made without writing any frame to disk.
+
+FLASHING_FRAMES_FILE = "flashing_frames.json"
+
+
+# Sorted frame numbers as inclusive [start, end] runs, e.g. [3, 4, 5, 9] -> [[3, 5], [9, 9]]
+def frame_ranges(frames):
+    ranges = []
+    for frame in sorted(set(frames)):
+        if ranges and frame == ranges[-1][1] + 1:
+            ranges[-1][1] = frame
+        else:
+            ranges.append([frame, frame])
+    return ranges
+
+
+def load_flashing_metadata(path):
+    if not os.path.isfile(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable flashing frames file {path}: {e}")
+        return None
+
+
 class FlashingFrames:
     def __init__(self, input_folder, output_folder, frame_indices,
                  filename_pattern="frame_{:05d}",
                  outline_color=(0, 0, 255), 
-                 outline_thickness=50):
+                 outline_thickness=50, mode="burn"):
+        if mode not in ("burn", "metadata"):
+            raise ValueError(f"Unknown FlashingFrames mode '{mode}', expected 'burn' or 'metadata'")
+        self.mode = mode
         self.input_folder = input_folder
         self.output_folder = output_folder
         self.frame_indices = frame_indices
@@ -32,7 +71,9 @@ class FlashingFrames:
 
     def image_paths(self):
         self.frame_paths = []
-        files = os.listdir(self.input_folder)
+        index = FolderIndex.get(self.input_folder)
+        default_pattern = self.pattern == "frame_{:05d}"
+        files = None if default_pattern else index.names(include_hidden=True)
         for idx in self.frame_indices:
             try:
                 suffix = self.pattern.format(int(idx))
@@ -40,13 +81,38 @@ class FlashingFrames:
                 print(f"Invalid frame index for formatting: {idx}")
                 continue
 
-            matched = [f for f in files if f.endswith(suffix) or f.split('.')[0].endswith(suffix)]
+            # The default pattern is looked up in the folder's frame number index, custom patterns are matched by name
+            if default_pattern:
+                matched = index.frame_names(idx, include_hidden=True)
+            else:
+                matched = [f for f in files if f.endswith(suffix) or f.split('.')[0].endswith(suffix)]
             if not matched:
                 print(f"No file ending with frame index '{suffix}'")
             for fname in matched:
                 self.frame_paths.append((idx, os.path.join(self.input_folder, fname)))
 
+    def write_metadata(self):
+        frames = []
+        for idx in self.frame_indices:
+            try:
+                frames.append(int(idx))
+            except ValueError:
+                print(f"Invalid frame index: {idx}")
+        path = os.path.join(self.output_folder, FLASHING_FRAMES_FILE)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({
+                "frames": sorted(set(frames)),
+                "ranges": frame_ranges(frames),
+                "outline_color_bgr": list(self.outline_color),
+                "outline_thickness": self.outline_thickness,
+            }, f, indent=1)
+        print(f"Recorded {len(set(frames))} flashing frames in '{path}'.")
+
     def __call__(self):
+        if self.mode == "metadata":
+            self.write_metadata()
+            return
+
         self.image_paths()
         total = len(self.frame_paths)
         if total == 0:
@@ -57,7 +123,7 @@ class FlashingFrames:
         for idx_count, (idx, in_path) in enumerate(self.frame_paths, 1):
             if self.should_stop:
                 print(f"Stopping FlashingFrames early at [{idx_count}/{total}]")
-                return
+                break
 
             img = cv2.imread(in_path, cv2.IMREAD_UNCHANGED)
             if img is None:
@@ -67,14 +133,46 @@ class FlashingFrames:
             outlined = self.draw_outline(img)
             out_name = os.path.basename(in_path)
             out_path = os.path.join(self.output_folder, out_name)
+            # Frames hardlinked from another folder are replaced, not drawn on through the shared inode
+            break_hardlink(out_path)
             if cv2.imwrite(out_path, outlined):
                 saved += 1
                 print(f"[{idx_count}/{total}] Saved outlined frame: {out_path}")
             else:
                 print(f"[{idx_count}/{total}] Failed to save outlined image: {out_path}")
 
+        FolderIndex.invalidate(self.output_folder)
         print(f"Processed and saved {saved} outlined frames to '{self.output_folder}'.")
 
+    def encode(self, session, extensions=(".png", ".jpg", ".jpeg", ".tif", ".tiff")):
+        index = FolderIndex.get(self.input_folder)
+        flashing = set()
+        for idx in self.frame_indices:
+            try:
+                flashing.add(int(idx))
+            except ValueError:
+                print(f"Invalid frame index: {idx}")
+
+        frames = sorted(frame for frame in index.by_frame if index.frame_names(frame, extensions))
+        total = len(frames)
+        outlined = 0
+        for idx_count, frame in enumerate(frames, 1):
+            if self.should_stop:
+                print(f"Stopping FlashingFrames encoding early at [{idx_count}/{total}]")
+                return
+
+            in_path = os.path.join(self.input_folder, index.frame_names(frame, extensions)[0])
+            img = cv2.imread(in_path, cv2.IMREAD_UNCHANGED)
+            if img is None:
+                print(f"Failed to load image: {in_path}")
+                continue
+            if frame in flashing:
+                img = self.draw_outline(img)
+                outlined += 1
+            session.write(img)
+
+        print(f"Encoded {total} frames, {outlined} of them outlined as flashing.")
+
     def draw_outline(self, img):
         h, w = img.shape[:2]
         outlined = img.copy()
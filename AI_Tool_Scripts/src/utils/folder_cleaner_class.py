@@ -1,5 +1,11 @@
 import os
+import json
+import struct
+import cv2
+import numpy as np
 from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from utils.folder_index_class import FolderIndex
 
 # Helper Class to clean up a folder by removing files that are significantly smaller or larger than the mode size.
 # Workflow:
@@ -11,19 +17,52 @@ from collections import Counter
 # 4. Helper function used to identify and ignore MAC OS hidden files
 # 5. Method to collect file sizes and identify the mode size. 
 # 6. Method to delete files that are significantly smaller or larger than the mode size.
+# 7. mode="validate" instead checks the content of every frame on a thread pool (validate()):
+#    - .raw files (when raw_size = height * stride bytes is given) must be exactly raw_size bytes long
+#    - PNG files must start with a valid signature and IHDR header and end with the IEND chunk,
+#      JPEG files must start with SOI and end with EOI, TIFF files must start with a TIFF byte order mark
+#    - PNG frames whose width/height differ from the most common one are flagged
+#    - every image is decoded at 1/4 resolution in grayscale, undecodable frames are flagged and frames whose
+#      mean intensity lies more than outlier_sigma robust deviations (MAD) from the folder median are flagged
+# 8. Flagged frames are moved into a "quarantine" subfolder and listed with their reasons in
+#    quarantine/quarantine_report.json, nothing is deleted so a wrongly flagged frame can be moved back.
+
+# Notes:
+# The size mode is kept as the default for existing callers, it does not suit compressed PNGs whose sizes vary.
+# outlier_sigma defaults high (8) so LED flash frames, which are brighter by design, are not quarantined.
+# raw_size comes from the RawTo16/FusedRawPipeline that reads the frames (RawTo16.raw_size()). If no .raw file
+# has that length the layout is taken to be wrong rather than every frame truncated, the lengths found are
+# reported and no raw file is quarantined.
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+PNG_IEND = b"\x00\x00\x00\x00IEND\xaeB`\x82"
+TIFF_MAGIC = (b"II*\x00", b"MM\x00*")
 
 class FolderCleaner:
-    def __init__(self, folder, tolerance=1000000, extensions=(".png", ".jpg", ".jpeg", ".tif", ".tiff")):
+    def __init__(self, folder, tolerance=1000000, extensions=(".png", ".jpg", ".jpeg", ".tif", ".tiff"),
+                 mode="size", raw_size=None, workers=None, outlier_sigma=8.0, quarantine_folder="quarantine"):
+        if mode not in ("size", "validate"):
+            raise ValueError(f"Unknown FolderCleaner mode '{mode}', expected 'size' or 'validate'")
         self.folder = folder
         self.tolerance = tolerance
         self.extensions = extensions
+        self.mode = mode
+        self.raw_size = raw_size
+        self.workers = max(1, int(workers or min(8, os.cpu_count() or 1)))
+        self.outlier_sigma = outlier_sigma
+        self.quarantine_folder = os.path.join(folder, quarantine_folder)
         self.should_stop = False
 
     def stop(self):
         self.should_stop = True 
 
     def execute(self):
-        all_files = [f for f in os.listdir(self.folder) if f.lower().endswith(self.extensions)]
+        if self.mode == "validate":
+            self.validate()
+            return
+
+        index = FolderIndex.get(self.folder)
+        all_files = index.names(self.extensions, include_hidden=True)
         if not all_files:
             print(f"No supported files in {self.folder}")
             return
@@ -41,9 +80,8 @@ class FolderCleaner:
                 print("Stopping FolderCleaner early during file size collection.")
                 return
 
-            path = os.path.join(self.folder, filename)
             try:
-                size = os.path.getsize(path)
+                size = index.entry(filename).size
                 file_sizes[filename] = size
                 sizes.append(size)
             except Exception as e:
@@ -76,7 +114,151 @@ class FolderCleaner:
                 except Exception as e:
                     print(f"Could not delete {filename}: {e}")
 
+        if deleted_files:
+            FolderIndex.invalidate(self.folder)
         print(f"\nTotal deleted: {len(deleted_files)}")
 
+    # Returns (reasons, png (width, height) or None) from the file's header, trailer and length
+    def check_structure(self, entry):
+        lower = entry.name.lower()
+        if lower.endswith(".raw"):
+            size = entry.size
+            if size != self.raw_size:
+                return [f"raw length {size} bytes, expected {self.raw_size}"], None
+            return [], None
+
+        size = entry.size
+        if size < 16:
+            return [f"file too short ({size} bytes)"], None
+
+        with open(entry.path, "rb") as f:
+            head = f.read(33)
+            f.seek(-16, os.SEEK_END)
+            tail = f.read(16)
+
+        if lower.endswith(".png"):
+            if head[:8] != PNG_SIGNATURE or head[12:16] != b"IHDR":
+                return ["invalid PNG signature or IHDR header"], None
+            width, height, bit_depth = struct.unpack(">IIB", head[16:25])
+            reasons = []
+            if width == 0 or height == 0 or bit_depth not in (1, 2, 4, 8, 16):
+                reasons.append(f"invalid PNG header ({width}x{height}, {bit_depth}-bit)")
+            if not tail.endswith(PNG_IEND):
+                reasons.append("missing PNG IEND chunk (truncated)")
+            return reasons, (width, height)
+
+        if lower.endswith((".jpg", ".jpeg")):
+            reasons = []
+            if head[:2] != b"\xff\xd8":
+                reasons.append("invalid JPEG start of image marker")
+            if b"\xff\xd9" not in tail:
+                reasons.append("missing JPEG end of image marker (truncated)")
+            return reasons, None
+
+        if lower.endswith((".tif", ".tiff")) and head[:4] not in TIFF_MAGIC:
+            return ["invalid TIFF header"], None
+        return [], None
+
+    # Returns (name, reasons, png size, low resolution mean intensity or None)
+    def check_frame(self, entry):
+        if self.should_stop:
+            return None
+        try:
+            reasons, png_size = self.check_structure(entry)
+        except OSError as e:
+            return entry.name, [f"unreadable: {e}"], None, None
+
+        mean = None
+        if not reasons and not entry.name.lower().endswith(".raw"):
+            image = cv2.imread(entry.path, cv2.IMREAD_REDUCED_GRAYSCALE_4)
+            if image is None:
+                reasons.append("could not be decoded")
+            else:
+                mean = float(image.mean())
+        return entry.name, reasons, png_size, mean
+
+    def validate(self):
+        index = FolderIndex.get(self.folder)
+        extensions = self.extensions + ((".raw",) if self.raw_size is not None else ())
+        entries = index.files(extensions)
+        if not entries:
+            print(f"No supported files in {self.folder}")
+            return
+
+        print(f"\nValidating {len(entries)} frames in {self.folder} with {self.workers} workers")
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            results = list(executor.map(self.check_frame, entries))
+        if self.should_stop:
+            print("Stopping FolderCleaner early during validation.")
+            return
+
+        flagged = {name: reasons for name, reasons, _, _ in results if reasons}
+
+        raw_entries = [entry for entry in entries if entry.name.lower().endswith(".raw")]
+        if raw_entries and all(entry.name in flagged for entry in raw_entries):
+            lengths = Counter()
+            for entry in raw_entries:
+                try:
+                    lengths[entry.size] += 1
+                except OSError:
+                    continue
+            found = ", ".join(f"{size} bytes ({count} files)" for size, count in lengths.most_common(3))
+            print(f"No .raw file is {self.raw_size} bytes long (found {found}), the raw layout does not match "
+                  f"the expected one, raw files are left in place")
+            for entry in raw_entries:
+                flagged.pop(entry.name)
+            if len(raw_entries) == len(entries):
+                return
+
+        png_sizes = [size for _, _, size, _ in results if size is not None]
+        if png_sizes:
+            common_size = Counter(png_sizes).most_common(1)[0][0]
+            for name, _, size, _ in results:
+                if size is not None and size != common_size:
+                    flagged.setdefault(name, []).append(
+                        f"size {size[0]}x{size[1]} differs from the common {common_size[0]}x{common_size[1]}")
+
+        means = np.array([mean for _, _, _, mean in results if mean is not None])
+        if len(means) >= 3:
+            median = float(np.median(means))
+            deviation = max(1.4826 * float(np.median(np.abs(means - median))), 1.0)
+            print(f"Mean intensity median {median:.1f}, robust deviation {deviation:.2f}")
+            for name, _, _, mean in results:
+                if mean is not None and abs(mean - median) > self.outlier_sigma * deviation:
+                    flagged.setdefault(name, []).append(
+                        f"mean intensity {mean:.1f} is an outlier (median {median:.1f})")
+
+        self.quarantine(flagged)
+
+    def quarantine(self, flagged):
+        if not flagged:
+            print("\nAll frames passed validation.")
+            return
+
+        os.makedirs(self.quarantine_folder, exist_ok=True)
+        report_path = os.path.join(self.quarantine_folder, "quarantine_report.json")
+        report = {}
+        if os.path.isfile(report_path):
+            try:
+                with open(report_path, "r", encoding="utf-8") as f:
+                    report = json.load(f)
+            except (OSError, ValueError):
+                report = {}
+
+        moved = 0
+        for name in sorted(flagged):
+            try:
+                os.replace(os.path.join(self.folder, name), os.path.join(self.quarantine_folder, name))
+                report[name] = flagged[name]
+                moved += 1
+                print(f"Quarantined {name}: {'; '.join(flagged[name])}")
+            except OSError as e:
+                print(f"Could not quarantine {name}: {e}")
+
+        with open(report_path, "w", encoding="utf-8") as f:
+            json.dump(dict(sorted(report.items())), f, indent=1)
+        FolderIndex.invalidate(self.folder)
+        print(f"\nTotal quarantined: {moved}, report: {report_path}")
+
     def __call__(self):
         self.execute()
@@ -0,0 +1,155 @@
+import os
+import re
+import time
+import threading
+
+# Helper class holding one shared listing per folder, built with a single os.scandir pass
+# Workflow:
+# 1. FolderIndex.get(folder) returns the cached index of a folder, or scans it if there is none yet.
+# 2. The scan keeps every file's name, path and parsed frame number. size, mtime_ns and stat are read from the
+#    file itself each time they are asked for (no stat for callers that only list).
+# 3. A cached index is reused while the folder's own mtime is unchanged, adding, removing or renaming a file
+#    changes it and the next get() rescans.
+# 4. Classes that write into a folder call FolderIndex.invalidate(folder) after writing so the next get() rescans.
+
+# Notes:
+# Replaces the os.listdir + os.path.getsize per file done separately by each utils class, which on network
+# shares and external SSDs holding thousands of frames costs a round trip per call.
+# Overwriting a file in place does not change the folder mtime, so only the listing is cached: a stat kept from
+# the scan would go stale and FolderCleaner/RawTo16 would judge files by their old size and mtime.
+# Process pools invalidate in the parent once the pool has finished, a child only clears its own cache.
+# At most MAX_FOLDERS listings are kept, the least recently scanned is dropped first, clear() drops them all.
+# A folder modified within SETTLE_NS of its scan is rescanned on the next get(), since filesystems with coarse
+# mtime resolution could otherwise hide a change made in the same tick as the scan.
+# Frame numbers come from names ending in "frame_<digits>" (e.g. "expframe_00012.png" -> 12), otherwise None.
+# by_frame maps each frame number to the names carrying it (an image and its label share a number), it is built
+# once per scan on first use so looking a frame up is O(1) instead of a scan of the whole listing.
+
+FRAME_NUMBER = re.compile(r"frame_(\d+)$")
+
+
+def parse_frame_number(name):
+    match = FRAME_NUMBER.search(os.path.splitext(name)[0])
+    return int(match.group(1)) if match else None
+
+
+class FolderEntry:
+    __slots__ = ("name", "path", "frame")
+
+    def __init__(self, dir_entry):
+        self.name = dir_entry.name
+        self.path = dir_entry.path
+        self.frame = parse_frame_number(dir_entry.name)
+
+    @property
+    def stat(self):
+        return os.stat(self.path)
+
+    @property
+    def size(self):
+        return self.stat.st_size
+
+    @property
+    def mtime_ns(self):
+        return self.stat.st_mtime_ns
+
+
+class FolderIndex:
+    SETTLE_NS = 2_000_000_000
+    MAX_FOLDERS = 64
+    _cache = {}
+    _lock = threading.Lock()
+
+    def __init__(self, folder):
+        self.folder = folder
+        self.entries = {}
+        self._by_frame = None
+        self.folder_mtime_ns = None
+        self.scan_time_ns = None
+        self.scan()
+
+    @classmethod
+    def get(cls, folder):
+        key = os.path.abspath(folder)
+        folder_mtime_ns = os.stat(folder).st_mtime_ns
+        with cls._lock:
+            index = cls._cache.get(key)
+        if index is not None and index.is_current(folder_mtime_ns):
+            return index
+
+        index = cls(folder)
+        with cls._lock:
+            cls._cache.pop(key, None)
+            cls._cache[key] = index
+            while len(cls._cache) > cls.MAX_FOLDERS:
+                cls._cache.pop(next(iter(cls._cache)))
+        return index
+
+    @classmethod
+    def invalidate(cls, folder):
+        with cls._lock:
+            cls._cache.pop(os.path.abspath(folder), None)
+
+    @classmethod
+    def clear(cls):
+        with cls._lock:
+            cls._cache.clear()
+
+    def is_current(self, folder_mtime_ns):
+        return (folder_mtime_ns == self.folder_mtime_ns
+                and self.scan_time_ns - self.folder_mtime_ns > self.SETTLE_NS)
+
+    def scan(self):
+        self.folder_mtime_ns = os.stat(self.folder).st_mtime_ns
+        self.scan_time_ns = time.time_ns()
+        entries = {}
+        with os.scandir(self.folder) as it:
+            for dir_entry in it:
+                try:
+                    if dir_entry.is_file():
+                        entries[dir_entry.name] = FolderEntry(dir_entry)
+                except OSError:
+                    continue
+        self.entries = entries
+        self._by_frame = None
+
+    # File names, optionally only those ending in one of extensions (case insensitive)
+    def names(self, extensions=None, include_hidden=False):
+        if extensions is not None:
+            extensions = tuple(ext.lower() for ext in extensions)
+        return [name for name in self.entries
+                if (include_hidden or not name.startswith("."))
+                and (extensions is None or name.lower().endswith(extensions))]
+
+    def files(self, extensions=None, include_hidden=False):
+        return [self.entries[name] for name in self.names(extensions, include_hidden)]
+
+    @property
+    def by_frame(self):
+        by_frame = self._by_frame
+        if by_frame is None:
+            by_frame = {}
+            for name in sorted(self.entries):
+                frame = self.entries[name].frame
+                if frame is not None:
+                    by_frame.setdefault(frame, []).append(name)
+            self._by_frame = by_frame
+        return by_frame
+
+    # Names of the files carrying this frame number, optionally only those ending in one of extensions
+    def frame_names(self, frame, extensions=None, include_hidden=False):
+        names = self.by_frame.get(int(frame), [])
+        if extensions is not None:
+            extensions = tuple(ext.lower() for ext in extensions)
+        return [name for name in names
+                if (include_hidden or not name.startswith("."))
+                and (extensions is None or name.lower().endswith(extensions))]
+
+    def entry(self, name):
+        return self.entries.get(name)
+
+    def __contains__(self, name):
+        return name in self.entries
+
+    def __len__(self):
+        return len(self.entries)
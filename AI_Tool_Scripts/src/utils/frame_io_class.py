@@ -0,0 +1,257 @@
+import io
+import os
+import json
+import shutil
+import threading
+import numpy as np
+import cv2
+from utils.folder_index_class import FolderIndex
+
+# Helper classes to read and write frames in any of the supported output formats
+# Formats:
+# "png"   - PNG, png_compression sets the zlib level 0 (fastest, largest) to 9 (slowest, smallest), None = OpenCV default
+# "tiff"  - Uncompressed TIFF, no encode cost at all but the largest files
+# "npy"   - One NumPy .npy file per frame, written and read back with no encoding step
+# "stack" - Chunked frame stack, frames are grouped into chunk_#####.npy files of about chunk_bytes each inside a
+#           "frame_stack" subfolder, an index.json maps each frame name to its chunk and offset
+# Workflow:
+# 1. FrameReader lists the frames in a folder, frames inside a frame stack are listed as "<name>.stack"
+# 2. FrameReader reads a frame by name, dispatching on the extension (.stack frames are read from a memory map)
+# 3. FrameWriter writes a frame by name, the format is either fixed or taken from the name's extension
+# 4. FrameWriter.close() must be called once a run is done so the last stack chunk and index are flushed
+
+# Notes:
+# Frames always round trip as the same array OpenCV would return, so channel order is identical across formats.
+# Writing ".stack" names to a FrameWriter without a fixed format appends them to the output folder's frame stack,
+# which lets converters keep the input format by reusing the input name.
+# FrameWriter can be shared between threads, stack appends and flushes are serialised by a lock.
+# A stack chunk is created as a memory mapped .npy sized for as many frames as fit in chunk_bytes (at least one) and
+# each frame is copied into its slot as it arrives, so no frames are buffered in memory. A chunk closed before it is
+# full has its .npy header rewritten to the frames it holds and the file truncated.
+# Converters may hardlink unchanged frames into their output folder (link_or_copy), writers call break_hardlink
+# before overwriting a file in place so a linked frame is replaced instead of rewritten through the shared inode.
+
+FRAME_EXTENSIONS = (".png", ".jpg", ".jpeg", ".tif", ".tiff", ".npy", ".stack")
+OUTPUT_FORMATS = ("png", "tiff", "npy", "stack")
+FORMAT_EXTENSIONS = {"png": ".png", "tiff": ".tiff", "npy": ".npy", "stack": ".stack"}
+STACK_FOLDER = "frame_stack"
+STACK_INDEX = "index.json"
+STACK_EXTENSION = ".stack"
+STACK_CHUNK_BYTES = 256 * 1024 * 1024
+
+
+def stack_folder(folder):
+    return os.path.join(folder, STACK_FOLDER)
+
+
+def load_stack_index(folder):
+    index_path = os.path.join(stack_folder(folder), STACK_INDEX)
+    if not os.path.isfile(index_path):
+        return {}
+    with open(index_path, "r", encoding="utf-8") as f:
+        return json.load(f).get("frames", {})
+
+
+def link_or_copy(src, dst):
+    # Hardlinks src to dst when both are on the same filesystem, otherwise (or if linking fails) copies it
+    try:
+        if os.stat(src).st_dev == os.stat(os.path.dirname(os.path.abspath(dst))).st_dev:
+            if os.path.lexists(dst):
+                os.remove(dst)
+            os.link(src, dst)
+            return "linked"
+    except OSError:
+        pass
+    shutil.copy2(src, dst)
+    return "copied"
+
+
+def break_hardlink(path):
+    # Removes path if other hard links share its inode, so the next write creates a new file
+    try:
+        if os.stat(path).st_nlink > 1:
+            os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def is_pipe_only(name):
+    # Frames that ffmpeg cannot read from disk itself and must be piped in
+    return name.lower().endswith((".npy", STACK_EXTENSION))
+
+
+class FrameReader:
+    def __init__(self, folder):
+        self.folder = folder
+        self._stack_index = None
+        self._chunks = {}
+
+    def stack_index(self):
+        if self._stack_index is None:
+            self._stack_index = load_stack_index(self.folder)
+        return self._stack_index
+
+    def list_frames(self, extensions=FRAME_EXTENSIONS):
+        extensions = tuple(ext.lower() for ext in extensions)
+        names = FolderIndex.get(self.folder).names(extensions, include_hidden=True)
+        if STACK_EXTENSION in extensions:
+            names.extend(name + STACK_EXTENSION for name in self.stack_index())
+        return names
+
+    def read(self, name, flags=cv2.IMREAD_UNCHANGED):
+        lower = name.lower()
+        if lower.endswith(STACK_EXTENSION):
+            return self.read_stacked(name[:-len(STACK_EXTENSION)])
+        path = os.path.join(self.folder, name)
+        if lower.endswith(".npy"):
+            if not os.path.isfile(path):
+                return None
+            return np.load(path)
+        return cv2.imread(path, flags)
+
+    def read_stacked(self, base_name):
+        entry = self.stack_index().get(base_name)
+        if entry is None:
+            return None
+        chunk_name = entry["chunk"]
+        if chunk_name not in self._chunks:
+            self._chunks[chunk_name] = np.load(os.path.join(stack_folder(self.folder), chunk_name), mmap_mode="r")
+        return np.array(self._chunks[chunk_name][entry["offset"]])
+
+
+class FrameWriter:
+    def __init__(self, folder, output_format=None, png_compression=None, chunk_bytes=STACK_CHUNK_BYTES):
+        if output_format is not None and output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Unknown output format '{output_format}', expected one of {OUTPUT_FORMATS}")
+        self.folder = folder
+        self.output_format = output_format
+        self.png_compression = png_compression
+        self.chunk_bytes = chunk_bytes
+        self._stack_index = None
+        self._stack_chunk = None
+        self._stack_chunk_name = None
+        self._stack_names = []
+        self._next_chunk = 0
+        self._stack_lock = threading.Lock()
+        os.makedirs(self.folder, exist_ok=True)
+
+    # Returns the file name a frame with this base name is saved under
+    def frame_name(self, base_name):
+        return base_name + FORMAT_EXTENSIONS[self.output_format or "png"]
+
+    def write(self, name, image):
+        lower = name.lower()
+        if self.output_format == "stack" or lower.endswith(STACK_EXTENSION):
+            base_name = os.path.splitext(name)[0]
+            self.append_to_stack(base_name, image)
+            return True
+
+        path = os.path.join(self.folder, name)
+        break_hardlink(path)
+        try:
+            return self.write_file(path, lower, image)
+        finally:
+            FolderIndex.invalidate(self.folder)
+
+    def write_file(self, path, lower, image):
+        if lower.endswith(".npy"):
+            np.save(path, image)
+            return True
+        if lower.endswith((".tif", ".tiff")):
+            return cv2.imwrite(path, image, [cv2.IMWRITE_TIFF_COMPRESSION, 1])
+        if lower.endswith(".png") and self.png_compression is not None:
+            return cv2.imwrite(path, image, [cv2.IMWRITE_PNG_COMPRESSION, int(self.png_compression)])
+        return cv2.imwrite(path, image)
+
+    def append_to_stack(self, base_name, image):
+        with self._stack_lock:
+            if self._stack_index is None:
+                self.open_stack()
+            if self._stack_chunk is not None and (self._stack_chunk.shape[1:] != image.shape
+                                                  or self._stack_chunk.dtype != image.dtype):
+                self.flush_stack()
+            if self._stack_chunk is None:
+                self.new_chunk(image)
+            self._stack_chunk[len(self._stack_names)] = image
+            self._stack_names.append(base_name)
+            if len(self._stack_names) >= len(self._stack_chunk):
+                self.flush_stack()
+
+    # Memory mapped chunk with room for as many frames like image as fit in chunk_bytes
+    def new_chunk(self, image):
+        frames = max(1, int(self.chunk_bytes) // max(1, image.nbytes))
+        self._stack_chunk_name = f"chunk_{self._next_chunk:05d}.npy"
+        self._next_chunk += 1
+        self._stack_chunk = np.lib.format.open_memmap(
+            os.path.join(stack_folder(self.folder), self._stack_chunk_name), mode="w+",
+            shape=(frames, *image.shape), dtype=image.dtype)
+
+    def open_stack(self):
+        os.makedirs(stack_folder(self.folder), exist_ok=True)
+        self._stack_index = load_stack_index(self.folder)
+        chunk_numbers = [int(entry["chunk"][6:11]) for entry in self._stack_index.values()]
+        self._next_chunk = max(chunk_numbers, default=-1) + 1
+        for name in os.listdir(stack_folder(self.folder)):
+            if name.startswith("chunk_") and name.endswith(".npy") and name[6:11].isdigit():
+                self._next_chunk = max(self._next_chunk, int(name[6:11]) + 1)
+
+    def flush_stack(self):
+        if self._stack_chunk is None:
+            return
+        count = len(self._stack_names)
+        chunk = self._stack_chunk
+        slots, shape, dtype, offset = len(chunk), chunk.shape[1:], chunk.dtype, chunk.offset
+        chunk.flush()
+        # The memory map has to be closed before the file can be truncated (Windows)
+        del chunk
+        self._stack_chunk = None
+        if count < slots:
+            self.shrink_chunk(count, shape, dtype, offset)
+        for offset, base_name in enumerate(self._stack_names):
+            self._stack_index[base_name] = {"chunk": self._stack_chunk_name, "offset": offset}
+        self._stack_names = []
+        self.save_stack_index()
+
+    # Rewrites the header of a chunk that was closed before it was full to the frames it holds and drops the
+    # unused slots. numpy pads the header so its length does not depend on the frame count, if it ever does the
+    # chunk is left at full size as the unused slots are never in the index.
+    def shrink_chunk(self, count, shape, dtype, offset):
+        path = os.path.join(stack_folder(self.folder), self._stack_chunk_name)
+        frame_bytes = int(np.prod(shape)) * dtype.itemsize
+        header = {"descr": np.lib.format.dtype_to_descr(dtype), "fortran_order": False, "shape": (count, *shape)}
+        with open(path, "r+b") as f:
+            version = np.lib.format.read_magic(f)
+            buffer = io.BytesIO()
+            if version == (1, 0):
+                np.lib.format.write_array_header_1_0(buffer, header)
+            else:
+                np.lib.format.write_array_header_2_0(buffer, header)
+            if len(buffer.getvalue()) != offset:
+                return
+            f.seek(0)
+            f.write(buffer.getvalue())
+            f.truncate(offset + count * frame_bytes)
+
+    def save_stack_index(self):
+        index_path = os.path.join(stack_folder(self.folder), STACK_INDEX)
+        tmp_path = index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"frames": dict(sorted(self._stack_index.items()))}, f, indent=1)
+        os.replace(tmp_path, index_path)
+
+    # Chunks whose frames have all been rewritten into newer chunks are deleted
+    def remove_unused_chunks(self):
+        used = {entry["chunk"] for entry in self._stack_index.values()}
+        for name in os.listdir(stack_folder(self.folder)):
+            if name.startswith("chunk_") and name.endswith(".npy") and name not in used:
+                try:
+                    os.remove(os.path.join(stack_folder(self.folder), name))
+                except OSError as e:
+                    print(f"Could not remove unused stack chunk {name}: {e}")
+
+    def close(self):
+        with self._stack_lock:
+            if self._stack_index is None:
+                return
+            self.flush_stack()
+            self.remove_unused_chunks()
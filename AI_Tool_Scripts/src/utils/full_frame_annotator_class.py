@@ -1,6 +1,7 @@
 import os
 import shutil
 import cv2
+from utils.folder_index_class import FolderIndex
 
 # Class to annotate images with bounding boxes based on annotations folder with files of matching names
 # Workflow:
@@ -13,13 +14,26 @@ import cv2
 # 7. If no annotation file is found, copy the image to the output folder without annotations.
 # Ensures there are no missing images in the output folder.
 
+# Notes:
+# With an EncoderSession passed as session every output frame (annotated or copied) is also streamed into that
+# video in name order, write_frames=False then skips writing the frames to the output folder altogether.
+# The caller owns the session and closes it once the annotator is done.
+# image_names sets the images and the order they are annotated in, names may repeat (e.g. a VideoEncoderFFMPEG
+# frame_order() with filled gaps), by default every file of images_folder is annotated once in name order.
+# The output folder is only created when frames are written.
+
 class FullFrameAnnotator:
-    def __init__(self, images_folder, annotations_folder, output_folder):
+    def __init__(self, images_folder, annotations_folder, output_folder, session=None, write_frames=True,
+                 image_names=None):
+        self.session = session
+        self.write_frames = write_frames
+        self.image_names = image_names
         self.images_folder = images_folder
         self.annotations_folder = annotations_folder
         self.output_folder = output_folder
         self.should_stop = False
-        os.makedirs(self.output_folder, exist_ok=True)
+        if self.write_frames:
+            os.makedirs(self.output_folder, exist_ok=True)
 
     def stop(self):
             self.should_stop = True
@@ -63,11 +77,20 @@ class FullFrameAnnotator:
                 )
 
         out_path = os.path.join(self.output_folder, os.path.basename(image_path))
-        cv2.imwrite(out_path, image)
-        print(f"Labeled and saved: {out_path}")
+        if self.session is not None:
+            self.session.write(image)
+        if self.write_frames:
+            cv2.imwrite(out_path, image)
+            print(f"Labeled and saved: {out_path}")
+        else:
+            print(f"Labeled and encoded: {os.path.basename(image_path)}")
 
     def __call__(self):
-        image_files = sorted(os.listdir(self.images_folder))
+        if self.image_names is not None:
+            image_files = list(self.image_names)
+        else:
+            image_files = sorted(FolderIndex.get(self.images_folder).names(include_hidden=True))
+        annotations = FolderIndex.get(self.annotations_folder) if os.path.isdir(self.annotations_folder) else None
         total = len(image_files)
 
         for idx, image_name in enumerate(image_files, 1):
@@ -79,11 +102,17 @@ class FullFrameAnnotator:
             base, ext = os.path.splitext(image_name)
             annotation_path = os.path.join(self.annotations_folder, base + '.txt')
 
-            if not os.path.isfile(image_path):
-                continue
-
-            if os.path.isfile(annotation_path):
+            if annotations is not None and base + '.txt' in annotations:
                 self.draw_boxes(image_path, annotation_path)
             else:
-                shutil.copy(image_path, os.path.join(self.output_folder, image_name))
-                print(f"No annotation for {image_name}; copied image only.")
+                if self.session is not None:
+                    image = cv2.imread(image_path)
+                    if image is not None:
+                        self.session.write(image)
+                if self.write_frames:
+                    shutil.copy(image_path, os.path.join(self.output_folder, image_name))
+                    print(f"No annotation for {image_name}; copied image only.")
+                else:
+                    print(f"No annotation for {image_name}; encoded image only.")
+
+        FolderIndex.invalidate(self.output_folder)
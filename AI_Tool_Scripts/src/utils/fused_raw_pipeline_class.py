@@ -0,0 +1,56 @@
+import numpy as np
+from utils.raw_to_16_class import RawTo16
+from utils.bit_depth_convert_class import BitDepthConverter
+from utils.petri_dish_cropper_circle_class import PetriDishCropperCircle
+
+# Class to go from raw Bayer files straight to 8-bit petri dish cropped frames in a single pass
+# Workflow:
+# 1. Read each raw file once and demosaic it, same as RawTo16 (methods, workers, output formats and resume).
+# 2. Convert the demosaiced frame to 8-bit in memory, same conversion as BitDepthConverter.
+# 3. Apply the circular petri dish mask in memory, same mask as PetriDishCropperCircle.
+# 4. Write the one final frame.
+
+# Notes:
+# Replaces the RawTo16 -> BitDepthConverter -> PetriDishCropperCircle chain, which decodes and re-encodes
+# every frame three times, and gives the same pixels as running those three steps one after another.
+# Dish center and radius are given in full resolution pixels, they are halved for the "half" method.
+# Frames already 8-bit (VNG method) skip the conversion.
+# value_range is passed to BitDepthConverter, e.g. (0, 4095) for a fixed 12-bit stretch.
+# square and scale are passed to PetriDishCropperCircle, crop_offset.json is written before the first frame.
+
+class FusedRawPipeline(RawTo16):
+    def __init__(self, input_folder, output_folder, width=4056, height=3040, stride_bytes=8128,
+                 centerX=2028, centerY=1420, radius=1200, value_range=None, square=False, scale=1.0, **kwargs):
+        super().__init__(input_folder, output_folder, width, height, stride_bytes, **kwargs)
+        self.dish = (centerX, centerY, radius)
+        self.value_range = value_range
+
+        self.square = square
+        self.scale = scale
+
+        dish_scale = 0.5 if self.method == "half" else 1.0
+        self.converter = BitDepthConverter(output_folder, output_folder, value_range=value_range)
+        self.cropper = PetriDishCropperCircle(
+            output_folder, output_folder,
+            int(round(centerX * dish_scale)), int(round(centerY * dish_scale)), int(round(radius * dish_scale)),
+            square=square, scale=scale
+        )
+
+    def process_frame(self, rgb_image):
+        if rgb_image.dtype == np.uint16:
+            rgb_image = self.converter.convert_16bit_to_8bit(rgb_image)
+        return self.cropper.crop_image(rgb_image)
+
+    def manifest_settings(self):
+        settings = super().manifest_settings()
+        value_range = list(self.value_range) if self.value_range else None
+        settings["fused"] = {"bit_depth": 8, "dish": list(self.dish), "value_range": value_range,
+                             "square": self.square, "scale": self.scale}
+        return settings
+
+    def execute(self, extensions=(".raw",)):
+        if self.method == "half":
+            self.cropper.write_offset((self.height // 2, self.width // 2))
+        else:
+            self.cropper.write_offset((self.height, self.width))
+        super().execute(extensions)
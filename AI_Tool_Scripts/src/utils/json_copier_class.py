@@ -1,5 +1,6 @@
 import os
 import shutil
+from utils.folder_index_class import FolderIndex
 
 # Helper class to copy JSON files from one folder to another
 # Workflow:
@@ -29,7 +30,8 @@ class JsonCopier:
             print(f"Destination folder {self.destination_folder} does not exist.")
             return
 
-        json_files = [f for f in os.listdir(self.source_folder) if f.lower().endswith(".json")]
+        # Hidden JSON files are tool bookkeeping (e.g. the demosaic manifest) rather than experiment configs
+        json_files = FolderIndex.get(self.source_folder).names((".json",))
 
         if not json_files:
             print(f"No JSON files found in {self.source_folder}")
@@ -38,7 +40,7 @@ class JsonCopier:
         for idx, filename in enumerate(json_files, 1):
             if self.should_stop:
                 print(f"Stopping JsonCopier early at file [{idx}/{len(json_files)}]")
-                return
+                break
 
             src_path = os.path.join(self.source_folder, filename)
             dst_path = os.path.join(self.destination_folder, filename)
@@ -48,3 +50,5 @@ class JsonCopier:
                 print(f"Copied config: {src_path} → {dst_path}")
             except Exception as e:
                 print(f"Error copying {filename}: {e}")
+
+        FolderIndex.invalidate(self.destination_folder)
@@ -1,7 +1,7 @@
 import os
 import cv2
-import glob
 from collections import defaultdict
+from utils.folder_index_class import FolderIndex
 
 # Class to crop larvae objects from images based on annotations from a text file (YOLO format + Object ID from Boxmot Output)
 # Workflow:
@@ -28,7 +28,7 @@ class LarvaeObjectCropper:
         self.should_stop = True
 
     def run(self):
-        txt_files = sorted(glob.glob(os.path.join(self.input_folder, "*.txt")))
+        txt_files = sorted(entry.path for entry in FolderIndex.get(self.input_folder).files((".txt",)))
         total_files = len(txt_files)
 
         for idx, txt_file in enumerate(txt_files, 1):
@@ -82,10 +82,13 @@ class LarvaeObjectCropper:
 
             print(f"[{idx}/{total_files}] Finished processing {base_name}")
 
+        for obj_id in self.unique_ids:
+            FolderIndex.invalidate(os.path.join(self.output_folder, f"larvae_{obj_id}"))
+
     def find_matching_image_by_name(self, base_name: str) -> str:
         extensions = ['.png', '.jpg', '.jpeg']
+        images = FolderIndex.get(self.image_folder)
         for ext in extensions:
-            image_path = os.path.join(self.image_folder, base_name + ext)
-            if os.path.exists(image_path):
-                return image_path
+            if base_name + ext in images:
+                return os.path.join(self.image_folder, base_name + ext)
         return None
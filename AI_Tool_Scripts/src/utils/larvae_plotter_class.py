@@ -0,0 +1,185 @@
+import os
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.backends.backend_pdf import PdfPages
+
+# Class to plot speed, direction, accumulated distance and trajectory of every larva
+# Workflow:
+# 1. Initialize the class with the framerate, plot colors, number of worker processes and output format.
+# 2. The first plot in a process builds the 1x4 figure template: axes, labels, empty lines and the layout.
+# 3. Every larva is drawn by swapping its data into the template lines, rescaling the axes and setting the titles.
+# 4. "png" and "svg" save one file per larva, "pdf" saves every larva as a page of one PDF.
+
+# Notes:
+# Uses the object oriented Figure API on an Agg canvas, pyplot and the GUI backend are never touched, so plots
+# can be drawn from a QThread and from worker processes.
+# The template is built once per process, tight_layout runs once on it instead of once per larva.
+# workers > 1 draws the png/svg files on a process pool ("spawn" start method, as for RawTo16), at most
+# max_in_flight larvae (default 2 per worker) are queued at once. The pdf pages are drawn in the calling process
+# as PdfPages writes all pages to one file.
+# SVG has no pages, so "svg" writes one vector file per larva, a single file per experiment is "pdf".
+# data for a larva is a dict of arrays with the keys in DATA_COLUMNS, as in the per larva CSVs.
+
+PLOT_FORMATS = ("png", "svg", "pdf")
+DATA_COLUMNS = ["Frame", "Speed", "Direction", "Distance", "Midpoint x centre", "Midpoint y centre"]
+PLOT_COLORS = {
+    "speed": "blue",
+    "direction": "green",
+    "distance": "orange",
+    "trajectory": "purple"
+}
+
+# Plotter copy held by each pool process, set once by _init_worker so it is not pickled per larva
+_worker_plotter = None
+
+
+def _init_worker(plotter):
+    global _worker_plotter
+    _worker_plotter = plotter
+
+
+def _plot_in_worker(object_id, data, path):
+    return _worker_plotter.save(object_id, data, path)
+
+
+class LarvaePlotter:
+    def __init__(self, framerate, plot_colors=None, workers=1, max_in_flight=None, output_format="png"):
+        if output_format not in PLOT_FORMATS:
+            raise ValueError(f"Unknown plot format '{output_format}', expected one of {PLOT_FORMATS}")
+        self.framerate = framerate
+        self.plot_colors = plot_colors or PLOT_COLORS
+        self.workers = max(1, int(workers))
+        self.max_in_flight = max(1, int(max_in_flight or self.workers * 2))
+        self.output_format = output_format
+        self._template = None
+        self.should_stop = False
+
+    def stop(self):
+        self.should_stop = True
+
+    # The template holds matplotlib objects, each process builds its own
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_template"] = None
+        return state
+
+    def template(self):
+        if self._template is not None:
+            return self._template
+
+        fig = Figure(figsize=(22, 5))
+        FigureCanvasAgg(fig)
+        axs = fig.subplots(1, 4)
+        labels = [
+            ("speed", "Speed vs Time", "Time (s)", "Speed (pixels/sec)"),
+            ("direction", "Direction vs Time", "Time (s)", "Direction (degrees)"),
+            ("distance", "Accumulated Distance vs Time", "Time (s)", "Distance (pixels)"),
+            ("trajectory", "Midpoint Trajectory", "x position (normalized)", "y position (normalized)"),
+        ]
+        lines = []
+        titles = []
+        for ax, (color, title, xlabel, ylabel) in zip(axs, labels):
+            lines.append(ax.plot([], [], color=self.plot_colors[color])[0])
+            ax.set_title(f"Object 000 – {title}")
+            ax.set_xlabel(xlabel)
+            ax.set_ylabel(ylabel)
+            titles.append(title)
+        fig.tight_layout()
+        self._template = (fig, axs, lines, titles)
+        return self._template
+
+    def draw(self, object_id, data):
+        fig, axs, lines, titles = self.template()
+        time = data["Frame"].astype(float) / self.framerate
+        lines[0].set_data(time, data["Speed"])
+        lines[1].set_data(time, data["Direction"])
+        lines[2].set_data(time, data["Distance"])
+        lines[3].set_data(data["Midpoint x centre"], data["Midpoint y centre"])
+        for ax, title in zip(axs, titles):
+            ax.relim()
+            ax.autoscale_view()
+            ax.set_title(f"Object {object_id} – {title}")
+        return fig
+
+    def save(self, object_id, data, path):
+        self.draw(object_id, data).savefig(path)
+        return path
+
+    def plot_path(self, larvae_folder_path, object_id):
+        return os.path.join(larvae_folder_path, f"larvae_{object_id}",
+                            f"{object_id}_larvae_data_plot.{self.output_format}")
+
+    # larvae is a list of (object ID, data), returns the written files
+    def plot_all(self, larvae, larvae_folder_path):
+        if self.output_format == "pdf":
+            return [self.plot_pdf(larvae, os.path.join(larvae_folder_path, "larvae_plots.pdf"))]
+        jobs = [(object_id, data, self.plot_path(larvae_folder_path, object_id)) for object_id, data in larvae]
+        for _, _, path in jobs:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        if self.workers == 1 or len(jobs) <= 1:
+            return self.plot_serial(jobs)
+        return self.plot_parallel(jobs)
+
+    def plot_serial(self, jobs):
+        saved = []
+        for idx, (object_id, data, path) in enumerate(jobs, 1):
+            if self.should_stop:
+                print(f"Stopping plotting at {idx}/{len(jobs)} larvae")
+                break
+            try:
+                saved.append(self.save(object_id, data, path))
+                print(f"[{idx}/{len(jobs)}] Plot saved to: {path}")
+            except Exception as e:
+                print(f"[{idx}/{len(jobs)}] Error plotting object {object_id}: {e}")
+        return saved
+
+    def plot_parallel(self, jobs):
+        total = len(jobs)
+        workers = min(self.workers, total)
+        print(f"Plotting {total} larvae with {workers} worker processes")
+
+        saved = []
+        pending = deque()
+        next_idx = 0
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                 initializer=_init_worker, initargs=(self,)) as pool:
+            while next_idx < total or pending:
+                while not self.should_stop and next_idx < total and len(pending) < self.max_in_flight:
+                    object_id, data, path = jobs[next_idx]
+                    next_idx += 1
+                    pending.append((next_idx, object_id, pool.submit(_plot_in_worker, object_id, data, path)))
+
+                if self.should_stop:
+                    for *_, future in pending:
+                        future.cancel()
+
+                if not pending:
+                    break
+
+                idx, object_id, future = pending.popleft()
+                if future.cancelled():
+                    continue
+                try:
+                    path = future.result()
+                    saved.append(path)
+                    print(f"[{idx}/{total}] Plot saved to: {path}")
+                except Exception as e:
+                    print(f"[{idx}/{total}] Error plotting object {object_id}: {e}")
+
+        if self.should_stop:
+            print(f"Stopping plotting at {next_idx}/{total} larvae")
+        return saved
+
+    def plot_pdf(self, larvae, pdf_path):
+        with PdfPages(pdf_path) as pdf:
+            for idx, (object_id, data) in enumerate(larvae, 1):
+                if self.should_stop:
+                    print(f"Stopping plotting at {idx}/{len(larvae)} larvae")
+                    break
+                pdf.savefig(self.draw(object_id, data))
+        print(f"Plots of {len(larvae)} larvae saved to: {pdf_path}")
+        return pdf_path
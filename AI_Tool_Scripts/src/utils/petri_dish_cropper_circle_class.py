@@ -1,6 +1,9 @@
 import os
+import json
+import threading
 import cv2
 import numpy as np
+from utils.frame_io_class import FrameReader, FrameWriter, FRAME_EXTENSIONS
 
 # Class to crop images in a circular area
 # Workflow:
@@ -11,50 +14,148 @@ import numpy as np
 # 5. Method to process the images, crop them, and save them to the output folder.
 # 6. If no images are found, print a message and return.
 
+# Notes:
+# Frames are read and written through FrameReader/FrameWriter so PNG, TIFF, .npy and frame stack inputs are accepted.
+# Each output keeps the format of its input, png_compression sets the zlib level of PNG outputs.
+# The circular mask only covers the dish's bounding square, it is drawn once and cached per
+# (frame shape, center, radius), only that square of each frame is masked.
+# square=True writes just the dish's bounding square (clipped to the frame) instead of a mostly black full frame,
+# scale < 1 downscales the written frames (INTER_AREA), both cut the pixels every later stage has to handle.
+# A crop_offset.json sidecar in the output folder records the offset and scale so coordinates in the written
+# frames map back to the source frames: source_x = offset_x + x / scale, source_y = offset_y + y / scale.
+# CropScheduler calls crop_file from several threads, the sidecar is written once under a lock and replaced
+# atomically so it is never read half written.
+
+CROP_OFFSET_FILE = "crop_offset.json"
+
 
 class PetriDishCropperCircle:
-    def __init__(self, input_folder, output_folder, centerX, centerY, radius):
+    def __init__(self, input_folder, output_folder, centerX, centerY, radius, png_compression=None,
+                 square=False, scale=1.0):
         self.input_folder = input_folder
         self.output_folder = output_folder
         self.center = (centerX, centerY)
         self.radius = radius
+        self.png_compression = png_compression
+        self.square = square
+        self.scale = float(scale)
+        self._masks = {}
+        self._offset_written = False
+        self._offset_lock = threading.Lock()
         self.should_stop = False
         os.makedirs(self.output_folder, exist_ok=True)
 
+    # The lock cannot be pickled (FusedRawPipeline hands its cropper to pool processes), each copy gets its own
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_offset_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._offset_lock = threading.Lock()
+
+    # Dish bounding square clipped to the frame, as (x0, y0, x1, y1)
+    def crop_bounds(self, shape):
+        h, w = shape[:2]
+        cx, cy = self.center
+        return (max(cx - self.radius, 0), max(cy - self.radius, 0),
+                min(cx + self.radius + 1, w), min(cy + self.radius + 1, h))
+
+    def mask_for(self, shape):
+        key = (shape[0], shape[1], self.center, self.radius)
+        mask = self._masks.get(key)
+        if mask is None:
+            x0, y0, x1, y1 = self.crop_bounds(shape)
+            mask = np.zeros((max(y1 - y0, 0), max(x1 - x0, 0)), dtype=np.uint8)
+            if mask.size:
+                cv2.circle(mask, (self.center[0] - x0, self.center[1] - y0), self.radius, 255, thickness=-1)
+            self._masks[key] = mask
+        return mask
+
     def crop_image(self, image):
-        h, w = image.shape[:2]
-        mask = np.zeros((h, w), dtype=np.uint8)
-        cv2.circle(mask, self.center, self.radius, 255, thickness=-1)
-        return cv2.bitwise_and(image, image, mask=mask)
+        x0, y0, x1, y1 = self.crop_bounds(image.shape)
+        mask = self.mask_for(image.shape)
+
+        if not mask.size:
+            if self.square:
+                raise ValueError(f"Dish at {self.center} with radius {self.radius} lies outside the frame")
+            cropped = np.zeros_like(image)
+        else:
+            region = image[y0:y1, x0:x1]
+            cropped = cv2.bitwise_and(region, region, mask=mask)
+            if not self.square:
+                full = np.zeros_like(image)
+                full[y0:y1, x0:x1] = cropped
+                cropped = full
+
+        if self.scale != 1.0:
+            cropped = cv2.resize(cropped, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+        return cropped
+
+    def write_offset(self, shape):
+        h, w = shape[:2]
+        x0, y0, x1, y1 = self.crop_bounds(shape)
+        if not self.square:
+            x0, y0, x1, y1 = 0, 0, w, h
+        offset = {
+            "center": list(self.center),
+            "radius": self.radius,
+            "square": self.square,
+            "offset": [x0, y0],
+            "scale": self.scale,
+            "source_size": [w, h],
+            "crop_size": [int(round((x1 - x0) * self.scale)), int(round((y1 - y0) * self.scale))],
+        }
+        path = os.path.join(self.output_folder, CROP_OFFSET_FILE)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(offset, f, indent=1)
+        os.replace(tmp_path, path)
 
     def stop(self):
         self.should_stop = True
 
-    def execute(self, extensions=(".png", ".jpg", ".jpeg", ".tif", ".tiff")):
-        files = [f for f in os.listdir(self.input_folder) if f.lower().endswith(extensions)]
+    def execute(self, extensions=FRAME_EXTENSIONS):
+        reader = FrameReader(self.input_folder)
+        files = reader.list_frames(extensions)
         if not files:
             print("No images found in", self.input_folder)
             return
 
+        writer = FrameWriter(self.output_folder, png_compression=self.png_compression)
+        try:
+            self.crop_files(files, reader, writer)
+        finally:
+            writer.close()
+
+    def crop_files(self, files, reader, writer):
         total = len(files)
         for idx, filename in enumerate(files, 1):
             if self.should_stop:
                 print(f"Stopping cropping at {idx}/{total} files")
                 break
 
-            filepath = os.path.join(self.input_folder, filename)
-            image = cv2.imread(filepath, cv2.IMREAD_UNCHANGED)
-            if image is None:
-                print("Error reading", filepath)
-                continue
-
             try:
-                processed = self.crop_image(image)
-                output_path = os.path.join(self.output_folder, filename)
-                cv2.imwrite(output_path, processed)
-                print(f"[{idx}/{total}] Cropped and saved: {output_path}")
+                print(f"[{idx}/{total}] {self.crop_file(filename, reader, writer)}")
             except Exception as e:
                 print(f"Skipping {filename} due to error: {e}")
 
-    def __call__(self, extensions=(".png", ".jpg", ".jpeg", ".tif", ".tiff")):
+    # Crops one frame, also used by CropScheduler to crop frames of several folders on one pool
+    def crop_file(self, filename, reader, writer):
+        filepath = os.path.join(self.input_folder, filename)
+        image = reader.read(filename)
+        if image is None:
+            return f"Error reading {filepath}"
+
+        processed = self.crop_image(image)
+        with self._offset_lock:
+            if not self._offset_written:
+                self.write_offset(image.shape)
+                self._offset_written = True
+        output_path = os.path.join(self.output_folder, filename)
+        writer.write(filename, processed)
+        return f"Cropped and saved: {output_path}"
+
+    def __call__(self, extensions=FRAME_EXTENSIONS):
         self.execute(extensions)
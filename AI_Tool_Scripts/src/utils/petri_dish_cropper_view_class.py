@@ -1,6 +1,7 @@
 import os
 import cv2
 import numpy as np
+from utils.frame_io_class import FrameReader, FRAME_EXTENSIONS
 
 # Class to veiw cropped images in a circular area 
 # Workflow:
@@ -23,16 +24,16 @@ class PetriDishCropperView:
         cv2.circle(mask, self.center, self.radius, 255, thickness=-1)
         return cv2.bitwise_and(image, image, mask=mask)
 
-    def view(self, extensions=(".png", ".jpg", ".jpeg", ".tif", ".tiff")):
-        files = sorted(f for f in os.listdir(self.input_folder)
-                       if f.lower().endswith(extensions))
+    def view(self, extensions=FRAME_EXTENSIONS):
+        reader = FrameReader(self.input_folder)
+        files = sorted(reader.list_frames(extensions))
         if not files:
             print("No images found in", self.input_folder)
             return
 
         first = files[0]
         path = os.path.join(self.input_folder, first)
-        img = cv2.imread(path, cv2.IMREAD_UNCHANGED)
+        img = reader.read(first)
         if img is None:
             print("Error reading", path)
             return
@@ -44,5 +45,5 @@ class PetriDishCropperView:
         cv2.waitKey(0)
         cv2.destroyWindow(window_name)
 
-    def __call__(self, extensions=(".png", ".jpg", ".jpeg", ".tif", ".tiff")):
+    def __call__(self, extensions=FRAME_EXTENSIONS):
         self.view(extensions)
@@ -0,0 +1,69 @@
+import os
+import numpy as np
+
+# Class to read raw Bayer frames (rows padded out to a stride) into one reusable contiguous buffer
+# Workflow:
+# 1. Initialize the class with width, height, stride in bytes and the sample dtype.
+# 2. Validate that the stride is a whole number of samples and holds at least one full row.
+# 3. Check the file size against height * stride before reading, same check as the old size-mismatch error.
+# 4. readinto a preallocated strided buffer, no intermediate bytes object is created.
+# 5. Strip the stride padding by copying the valid columns into a preallocated contiguous Bayer buffer.
+
+# Notes:
+# Both buffers are allocated once per reader and reused for every frame.
+# The returned array is overwritten by the next read, copy it if it has to outlive that.
+# When the stride has no padding the strided buffer is already contiguous and is returned directly.
+
+class RawFrameReader:
+    def __init__(self, width, height, stride_bytes, dtype=np.uint16):
+        self.width = width
+        self.height = height
+        self.stride_bytes = stride_bytes
+        self.dtype = np.dtype(dtype)
+
+        itemsize = self.dtype.itemsize
+        if stride_bytes % itemsize != 0:
+            raise ValueError(f"Stride of {stride_bytes} bytes is not a multiple of the {self.dtype.name} sample size.")
+        if stride_bytes < width * itemsize:
+            raise ValueError(f"Stride of {stride_bytes} bytes is smaller than a {width} pixel {self.dtype.name} row.")
+
+        self.expected_elements = (height * stride_bytes) // itemsize
+        self._stride_buffer = np.empty((height, stride_bytes // itemsize), dtype=self.dtype)
+        self._stride_bytes_view = self._stride_buffer.reshape(-1).view(np.uint8)
+
+        if stride_bytes == width * itemsize:
+            self._bayer_buffer = None
+        else:
+            self._bayer_buffer = np.empty((height, width), dtype=self.dtype)
+
+    def read_strided(self, file_path):
+        with open(file_path, "rb", buffering=0) as f:
+            file_size = os.fstat(f.fileno()).st_size
+            if file_size != self._stride_bytes_view.size:
+                raise ValueError(
+                    f"Size mismatch: Expected {self.expected_elements} {self.dtype.name} elements, "
+                    f"but got {file_size // self.dtype.itemsize} elements."
+                )
+
+            read = 0
+            while read < file_size:
+                n = f.readinto(self._stride_bytes_view[read:])
+                if not n:
+                    raise ValueError(f"Short read: got {read} of {file_size} bytes from {file_path}")
+                read += n
+
+        return self._stride_buffer
+
+    # Raw bytes of the last file read, stride padding included
+    def last_read_bytes(self):
+        return self._stride_bytes_view
+
+    def read(self, file_path):
+        strided = self.read_strided(file_path)
+        if self._bayer_buffer is None:
+            return strided
+        np.copyto(self._bayer_buffer, strided[:, :self.width])
+        return self._bayer_buffer
+
+    def __call__(self, file_path):
+        return self.read(file_path)
@@ -1,53 +1,163 @@
 import os
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 import cv2
+from utils.raw_frame_reader_class import RawFrameReader
+from utils.frame_io_class import FrameWriter, FORMAT_EXTENSIONS, load_stack_index
+from utils.folder_index_class import FolderIndex
+from utils.demosaic_manifest_class import DemosaicManifest, hash_bytes
 
-# Class to convert raw files to 16-bit PNG images via demosaicing of raw Bayer data
+# Class to convert raw files to 16-bit PNG (or TIFF/.npy/frame stack) images via demosaicing of raw Bayer data
 # Workflow:
-# 1. Read the raw file
-# 2. Reshape the data to a 2D array with the specified/calulated stride
-# 3. Extract the valid data
-# 4. Demosaic the Bayer data to RGB using OpenCV - expects array 
-# 5. Save the RGB image as a PNG file
+# 1. Read the raw file into the reusable strided buffer of a RawFrameReader
+# 2. Check the size against the specified/calulated stride
+# 3. Extract the valid data into the reusable contiguous Bayer buffer
+# 4. Demosaic the Bayer data to RGB with the selected method - OpenCV expects array 
+# 5. Save the RGB image in the selected output format through a FrameWriter
 # 6. Rename the output file to ensure consistency in naming pattern
+# 7. Record the source size, mtime and content hash of each converted frame in the output folder's manifest
+
+# Notes:
+# Demosaic methods (see benchmarks/demosaic_benchmark.py for measured speed and PSNR):
+# "ea"       - OpenCV edge-aware interpolation, default and the method used before methods were selectable
+# "bilinear" - OpenCV bilinear interpolation, faster with softer edges
+# "vng"      - OpenCV variable number of gradients, OpenCV only supports 8-bit input for VNG so samples are
+#              scaled down from sensor_bits to 8-bit first and the output PNG is 8-bit
+# "half"     - 2x2 binning, each BGGR quad becomes one RGB pixel (greens averaged), no interpolation
+#              and half the width/height, meant for tracking-only runs
+# Output formats are the FrameWriter formats (see frame_io_class.py), png_compression only applies to "png".
+# Frame stack chunks are appended by the calling process in frame order, pool workers hand those images back.
+# With resume enabled, frames whose output exists and whose source matches the manifest are skipped, so a
+# cancelled or crashed run picks up where it stopped. Changing width/height/stride/method/format redoes all frames.
+# workers > 1 spreads the files over a process pool, each frame is demosaiced and saved inside a worker process.
+# At most max_in_flight frames are queued at once (default 2 per worker) so memory stays flat on long captures.
+# Results are collected in submission order so the progress log and output naming match the single core run.
+# The pool uses the "spawn" start method as the class is run from a QThread, forking a threaded Qt process is unsafe.
+
+# Converter copy held by each pool process, set once by _init_worker so it is not pickled per frame
+_worker_converter = None
+
+
+def _init_worker(converter):
+    global _worker_converter
+    _worker_converter = converter
+
+
+def _demosaic_in_worker(file_path, output_path):
+    return _worker_converter.demosaic(file_path, output_path)
+
 
 class RawTo16:
-    def __init__(self, input_folder, output_folder, width=4056, height=3040, stride_bytes=8128, dtype=np.uint16):
+    DEMOSAIC_METHODS = ("ea", "bilinear", "vng", "half")
+
+    def __init__(self, input_folder, output_folder, width=4056, height=3040, stride_bytes=8128, dtype=np.uint16,
+                 workers=1, max_in_flight=None, method="ea", sensor_bits=12,
+                 output_format="png", png_compression=None, resume=True):
         self.input_folder = input_folder
         self.output_folder = output_folder
         self.width = width
         self.height = height
         self.stride_bytes = stride_bytes
         self.dtype = dtype
+        if method not in self.DEMOSAIC_METHODS:
+            raise ValueError(f"Unknown demosaic method '{method}', expected one of {self.DEMOSAIC_METHODS}")
+        self.method = method
+        self.sensor_bits = sensor_bits
+        if output_format not in FORMAT_EXTENSIONS:
+            raise ValueError(f"Unknown output format '{output_format}', expected one of {tuple(FORMAT_EXTENSIONS)}")
+        self.output_format = output_format
+        self.png_compression = png_compression
+        self.resume = resume
+        self.workers = max(1, int(workers or 1))
+        self.max_in_flight = max_in_flight or self.workers * 2
         self.should_stop = False
+        self._reader = None
+        self._writer = None
         os.makedirs(self.output_folder, exist_ok=True)
 
+    # The reader buffers and writer are per process, pool workers build their own on first use
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_reader"] = None
+        state["_writer"] = None
+        return state
+
     def stop(self):
         self.should_stop = True
 
-    def demosaic(self, file_path, output_path):
-        with open(file_path, "rb") as f:
-            raw_data = np.frombuffer(f.read(), dtype=np.uint16)
+    # Length of one raw frame in this layout, FolderCleaner checks raw files against it
+    def raw_size(self):
+        return self.height * self.stride_bytes
+
+    def read_bayer(self, file_path):
+        if self._reader is None:
+            self._reader = RawFrameReader(self.width, self.height, self.stride_bytes, self.dtype)
+        return self._reader.read(file_path)
+
+    def frame_writer(self):
+        if self._writer is None:
+            self._writer = FrameWriter(self.output_folder, self.output_format, self.png_compression)
+        return self._writer
 
-        expected_elements = (self.height * self.stride_bytes) // 2
-        if raw_data.size != expected_elements:
-            raise ValueError(
-                f"Size mismatch: Expected {expected_elements} uint16 elements, but got {raw_data.size} elements."
-            )
+    # Demosaic and colour converion from OpenCV for the Bayer files BGGR to RGB, Edge-Aware by default
+    def demosaic_bayer(self, bayer_array):
+        if self.method == "ea":
+            return cv2.demosaicing(bayer_array, cv2.COLOR_BayerBGGR2RGB_EA)
+        if self.method == "bilinear":
+            return cv2.demosaicing(bayer_array, cv2.COLOR_BayerBGGR2RGB)
+        if self.method == "vng":
+            scale = 1.0 / (1 << max(self.sensor_bits - 8, 0))
+            bayer_8bit = cv2.convertScaleAbs(bayer_array, alpha=scale)
+            return cv2.demosaicing(bayer_8bit, cv2.COLOR_BayerBGGR2RGB_VNG)
+        return self.bin_2x2(bayer_array)
 
-        raw_data_with_stride = raw_data.reshape((self.height, self.stride_bytes // 2))
-        useful_width_pixels = self.width
-        valid_data = raw_data_with_stride[:, :useful_width_pixels]
-        bayer_array = np.ascontiguousarray(valid_data).copy()
+    # BGGR quad layout: B at (0, 0), G at (0, 1) and (1, 0), R at (1, 1)
+    # Channel order matches the OpenCV RGB conversions above so outputs are interchangeable
+    def bin_2x2(self, bayer_array):
+        h = bayer_array.shape[0] // 2 * 2
+        w = bayer_array.shape[1] // 2 * 2
+        blue = bayer_array[0:h:2, 0:w:2]
+        green = cv2.addWeighted(bayer_array[0:h:2, 1:w:2], 0.5, bayer_array[1:h:2, 0:w:2], 0.5, 0)
+        red = bayer_array[1:h:2, 1:w:2]
+        return cv2.merge([red, green, blue])
 
-        # Demosaic the Bayer image to RGB - Edge-Aware method chosen
-        # Demosaic and colour converion function from OpenCV for the Bayer files BGGR to RGB
-        # rgb_image = cv2.cvtColor(bayer_array, cv2.COLOR_BayerBGGR2RGB)
-        # rgb_image = cv2.cvtColor(bayer_array, cv2.COLOR_BayerBGGR2RGB)
-        # rgb_image = cv2.demosaicing(bayer_array, cv2.COLOR_BayerBGGR2RGB)
+    # Hook for subclasses to transform each demosaiced frame in memory before it is written
+    def process_frame(self, rgb_image):
+        return rgb_image
+
+    # Returns (image, source content hash), the image is only handed back for frame stack output
+    def demosaic(self, file_path, output_path):
+        bayer_array = self.read_bayer(file_path)
+        source_hash = hash_bytes(self._reader.last_read_bytes())
+        rgb_image = self.process_frame(self.demosaic_bayer(bayer_array))
+        if self.output_format == "stack":
+            return rgb_image, source_hash
+        if not self.frame_writer().write(os.path.basename(output_path), rgb_image):
+            raise ValueError(f"Could not write {output_path}")
+        return None, source_hash
 
-        rgb_image = cv2.demosaicing(bayer_array, cv2.COLOR_BayerBGGR2RGB_EA)
-        cv2.imwrite(output_path, rgb_image)
+    # Writes images handed back by demosaic and records the frame in the manifest
+    def frame_done(self, manifest, input_path, output_path, stat, result):
+        rgb_image, source_hash = result
+        output_name = os.path.basename(output_path)
+        if rgb_image is not None:
+            self.frame_writer().write(output_name, rgb_image)
+        manifest.record(input_path, output_name, stat, source_hash)
+        if manifest.unsaved_records >= 25:
+            manifest.save()
+
+    def manifest_settings(self):
+        return {
+            "width": self.width,
+            "height": self.height,
+            "stride_bytes": self.stride_bytes,
+            "dtype": np.dtype(self.dtype).name,
+            "method": self.method,
+            "sensor_bits": self.sensor_bits,
+            "output_format": self.output_format,
+        }
 
     # Heplder Funtion used to rename the output file and ensures consistency filename pattern for rest of program
     # Assumption is made that the .raw files are named in a consistent pattern
@@ -72,28 +182,115 @@ class RawTo16:
                 return prefix + "_" + digits
         return base_name
 
+    def build_jobs(self, file_list):
+        index = FolderIndex.get(self.input_folder)
+        jobs = []
+        for file_name in file_list:
+            input_path = os.path.join(self.input_folder, file_name)
+            base_name = os.path.splitext(file_name)[0]
+            new_base_name = self.insert_underscore(base_name)
+            output_path = os.path.join(self.output_folder, new_base_name + FORMAT_EXTENSIONS[self.output_format])
+            entry = index.entry(file_name)
+            jobs.append((input_path, output_path, entry.stat if entry else os.stat(input_path)))
+        return jobs
+
+    def pending_jobs(self, jobs, manifest):
+        if not self.resume:
+            return jobs
+
+        stacked = load_stack_index(self.output_folder) if self.output_format == "stack" else None
+        pending = []
+        for input_path, output_path, stat in jobs:
+            output_name = os.path.basename(output_path)
+            if stacked is not None:
+                exists = os.path.splitext(output_name)[0] in stacked
+            else:
+                exists = os.path.isfile(output_path)
+            if exists and manifest.is_current(input_path, output_name, stat):
+                continue
+            pending.append((input_path, output_path, stat))
+
+        skipped = len(jobs) - len(pending)
+        if skipped:
+            print(f"Skipping {skipped}/{len(jobs)} frames already converted in {self.output_folder}")
+        return pending
+
     def execute(self, extensions=(".raw",)):
-        file_list = sorted([f for f in os.listdir(self.input_folder) if f.lower().endswith(extensions)])
+        file_list = sorted(FolderIndex.get(self.input_folder).names(extensions, include_hidden=True))
         if not file_list:
             print(f"No raw files found in {self.input_folder}")
             return
 
-        total = len(file_list)
-        for idx, file_name in enumerate(file_list, 1):
+        manifest = DemosaicManifest(self.output_folder, self.manifest_settings())
+        jobs = self.pending_jobs(self.build_jobs(file_list), manifest)
+        if not jobs:
+            print(f"All {len(file_list)} frames in {self.output_folder} are up to date")
+            manifest.save()
+            return
+
+        try:
+            if self.workers > 1 and len(jobs) > 1:
+                self.execute_parallel(jobs, manifest)
+            else:
+                self.execute_serial(jobs, manifest)
+        finally:
+            self.frame_writer().close()
+            manifest.save()
+            # Pool workers only clear their own FolderIndex cache
+            FolderIndex.invalidate(self.output_folder)
+
+    def execute_serial(self, jobs, manifest):
+        total = len(jobs)
+        for idx, (input_path, output_path, stat) in enumerate(jobs, 1):
             if self.should_stop:
                 print(f"Stopping demosaicing at {idx}/{total} files")
                 break
 
-            input_path = os.path.join(self.input_folder, file_name)
-            base_name = os.path.splitext(file_name)[0]
-            new_base_name = self.insert_underscore(base_name)
-            output_path = os.path.join(self.output_folder, new_base_name + ".png")
-
             try:
-                self.demosaic(input_path, output_path)
+                result = self.demosaic(input_path, output_path)
+                self.frame_done(manifest, input_path, output_path, stat, result)
                 print(f"[{idx}/{total}] Saved: {output_path}")
             except Exception as e:
                 print(f"[{idx}/{total}] Error processing {input_path}: {e}")
 
+    def execute_parallel(self, jobs, manifest):
+        total = len(jobs)
+        workers = min(self.workers, total)
+        print(f"Demosaicing {total} files with {workers} worker processes")
+
+        pending = deque()
+        next_idx = 0
+        finished_idx = 0
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                 initializer=_init_worker, initargs=(self,)) as pool:
+            while next_idx < total or pending:
+                while not self.should_stop and next_idx < total and len(pending) < self.max_in_flight:
+                    input_path, output_path, stat = jobs[next_idx]
+                    next_idx += 1
+                    future = pool.submit(_demosaic_in_worker, input_path, output_path)
+                    pending.append((next_idx, input_path, output_path, stat, future))
+
+                if self.should_stop:
+                    # Frames still queued are dropped, frames already being demosaiced are left to finish
+                    for *_, future in pending:
+                        future.cancel()
+
+                if not pending:
+                    break
+
+                idx, input_path, output_path, stat, future = pending.popleft()
+                if future.cancelled():
+                    continue
+                finished_idx = idx
+                try:
+                    self.frame_done(manifest, input_path, output_path, stat, future.result())
+                    print(f"[{idx}/{total}] Saved: {output_path}")
+                except Exception as e:
+                    print(f"[{idx}/{total}] Error processing {input_path}: {e}")
+
+        if self.should_stop and finished_idx < total:
+            print(f"Stopping demosaicing at {finished_idx + 1}/{total} files")
+
     def __call__(self, extensions=(".raw",)):
         self.execute(extensions)
\ No newline at end of file
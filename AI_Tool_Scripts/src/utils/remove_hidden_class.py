@@ -1,4 +1,5 @@
 import os
+from utils.folder_index_class import FolderIndex
 
 # Helper Class to remove hidden files from a specified folder
 # Workflow:
@@ -27,7 +28,7 @@ class RemoveHiddenFiles:
             return
 
         removed = 0
-        for name in os.listdir(self.folder):
+        for name in FolderIndex.get(self.folder).names(include_hidden=True):
             if self.should_stop:
                 print("Stopping RemoveHiddenFiles early.")
                 return
@@ -54,6 +55,8 @@ class RemoveHiddenFiles:
                 except Exception as e:
                     print(f"Could not remove {path}: {e}")
 
+        if removed:
+            FolderIndex.invalidate(self.folder)
         print(f"\nHidden image cleanup complete. Total removed: {removed}")
 
     def __call__(self):
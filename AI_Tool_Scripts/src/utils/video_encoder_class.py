@@ -1,71 +1,225 @@
 import os
 import subprocess
 import cv2
+from utils.frame_io_class import FrameReader, STACK_EXTENSION
+from utils.encoder_session_class import (
+    EncoderSession, DEFAULT_PROFILE, output_pix_fmt, codec_args, join_filters, profile_settings
+)
+from utils.folder_index_class import FolderIndex, FRAME_NUMBER, parse_frame_number
+from utils.encode_queue_class import FFMPEG_PROGRESS_ARGS
+from utils.flashing_frames_class import FLASHING_FRAMES_FILE, frame_ranges, load_flashing_metadata
 
 # Class to encode images into a video using FFMPEG
 # Workflow:
-# 1. Initialize the class with input and output folder paths, output file name, bit depth, and framerate.
+# 1. Initialize the class with input and output folder paths, output file name, bit depth, framerate,
+#    encoder profile and encoder threads.
 # 2. Create the output folder if it doesn't exist.
 # 3. Method to stop processing.
-# 4. Derive the input pattern for the images based on their filenames.
-# 5. Build the FFMPEG command to encode the images into a video.
+# 4. Find the image sequence in the input folder and sort it by frame number, reporting any missing frames.
+# 5. Build the FFMPEG command to encode the images into a video, reading them from an ffconcat list.
 # 6. Run the FFMPEG command to create the video.
 # 7. Handle errors during the encoding process.
 
 # Notes:
 # Assumes the input images are named in a specific format (e.g., "frame_00001.png").
+# The frames are listed one by one in a hidden .<output name>.ffconcat file in the output folder instead of being
+# handed to ffmpeg as a frame_%05d pattern, which stopped at the first missing frame (e.g. one removed by
+# FolderCleaner) and silently truncated the video. If a folder holds several sequences the largest one is used.
+# Missing frames are reported and kept in gaps, fill_gaps=True repeats the previous frame in their place so the
+# video keeps one frame per frame number and its timing stays correct, otherwise they are skipped.
 # The class uses FFMPEG to encode the images into a video file with the specified bit depth and framerate.
-# Encoder is lossless codec called FFV1.
+# Encoder is lossless codec called FFV1, by default multi-threaded FFV1 level 3 (profile "ffv1_mt").
 # Pixle format is set to yuv420p for 8-bit depth and yuv422p16le for 16-bit depth.
+# profile picks one of the encoder profiles in encoder_session_class.py, the x264 review profiles are lossy,
+# always 8-bit and write .mp4 instead of .avi. threads defaults to the core count (at most 16).
+# progress=True adds -progress pipe:1 so the frame count and fps can be followed on stdout (see EncodeQueue).
+# Folders holding .npy frames or a frame stack (see frame_io_class.py) cannot be read by ffmpeg directly,
+# those frames are read in Python and streamed to ffmpeg stdin through an EncoderSession in frame order with
+# the same gap handling (needs_pipe() is True), a filled gap writes the frame already in memory again.
+# open_session() gives other classes a session writing to this encoder's output.
+# Piped runs pass -y as ffmpeg's overwrite prompt would otherwise read its answer from the frame pipe.
+# If a flashing_frames.json sidecar (FlashingFrames mode="metadata") is found in the input folder, or passed as
+# flash_sidecar, the outline is burnt in while encoding with a drawbox filter enabled only on those frames.
+# Frame numbers are mapped to ffmpeg's output frame index n through the order the frames are encoded in.
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".tif", ".tiff")
+
+
+# Missing frame numbers of a sorted sequence as (first, last) ranges
+def frame_gaps(frame_numbers):
+    return [(prev + 1, frame - 1) for prev, frame in zip(frame_numbers, frame_numbers[1:]) if frame - prev > 1]
+
+
+def describe_gaps(gaps):
+    return ", ".join(str(start) if start == end else f"{start}-{end}" for start, end in gaps)
+
 
 class VideoEncoderFFMPEG:
     def __init__(self, input_folder, output_folder, output_file_name,
-                 bit_depth, framerate=10):
+                 bit_depth, framerate=10, flash_sidecar=None, profile=DEFAULT_PROFILE, threads=None,
+                 progress=False, fill_gaps=False):
+        profile_settings(profile)
         self.input_folder = input_folder
+        self.flash_sidecar = flash_sidecar or os.path.join(input_folder, FLASHING_FRAMES_FILE)
         self.output_folder = output_folder
         self.output_file_name = output_file_name
         self.bit_depth = bit_depth
         self.framerate = framerate
+        self.profile = profile
+        self.threads = threads
+        self.progress = progress
+        self.fill_gaps = fill_gaps
+        self.gaps = []
         self.should_stop = False
         os.makedirs(self.output_folder, exist_ok=True)
 
     def stop(self):
         self.should_stop = True
 
-    def derive_input_pattern(self):
-        for fname in os.listdir(self.input_folder):
-            name, ext = os.path.splitext(fname)
-            ext_low = ext.lower()
-            if ext_low not in (".png", ".jpg", ".jpeg", ".tif", ".tiff"):
+    # Largest image sequence in the folder as {frame number: file name}, files are grouped by the name in front
+    # of "frame_<number>" and their extension so stray files of another sequence are never mixed in
+    def frame_sequence(self):
+        groups = {}
+        for entry in FolderIndex.get(self.input_folder).files(IMAGE_EXTENSIONS):
+            if entry.frame is None:
                 continue
-            if len(name) < 11:
-                continue
-            suffix = name[-11:]
-            if suffix.startswith("frame_") and suffix[6:].isdigit():
-                prefix = name[:-11]
-                return os.path.join(
-                    self.input_folder,
-                    f"{prefix}frame_%05d{ext}"
-                )
-        raise FileNotFoundError("No files ending with 'frame_#####.<ext>' found")
+            stem, ext = os.path.splitext(entry.name)
+            groups.setdefault((FRAME_NUMBER.sub("", stem), ext.lower()), {})[entry.frame] = entry.name
+        if not groups:
+            return {}
+        return max(groups.values(), key=len)
 
-    def build_command_normal(self):
-        inp_pattern = self.derive_input_pattern()
+    # Frame numbers in the order they are encoded, with fill_gaps a missing frame repeats the frame before it
+    def encoding_order(self, frame_numbers):
+        self.gaps = frame_gaps(frame_numbers)
+        if self.gaps:
+            missing = sum(end - start + 1 for start, end in self.gaps)
+            action = "filled with the previous frame" if self.fill_gaps else "skipped, the video is shorter"
+            print(f"Missing {missing} frames in {len(self.gaps)} gaps ({describe_gaps(self.gaps)}), {action}")
+        if not self.fill_gaps:
+            return list(frame_numbers)
+        order = []
+        for frame in frame_numbers:
+            if order:
+                order.extend([order[-1]] * (frame - order[-1] - 1))
+            order.append(frame)
+        return order
+
+    # (sequence, order): the frame sequence and the frame numbers in the order they are encoded. Callers streaming
+    # frames into open_session(order) themselves use it to match the gap handling of the ffconcat path
+    def frame_order(self):
+        sequence = self.frame_sequence()
+        return sequence, self.encoding_order(sorted(sequence))
+
+    def concat_path(self):
+        return os.path.join(self.output_folder, f".{os.path.basename(self.output_path())}.ffconcat")
+
+    def write_concat(self, sequence, order):
+        duration = 1.0 / self.framerate
+        lines = ["ffconcat version 1.0"]
+        for frame in order:
+            path = os.path.abspath(os.path.join(self.input_folder, sequence[frame])).replace("\\", "/")
+            lines.append("file '" + path.replace("'", "'\\''") + "'")
+            lines.append(f"duration {duration:.6f}")
+        concat_path = self.concat_path()
+        with open(concat_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        return concat_path
+
+    # drawbox filter outlining the flashing frames, None if there is no sidecar or none of them is encoded
+    def flash_filter(self, frame_numbers):
+        metadata = load_flashing_metadata(self.flash_sidecar)
+        if not metadata:
+            return None
+        flashing = set(metadata.get("frames", []))
+        # Copies filling a gap after a flashing frame are not outlined, only the recorded frame flashed
+        positions = [n for n, frame in enumerate(frame_numbers)
+                     if frame in flashing and (n == 0 or frame_numbers[n - 1] != frame)]
+        if not positions:
+            return None
+
+        enable = "+".join(f"between(n,{start},{end})" for start, end in frame_ranges(positions))
+        b, g, r = metadata.get("outline_color_bgr", [0, 0, 255])
+        # cv2.rectangle centres its thickness on the frame edge, so only half of it is visible inside the frame
+        thickness = max(1, (int(metadata.get("outline_thickness", 50)) + 1) // 2)
+        print(f"Burning in the flashing frame outline on {len(positions)} frames")
+        return f"drawbox=x=0:y=0:w=iw:h=ih:color=0x{r:02X}{g:02X}{b:02X}:t={thickness}:enable='{enable}'"
+
+    def list_pipe_frames(self):
+        reader = FrameReader(self.input_folder)
+        names = [f for f in reader.list_frames((".npy", STACK_EXTENSION)) if not f.startswith(".")]
+        return reader, sorted(names)
+
+    def needs_pipe(self):
+        return not self.frame_sequence() and bool(self.list_pipe_frames()[1])
+
+    def output_path(self):
         out_name = self.output_file_name
-        if not out_name.lower().endswith(".avi"):
-            out_name += ".avi"
-        out_path = os.path.join(self.output_folder, out_name)
+        extension = profile_settings(self.profile)["extension"]
+        if not out_name.lower().endswith(extension):
+            out_name += extension
+        return os.path.join(self.output_folder, out_name)
+
+    def output_pix_fmt(self):
+        return output_pix_fmt(self.bit_depth)
 
-        pix_fmt = "yuv420p" if self.bit_depth == 8 else "yuv422p16le"
+    # Streaming session writing to this encoder's output, with the flashing outline filter if there is a sidecar
+    def open_session(self, frame_numbers=()):
+        return EncoderSession(self.output_path(), framerate=self.framerate, bit_depth=self.bit_depth,
+                              video_filter=self.flash_filter(frame_numbers),
+                              profile=self.profile, threads=self.threads, progress=self.progress)
+
+    def run_pipe(self):
+        reader, names = self.list_pipe_frames()
+        frames = [parse_frame_number(name) for name in names]
+        if None in frames or len(set(frames)) != len(frames):
+            # No usable frame numbers, the frames are encoded in name order without gap handling
+            sequence = dict(enumerate(names))
+            order = list(sequence)
+            session = self.open_session()
+        else:
+            sequence = dict(zip(frames, names))
+            order = self.encoding_order(sorted(sequence))
+            session = self.open_session(order)
+
+        image = None
+        previous = None
+        try:
+            for frame in order:
+                if self.should_stop:
+                    print(f"Encoding canceled after {session.frames_written}/{len(order)} frames.")
+                    break
+                # A filled gap repeats the frame before it, which is still in memory
+                if frame != previous:
+                    previous = frame
+                    image = reader.read(sequence[frame])
+                    if image is None:
+                        print(f"Skipping frame with missing data: {sequence[frame]}")
+                if image is not None:
+                    session.write(image)
+        except RuntimeError as e:
+            print(e)
+        return session.close()
+
+    def build_command_normal(self):
+        sequence, order = self.frame_order()
+        if not sequence:
+            raise FileNotFoundError("No files ending with 'frame_<number>.<ext>' found")
+        out_path = self.output_path()
 
-        return [
+        cmd = [
             "ffmpeg",
-            "-framerate", str(self.framerate),
-            "-i", inp_pattern,
-            "-c:v", "ffv1",
-            "-pix_fmt", pix_fmt,
-            out_path
+            *(FFMPEG_PROGRESS_ARGS if self.progress else []),
+            "-f", "concat",
+            "-safe", "0",
+            "-i", self.write_concat(sequence, order),
         ]
+        video_filter = join_filters(self.flash_filter(order), self.profile)
+        if video_filter:
+            cmd += ["-vf", video_filter]
+        # -frames:v keeps the count exact, the concat demuxer may otherwise repeat the last frame to fill its duration
+        cmd += ["-r", str(self.framerate), "-frames:v", str(len(order))]
+        return cmd + codec_args(self.profile, self.bit_depth, self.threads) + [out_path]
 
     def run_command(self):
         if self.should_stop:
@@ -73,10 +227,16 @@ class VideoEncoderFFMPEG:
             return
 
         try:
-            cmd = self.build_command_normal()
-            print("Running:", " ".join(cmd))
-            subprocess.run(cmd, check=True)
-            print(f"Encoded video saved to: {cmd[-1]}")
+            if self.needs_pipe():
+                cmd = self.run_pipe()
+            else:
+                cmd = self.build_command_normal()
+                print("Running:", " ".join(cmd))
+                subprocess.run(cmd, check=True)
+            if cmd:
+                print(f"Encoded video saved to: {cmd[-1]}")
+            if self.gaps:
+                print(f"Missing frames: {describe_gaps(self.gaps)}")
         except subprocess.CalledProcessError as e:
             print(f"Error running ffmpeg: {e}")
         except FileNotFoundError as e:
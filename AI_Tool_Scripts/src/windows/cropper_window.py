@@ -1,6 +1,6 @@
 from PySide6.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QLineEdit,
-    QScrollArea, QWidget, QTextEdit, QFrame, QSizePolicy
+    QScrollArea, QWidget, QTextEdit, QFrame, QSizePolicy, QCheckBox
 )
 from PySide6.QtCore import Qt
 
@@ -97,15 +97,15 @@ class CropperWindow(QDialog):
 
         lbl_x = QLabel("X:")
         le_x = QLineEdit()
-        le_x.setPlaceholderText("Default: 2028")
+        le_x.setPlaceholderText("Blank: auto-detect")
 
         lbl_y = QLabel("Y:")
         le_y = QLineEdit()
-        le_y.setPlaceholderText("Default: 1420")
+        le_y.setPlaceholderText("Blank: auto-detect")
 
         lbl_radius = QLabel("Radius:")
         le_radius = QLineEdit()
-        le_radius.setPlaceholderText("Default: 1200")
+        le_radius.setPlaceholderText("Blank: auto-detect")
 
         for lbl in (lbl_x, lbl_y, lbl_radius):
             lbl.setSizePolicy(QSizePolicy.Fixed, QSizePolicy.Fixed)
@@ -119,9 +119,28 @@ class CropperWindow(QDialog):
         second_row.addWidget(lbl_radius)
         second_row.addWidget(le_radius)
 
+        # Third row (square crop, downscale)
+        third_row = QHBoxLayout()
+        third_row.setSpacing(8)
+
+        chk_square = QCheckBox("Square Crop Only")
+        chk_square.setChecked(False)
+
+        lbl_scale = QLabel("Scale:")
+        le_scale = QLineEdit()
+        le_scale.setPlaceholderText("Default: 1.0")
+        lbl_scale.setSizePolicy(QSizePolicy.Fixed, QSizePolicy.Fixed)
+        le_scale.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
+
+        third_row.addWidget(chk_square)
+        third_row.addSpacing(20)
+        third_row.addWidget(lbl_scale)
+        third_row.addWidget(le_scale)
+
         # Assemble left layout
         left_layout.addLayout(top_row)
         left_layout.addLayout(second_row)
+        left_layout.addLayout(third_row)
 
         # Right panel (Buttons)
         right_widget = QWidget()
@@ -170,6 +189,8 @@ class CropperWindow(QDialog):
             "le_x": le_x,
             "le_y": le_y,
             "le_radius": le_radius,
+            "chk_square": chk_square,
+            "le_scale": le_scale,
             "btn_crop": btn_crop,
             "btn_view": btn_view,
             "btn_remove": btn_remove
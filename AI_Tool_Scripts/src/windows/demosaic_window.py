@@ -1,6 +1,6 @@
 from PySide6.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QLineEdit,
-    QScrollArea, QWidget, QTextEdit, QFrame, QSizePolicy
+    QScrollArea, QWidget, QTextEdit, QFrame, QSizePolicy, QComboBox, QCheckBox
 )
 from PySide6.QtCore import Qt
 
@@ -30,6 +30,11 @@ class DemosaicWindow(QDialog):
         self.scroll_area.setWidget(self.scroll_widget)
         main_layout.addWidget(self.scroll_area)
 
+        # Resume option, frames recorded in each output folder's manifest are skipped
+        self.chk_resume = QCheckBox("Skip frames already converted (resume)")
+        self.chk_resume.setChecked(True)
+        main_layout.addWidget(self.chk_resume)
+
         # Bottom Buttons
         bottom_layout = QHBoxLayout()
         self.btn_demosaic = QPushButton("Demosaic All")
@@ -105,9 +110,33 @@ class DemosaicWindow(QDialog):
         le_stride = QLineEdit()
         le_stride.setPlaceholderText("Default: 8128")
 
-        for w in [lbl_width, lbl_height, lbl_stride]:
+        lbl_workers = QLabel("Workers:")
+        le_workers = QLineEdit()
+        le_workers.setPlaceholderText("Default: 1")
+
+        # Method keys match RawTo16.DEMOSAIC_METHODS
+        lbl_method = QLabel("Method:")
+        cb_method = QComboBox()
+        cb_method.addItem("Edge-Aware (Default)", "ea")
+        cb_method.addItem("Bilinear", "bilinear")
+        cb_method.addItem("VNG (8-bit output)", "vng")
+        cb_method.addItem("Half Resolution 2x2 Binning", "half")
+
+        # Format keys match frame_io_class.OUTPUT_FORMATS
+        lbl_format = QLabel("Format:")
+        cb_format = QComboBox()
+        cb_format.addItem("PNG (Default)", "png")
+        cb_format.addItem("TIFF Uncompressed", "tiff")
+        cb_format.addItem("NumPy .npy", "npy")
+        cb_format.addItem("Frame Stack", "stack")
+
+        lbl_png_compression = QLabel("PNG Level:")
+        le_png_compression = QLineEdit()
+        le_png_compression.setPlaceholderText("0-9, Default: OpenCV")
+
+        for w in [lbl_width, lbl_height, lbl_stride, lbl_workers, lbl_method, lbl_format, lbl_png_compression]:
             w.setSizePolicy(QSizePolicy.Fixed, QSizePolicy.Fixed)
-        for le in [le_width, le_height, le_stride]:
+        for le in [le_width, le_height, le_stride, le_workers, le_png_compression]:
             le.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
 
         second_row.addWidget(lbl_width)
@@ -116,9 +145,53 @@ class DemosaicWindow(QDialog):
         second_row.addWidget(le_height)
         second_row.addWidget(lbl_stride)
         second_row.addWidget(le_stride)
+        second_row.addWidget(lbl_workers)
+        second_row.addWidget(le_workers)
+        second_row.addWidget(lbl_method)
+        second_row.addWidget(cb_method)
+
+        # Third row
+        third_row = QHBoxLayout()
+        third_row.setSpacing(8)
+        third_row.addWidget(lbl_format)
+        third_row.addWidget(cb_format)
+        third_row.addWidget(lbl_png_compression)
+        third_row.addWidget(le_png_compression)
+
+        # Fused option, goes straight to 8-bit petri dish cropped frames (FusedRawPipeline)
+        chk_fused = QCheckBox("Fused 8-bit + Dish Crop")
+        lbl_x = QLabel("X:")
+        le_x = QLineEdit()
+        le_x.setPlaceholderText("Default: 2028")
+        lbl_y = QLabel("Y:")
+        le_y = QLineEdit()
+        le_y.setPlaceholderText("Default: 1420")
+        lbl_radius = QLabel("Radius:")
+        le_radius = QLineEdit()
+        le_radius.setPlaceholderText("Default: 1200")
+
+        for w in [lbl_x, lbl_y, lbl_radius]:
+            w.setSizePolicy(QSizePolicy.Fixed, QSizePolicy.Fixed)
+        for le in [le_x, le_y, le_radius]:
+            le.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
+            le.setEnabled(False)
+        chk_fused.toggled.connect(lambda checked: [le.setEnabled(checked) for le in (le_x, le_y, le_radius)])
+
+        third_row.addSpacing(20)
+        third_row.addWidget(chk_fused)
+        third_row.addWidget(lbl_x)
+        third_row.addWidget(le_x)
+        third_row.addWidget(lbl_y)
+        third_row.addWidget(le_y)
+        third_row.addWidget(lbl_radius)
+        third_row.addWidget(le_radius)
+        cb_format.currentIndexChanged.connect(
+            lambda _: le_png_compression.setEnabled(cb_format.currentData() == "png")
+        )
 
         left_layout.addLayout(top_row)
         left_layout.addLayout(second_row)
+        left_layout.addLayout(third_row)
 
         # Right panel
         right_widget = QWidget()
@@ -161,6 +234,14 @@ class DemosaicWindow(QDialog):
             "le_width": le_width,
             "le_height": le_height,
             "le_stride": le_stride,
+            "le_workers": le_workers,
+            "cb_method": cb_method,
+            "cb_format": cb_format,
+            "le_png_compression": le_png_compression,
+            "chk_fused": chk_fused,
+            "le_x": le_x,
+            "le_y": le_y,
+            "le_radius": le_radius,
             "btn_demosaic": btn_demosaic,
             "btn_remove": btn_remove
         }
@@ -14,6 +14,11 @@ class ExtraProcessorWindow(QDialog):
             "Larvae AI Tool - Extra Processor\n"
             "Assumption: Raw input folder may contain original config.json files. "
             "Use the checkboxes below to choose whether to copy from Raw or from Input folder.\n"
+            "Fixed 12-bit Range maps 0-4095 to 0-255 for every frame instead of stretching each frame on its own.\n"
+            "Global Normalization stretches every frame with one range taken from the 0.1-99.9 percentiles of sampled frames.\n"
+            "Fused Raw demosaics the Raw folder straight to 8-bit dish cropped frames, no Input folder needed.\n"
+            "Validate Frames checks every frame's content and moves broken ones to a quarantine subfolder "
+            "instead of deleting frames by file size.\n"
         )
         self.setup_ui()
 
@@ -98,19 +103,32 @@ class ExtraProcessorWindow(QDialog):
 
         # Checkboxes
         chk_convert_8bit     = QCheckBox("Convert to 8-bit")
+        chk_fixed_range      = QCheckBox("Fixed 12-bit Range")
+        chk_global_norm      = QCheckBox("Global Normalization")
         chk_copy_raw_configs = QCheckBox("Copy Configs from Raw")
         chk_copy_inp_configs = QCheckBox("Copy Configs from Input")
+        chk_fused_raw        = QCheckBox("Fused Raw to 8-bit + Dish Crop")
+        chk_validate_frames  = QCheckBox("Validate Frames (Quarantine)")
 
         chk_convert_8bit.setChecked(False)
+        chk_fixed_range.setChecked(False)
+        chk_global_norm.setChecked(False)
         chk_copy_raw_configs.setChecked(False)
         chk_copy_inp_configs.setChecked(False)
         chk_copy_raw_configs.setEnabled(False)
         chk_copy_inp_configs.setEnabled(False)
+        chk_fused_raw.setChecked(False)
+        chk_fused_raw.setEnabled(False)
+        chk_validate_frames.setChecked(False)
 
         cb_row = QHBoxLayout()
         cb_row.addWidget(chk_convert_8bit)
+        cb_row.addWidget(chk_fixed_range)
+        cb_row.addWidget(chk_global_norm)
         cb_row.addWidget(chk_copy_raw_configs)
         cb_row.addWidget(chk_copy_inp_configs)
+        cb_row.addWidget(chk_fused_raw)
+        cb_row.addWidget(chk_validate_frames)
         left_layout.addLayout(cb_row)
 
         # Right panel
@@ -153,8 +171,12 @@ class ExtraProcessorWindow(QDialog):
             "btn_output": btn_output,
             "le_output": le_output,
             "chk_convert_8bit":     chk_convert_8bit,
+            "chk_fixed_range":      chk_fixed_range,
+            "chk_global_norm":      chk_global_norm,
             "chk_copy_raw_configs": chk_copy_raw_configs,
             "chk_copy_inp_configs": chk_copy_inp_configs,
+            "chk_fused_raw":        chk_fused_raw,
+            "chk_validate_frames":  chk_validate_frames,
             "btn_process": btn_process,
             "btn_remove":  btn_remove,
         }
@@ -1,6 +1,6 @@
 from PySide6.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QLineEdit,
-    QScrollArea, QWidget, QFrame, QSizePolicy, QCheckBox, QTextEdit
+    QScrollArea, QWidget, QFrame, QSizePolicy, QCheckBox, QTextEdit, QComboBox
 )
 from PySide6.QtCore import Qt
 
@@ -76,6 +76,18 @@ class VideoEncoderWindow(QDialog):
         cb_8bit = QCheckBox("8-bit")
         cb_16bit = QCheckBox("16-bit")
 
+        # Profile keys match encoder_session_class.ENCODER_PROFILES
+        label_profile = QLabel("Encoder Profile")
+        cb_profile = QComboBox()
+        cb_profile.addItem("FFV1 Multi-threaded (Default)", "ffv1_mt")
+        cb_profile.addItem("FFV1 Single Thread (Legacy)", "ffv1")
+        cb_profile.addItem("FFV1 Archive (Smaller, Slower)", "ffv1_archive")
+        cb_profile.addItem("x264 Review Copy (Lossy, CRF 18)", "x264_review")
+        cb_profile.addItem("x264 Preview (Lossy, CRF 28)", "x264_preview")
+
+        cb_fill_gaps = QCheckBox("Fill Missing Frames")
+        cb_fill_gaps.setToolTip("Repeat the previous frame in place of missing frame numbers so timing stays correct")
+
         for label, widget in [
             (btn_input, le_input),
             (btn_output, le_output),
@@ -90,6 +102,9 @@ class VideoEncoderWindow(QDialog):
         checkbox_row = QHBoxLayout()
         checkbox_row.addWidget(cb_8bit)
         checkbox_row.addWidget(cb_16bit)
+        checkbox_row.addWidget(label_profile)
+        checkbox_row.addWidget(cb_profile)
+        checkbox_row.addWidget(cb_fill_gaps)
         left_layout.addLayout(checkbox_row)
 
         # Right Panel
@@ -133,6 +148,8 @@ class VideoEncoderWindow(QDialog):
             "le_framerate": le_framerate,
             "cb_8bit": cb_8bit,
             "cb_16bit": cb_16bit,
+            "cb_profile": cb_profile,
+            "cb_fill_gaps": cb_fill_gaps,
             "btn_encode": btn_encode,
             "btn_remove": btn_remove
         }
@@ -0,0 +1,83 @@
+from math import atan2, degrees, sqrt
+import numpy as np
+import pandas as pd
+import pandas.testing as pdt
+from utils.data_extractor_class import DataExtractor
+
+WIDTH = 2400
+HEIGHT = 2000
+FRAMERATE = 10.0
+
+
+# Per-object iloc loop basic_parameters used before it was vectorized, kept as the reference
+def legacy_basic_parameters(df):
+    df["Midpoint x centre"] = df["x centre"]
+    df["Midpoint y centre"] = df["y centre"]
+    df["Speed"] = 0.0
+    df["Direction"] = 0.0
+    df["Distance"] = 0.0
+    df["Position x"] = df["x centre"] * WIDTH
+    df["Position y"] = df["y centre"] * HEIGHT
+
+    all_groups = []
+    for _, group in df.groupby("object ID", group_keys=False):
+        group = group.sort_values("Frame").copy()
+        speeds, directions, distances = [0], [0], [0]
+        total_dist = 0
+        for i in range(1, len(group)):
+            dx = group.iloc[i]["x centre"] - group.iloc[i - 1]["x centre"]
+            dy = group.iloc[i]["y centre"] - group.iloc[i - 1]["y centre"]
+            dist = sqrt(dx**2 + dy**2)
+            speeds.append(dist * FRAMERATE)
+            directions.append(degrees(atan2(dy, dx)))
+            total_dist += dist
+            distances.append(total_dist)
+        group["Speed"] = speeds
+        group["Direction"] = directions
+        group["Distance"] = distances
+        all_groups.append(group)
+    return pd.concat(all_groups).sort_values(["object ID", "Frame"])
+
+
+# Three objects with interleaved rows, object 7 is missing frames 4-6 and object 2 has a single row
+def track_table():
+    rng = np.random.default_rng(0)
+    rows = []
+    for frame in range(1, 11):
+        for object_id in (7, 3):
+            if object_id == 7 and 4 <= frame <= 6:
+                continue
+            rows.append([0, rng.uniform(0, 1), rng.uniform(0, 1), 0.02, 0.01, object_id, frame, 0])
+    rows.append([0, 0.5, 0.5, 0.02, 0.01, 2, 5, 0])
+    columns = ["Class ID", "x centre", "y centre", "width", "height", "object ID", "Frame", "Flashing"]
+    return pd.DataFrame(rows, columns=columns)
+
+
+def extractor(tmp_path):
+    extractor = DataExtractor(str(tmp_path), str(tmp_path))
+    extractor._width = WIDTH
+    extractor._height = HEIGHT
+    extractor._framerate = FRAMERATE
+    return extractor
+
+
+def test_matches_legacy_loop(tmp_path):
+    result = extractor(tmp_path).basic_parameters(track_table(), gap_aware=False)
+    expected = legacy_basic_parameters(track_table())
+
+    pdt.assert_index_equal(result.index, expected.index)
+    pdt.assert_index_equal(result.columns, expected.columns)
+    pdt.assert_frame_equal(result, expected, check_exact=False, rtol=1e-12, atol=1e-12)
+
+
+def test_gap_aware_speed(tmp_path):
+    plain = extractor(tmp_path).basic_parameters(track_table(), gap_aware=False)
+    gap_aware = extractor(tmp_path).basic_parameters(track_table(), gap_aware=True)
+
+    pdt.assert_series_equal(gap_aware["Direction"], plain["Direction"])
+    pdt.assert_series_equal(gap_aware["Distance"], plain["Distance"])
+
+    after_gap = (gap_aware["object ID"] == 7) & (gap_aware["Frame"] == 7)
+    assert gap_aware.loc[after_gap, "Speed"].item() == plain.loc[after_gap, "Speed"].item() / 4
+    assert gap_aware.loc[after_gap, "Speed"].item() > 0
+    pdt.assert_series_equal(gap_aware.loc[~after_gap, "Speed"], plain.loc[~after_gap, "Speed"])
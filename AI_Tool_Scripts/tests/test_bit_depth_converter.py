@@ -0,0 +1,31 @@
+import os
+import numpy as np
+import cv2
+from utils.bit_depth_convert_class import BitDepthConverter
+
+
+def write_8bit_frames(folder, count=3):
+    os.makedirs(folder, exist_ok=True)
+    for idx in range(count):
+        image = np.full((8, 10, 3), 40 * idx, dtype=np.uint8)
+        cv2.imwrite(os.path.join(folder, f"exp_frame_{idx:05d}.png"), image)
+
+
+def test_copy_run_after_link_run(tmp_path):
+    input_folder = str(tmp_path / "input")
+    output_folder = str(tmp_path / "output")
+    write_8bit_frames(input_folder)
+
+    BitDepthConverter(input_folder, output_folder, link_copies=True)()
+    linked = sorted(os.listdir(output_folder))
+    assert linked == sorted(os.listdir(input_folder))
+    for name in linked:
+        assert os.path.samefile(os.path.join(input_folder, name), os.path.join(output_folder, name))
+
+    BitDepthConverter(input_folder, output_folder, link_copies=False)()
+    for name in linked:
+        input_path = os.path.join(input_folder, name)
+        output_path = os.path.join(output_folder, name)
+        assert not os.path.samefile(input_path, output_path)
+        assert os.stat(input_path).st_nlink == 1
+        assert np.array_equal(cv2.imread(output_path), cv2.imread(input_path))
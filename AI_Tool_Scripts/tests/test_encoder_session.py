@@ -0,0 +1,122 @@
+import os
+import sys
+import json
+import stat
+import numpy as np
+import cv2
+import pytest
+from utils.encoder_session_class import EncoderSession
+from utils.video_encoder_class import VideoEncoderFFMPEG
+from utils.full_frame_annotator_class import FullFrameAnnotator
+from utils.bit_depth_convert_class import BitDepthConverter
+from utils.flashing_frames_class import FlashingFrames
+
+# Stand-in for ffmpeg: reads the piped frames and writes its arguments and the bytes it received to the output
+FAKE_FFMPEG = """#!{python}
+import sys, json
+data = sys.stdin.buffer.read()
+with open(sys.argv[-1], "w", encoding="utf-8") as f:
+    json.dump({{"argv": sys.argv[1:], "bytes": len(data), "checksum": sum(data[::97])}}, f)
+"""
+
+HEIGHT = 24
+WIDTH = 32
+
+
+@pytest.fixture
+def fake_ffmpeg(tmp_path, monkeypatch):
+    if os.name == "nt":
+        pytest.skip("the stand-in ffmpeg is a script run through its shebang line")
+    bin_folder = tmp_path / "bin"
+    bin_folder.mkdir()
+    script = bin_folder / "ffmpeg"
+    script.write_text(FAKE_FFMPEG.format(python=sys.executable))
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setenv("PATH", str(bin_folder) + os.pathsep + os.environ["PATH"])
+
+
+def read_output(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def arg_value(argv, name):
+    return argv[argv.index(name) + 1]
+
+
+def write_frames(folder, frames, dtype=np.uint8, peak=255):
+    os.makedirs(folder, exist_ok=True)
+    rng = np.random.default_rng(0)
+    images = {}
+    for frame in frames:
+        image = rng.integers(0, peak, (HEIGHT, WIDTH, 3), dtype=dtype)
+        cv2.imwrite(os.path.join(folder, f"exp_frame_{frame:05d}.png"), image)
+        images[frame] = image
+    return images
+
+
+def test_session_streams_frames(tmp_path, fake_ffmpeg):
+    output_path = str(tmp_path / "video.avi")
+    frames = [np.full((HEIGHT, WIDTH, 3), value, dtype=np.uint8) for value in range(5)]
+    with EncoderSession(output_path, framerate=10, bit_depth=8) as session:
+        for frame in frames:
+            session.write(frame)
+
+    result = read_output(output_path)
+    assert session.frames_written == 5
+    assert result["bytes"] == 5 * HEIGHT * WIDTH * 3
+    assert arg_value(result["argv"], "-pix_fmt") == "bgr24"
+    assert arg_value(result["argv"], "-s") == f"{WIDTH}x{HEIGHT}"
+
+
+def test_annotator_streams_in_encoding_order(tmp_path, fake_ffmpeg):
+    images_folder = str(tmp_path / "Normal")
+    labels_folder = str(tmp_path / "labels")
+    annotated_folder = str(tmp_path / "Annotated")
+    write_frames(images_folder, [1, 2, 5])
+    os.makedirs(labels_folder)
+    with open(os.path.join(labels_folder, "exp_frame_00002.txt"), "w", encoding="utf-8") as f:
+        f.write("0 0.5 0.5 0.25 0.25 3\n")
+
+    encoder = VideoEncoderFFMPEG(images_folder, str(tmp_path), "annotated", 8, fill_gaps=True)
+    sequence, order = encoder.frame_order()
+    assert order == [1, 2, 2, 2, 5]
+    with encoder.open_session(order) as session:
+        FullFrameAnnotator(images_folder, labels_folder, annotated_folder, session=session, write_frames=False,
+                           image_names=[sequence[frame] for frame in order])()
+
+    result = read_output(encoder.output_path())
+    assert session.frames_written == 5
+    assert result["bytes"] == 5 * HEIGHT * WIDTH * 3
+    assert not os.path.exists(annotated_folder)
+
+
+def test_bit_depth_converter_streams_without_writing(tmp_path, fake_ffmpeg):
+    input_folder = str(tmp_path / "input")
+    output_folder = str(tmp_path / "output")
+    write_frames(input_folder, [1, 2, 3], dtype=np.uint16, peak=4095)
+
+    with EncoderSession(str(tmp_path / "video.avi"), bit_depth=8) as session:
+        BitDepthConverter(input_folder, output_folder, session=session, write_frames=False)()
+
+    result = read_output(str(tmp_path / "video.avi"))
+    assert result["bytes"] == 3 * HEIGHT * WIDTH * 3
+    assert arg_value(result["argv"], "-pix_fmt") == "bgr24"
+    assert not [name for name in os.listdir(output_folder) if name.endswith(".png")]
+
+
+def test_flashing_frames_encode_outlines_in_memory(tmp_path, fake_ffmpeg):
+    folder = str(tmp_path / "frames")
+    images = write_frames(folder, [1, 2, 3])
+
+    with EncoderSession(str(tmp_path / "plain.avi"), bit_depth=8) as session:
+        for frame in sorted(images):
+            session.write(images[frame])
+    with EncoderSession(str(tmp_path / "outlined.avi"), bit_depth=8) as session:
+        FlashingFrames(folder, folder, ["00002"], outline_thickness=4).encode(session)
+
+    plain = read_output(str(tmp_path / "plain.avi"))
+    outlined = read_output(str(tmp_path / "outlined.avi"))
+    assert outlined["bytes"] == plain["bytes"] == 3 * HEIGHT * WIDTH * 3
+    assert outlined["checksum"] != plain["checksum"]
+    assert sorted(os.listdir(folder)) == [f"exp_frame_{frame:05d}.png" for frame in (1, 2, 3)]
@@ -0,0 +1,28 @@
+import os
+from utils.folder_cleaner_class import FolderCleaner
+
+RAW_SIZE = 3040 * 8128
+
+
+def write_raw_frames(folder, lengths):
+    for idx, length in enumerate(lengths):
+        with open(os.path.join(folder, f"exp_frame{idx:05d}.raw"), "wb") as f:
+            f.truncate(length)
+
+
+def test_truncated_raw_frames_are_quarantined(tmp_path):
+    folder = str(tmp_path)
+    write_raw_frames(folder, [RAW_SIZE, RAW_SIZE - 128, RAW_SIZE])
+    FolderCleaner(folder, extensions=(), mode="validate", raw_size=RAW_SIZE)()
+
+    assert sorted(os.listdir(folder)) == ["exp_frame00000.raw", "exp_frame00002.raw", "quarantine"]
+    assert "exp_frame00001.raw" in os.listdir(os.path.join(folder, "quarantine"))
+
+
+def test_raw_layout_mismatch_quarantines_nothing(tmp_path, capsys):
+    folder = str(tmp_path)
+    write_raw_frames(folder, [1000, 1000, 900])
+    FolderCleaner(folder, extensions=(), mode="validate", raw_size=RAW_SIZE)()
+
+    assert sorted(os.listdir(folder)) == ["exp_frame00000.raw", "exp_frame00001.raw", "exp_frame00002.raw"]
+    assert "raw layout does not match" in capsys.readouterr().out
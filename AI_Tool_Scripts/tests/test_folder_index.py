@@ -0,0 +1,47 @@
+import os
+import time
+from utils.folder_index_class import FolderIndex
+from utils.folder_cleaner_class import FolderCleaner
+
+
+def write_frames(folder, size, count=10):
+    for idx in range(count):
+        with open(os.path.join(folder, f"exp_frame_{idx:05d}.png"), "wb") as f:
+            f.write(b"\0" * size)
+
+
+def test_sizes_follow_files_overwritten_in_place(tmp_path):
+    folder = str(tmp_path)
+    write_frames(folder, 300_000)
+    # Folders modified within SETTLE_NS of a scan are always rescanned, the folder is aged past that
+    settled = time.time_ns() - 2 * FolderIndex.SETTLE_NS
+    os.utime(folder, ns=(settled, settled))
+    FolderIndex.invalidate(folder)
+    index = FolderIndex.get(folder)
+    assert {entry.size for entry in index.files()} == {300_000}
+
+    # Rewriting existing files leaves the folder mtime alone, the cached listing is reused
+    write_frames(folder, 50_000)
+    assert FolderIndex.get(folder) is index
+    assert {entry.size for entry in index.files()} == {50_000}
+
+    # A frame far from the new mode size is the only one removed
+    with open(os.path.join(folder, "exp_frame_00003.png"), "wb") as f:
+        f.write(b"\0" * 2_000_000)
+    FolderCleaner(folder, tolerance=10_000).execute()
+    assert len(os.listdir(folder)) == 9
+    assert not os.path.exists(os.path.join(folder, "exp_frame_00003.png"))
+
+
+def test_cache_is_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(FolderIndex, "MAX_FOLDERS", 3)
+    FolderIndex.clear()
+    folders = []
+    for idx in range(5):
+        folder = tmp_path / f"folder_{idx}"
+        folder.mkdir()
+        folders.append(str(folder))
+        FolderIndex.get(str(folder))
+    assert list(FolderIndex._cache) == [os.path.abspath(folder) for folder in folders[2:]]
+    FolderIndex.clear()
+    assert not FolderIndex._cache